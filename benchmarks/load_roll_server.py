@@ -0,0 +1,97 @@
+# load_roll_server.py
+"""
+Load generator for the roll service.  It starts a RollServer in this process, unless given the address of one
+already running, and prints the client-side latency percentiles and throughput as JSON.
+
+    python benchmarks/load_roll_server.py                                # 50 connections x 200 requests of 3d6
+    python benchmarks/load_roll_server.py --connections 200 --rolls 10 --expr "4d6kh3"
+    python benchmarks/load_roll_server.py --port 8765                    # load a server started separately
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+
+from src.service import roll_server  # noqa: E402
+
+
+async def _client(host: str, port: int, requests: int, pipeline: int, request: dict, latencies: list) -> type[None]:
+    """
+    Sends 'requests' requests on one connection, keeping up to 'pipeline' of them outstanding.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    sent = {}
+    next_id = 0
+
+    def send():
+        nonlocal next_id
+        sent[next_id] = time.perf_counter()
+        writer.write(json.dumps(dict(request, id=next_id)).encode() + b'\n')
+        next_id += 1
+
+    for _ in range(min(pipeline, requests)):
+        send()
+    for _ in range(requests):
+        response = json.loads(await reader.readline())
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        latencies.append(time.perf_counter() - sent.pop(response['id']))
+        if next_id < requests:
+            send()
+        await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run(args) -> dict:
+    server = None
+    host, port = args.host, args.port
+    if port is None:
+        server = roll_server.RollServer(batch_window=args.batch_window)
+        host, port = await server.start()
+
+    request = {'expr': args.expr} if args.expr else {'sides': args.sides}
+    request.update(dice=args.dice, rolls=args.rolls)
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*[_client(host, port, args.requests, args.pipeline, request, latencies)
+                           for _ in range(args.connections)])
+    elapsed = time.perf_counter() - started
+
+    result = {'connections': args.connections,
+              'requests': len(latencies),
+              'seconds': elapsed,
+              'requests_per_s': len(latencies) / elapsed,
+              'latency_p50_ms': float(np.percentile(latencies, 50) * 1000),
+              'latency_p99_ms': float(np.percentile(latencies, 99) * 1000)}
+    if server is not None:
+        result['server'] = server.metrics.snapshot()
+        await server.close()
+    return result
+
+
+def main(argv: list[str] = None) -> type[None]:
+    parser = argparse.ArgumentParser(description="Measure the roll service's latency and throughput.")
+    parser.add_argument('--host', default='127.0.0.1', help="The host of a running server.")
+    parser.add_argument('--port', type=int, default=None, help="The port of a running server.  None starts one.")
+    parser.add_argument('--connections', type=int, default=50, help="Concurrent client connections.")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per connection.")
+    parser.add_argument('--pipeline', type=int, default=1, help="Outstanding requests per connection.")
+    parser.add_argument('--sides', type=int, default=6, help="The sides of each die.")
+    parser.add_argument('--dice', type=int, default=3, help="The number of dice in each throw.")
+    parser.add_argument('--rolls', type=int, default=1, help="Rows per request.")
+    parser.add_argument('--expr', default=None, help="Dice notation to roll instead of --sides.")
+    parser.add_argument('--batch-window', type=float, default=0.0, help="The in-process server's batch window.")
+    args = parser.parse_args(argv)
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
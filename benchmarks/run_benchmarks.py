@@ -0,0 +1,205 @@
+# run_benchmarks.py
+"""
+Benchmarks for the core roll pipeline, the exporters and shdroll's start-up.
+
+    python benchmarks/run_benchmarks.py                       # run and print
+    python benchmarks/run_benchmarks.py --save-baseline       # run and store benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --threshold 0.25      # run, compare with the baseline, exit 1 on regression
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from src.api import core  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+
+# (number_of_rolls, number_of_dice) for Rolls.roll_n_times
+ROLL_SIZES = [(1_000, 3), (100_000, 3), (1_000_000, 3), (100_000, 10)]
+
+# name -> function returning (callable to time, calls per timing)
+BENCHMARKS = {}
+
+
+def benchmark(name: str):
+    """
+    Registers a benchmark.  The decorated function does any set-up and returns the callable to time and the number
+    of calls to make per timing.
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _rolls(number_of_rolls: int, number_of_dice: int = 3):
+    return core.Rolls(core.Dice(core.IntegerDie(), number_of_dice=number_of_dice), number_of_rolls=number_of_rolls)
+
+
+@benchmark('IntegerDie.die_roll')
+def _die_roll():
+    die = core.IntegerDie()
+    return die.die_roll, 10_000
+
+
+@benchmark('Dice.dice_throw[3d6]')
+def _dice_throw():
+    dice = core.Dice(core.IntegerDie(), number_of_dice=3)
+    return dice.dice_throw, 10_000
+
+
+for _size in ROLL_SIZES:
+    @benchmark(f'Rolls.roll_n_times[{_size[0]}x{_size[1]}]')
+    def _roll_n_times(size=_size):
+        rolls = _rolls(*size)
+        return rolls.roll_n_times, 1
+
+
+@benchmark('Rolls.rolls_to_numpy[100000x3]')
+def _rolls_to_numpy():
+    rolls = _rolls(100_000)
+    return lambda: rolls.rolls_to_numpy(with_totals=True), 1
+
+
+@benchmark('Rolls.rolls_to_pandas[100000x3]')
+def _rolls_to_pandas():
+    rolls = _rolls(100_000)
+    return lambda: rolls.rolls_to_pandas(with_totals=True), 1
+
+
+@benchmark('Rolls.rolls_to_csv[100000x3]')
+def _rolls_to_csv():
+    rolls = _rolls(100_000)
+    path = os.path.join(tempfile.mkdtemp(), 'rolls.csv')
+    return lambda: rolls.rolls_to_csv(path), 1
+
+
+@benchmark('Rolls.rolls_to_excel[10000x3]')
+def _rolls_to_excel():
+    rolls = _rolls(10_000)
+    path = os.path.join(tempfile.mkdtemp(), 'rolls.xlsx')
+    return lambda: rolls.rolls_to_excel(path), 1
+
+
+@benchmark('shdroll startup[-d 3]')
+def _shdroll_startup():
+    command = [sys.executable, str(ROOT / 'src' / 'cli' / 'shdroll.py'), '-d', '3']
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    return lambda: subprocess.run(command, env=env, cwd=ROOT, stdout=subprocess.DEVNULL, check=True), 1
+
+
+@benchmark('shdroll batch[50 jobs of -d 3]')
+def _shdroll_batch():
+    path = os.path.join(tempfile.mkdtemp(), 'jobs.jsonl')
+    with open(path, 'w') as file:
+        file.write('{"dice": 3}\n' * 50)
+    command = [sys.executable, str(ROOT / 'src' / 'cli' / 'shdroll.py'), '--batch', path]
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    return lambda: subprocess.run(command, env=env, cwd=ROOT, stdout=subprocess.DEVNULL, check=True), 1
+
+
+@benchmark('import src.api.core')
+def _import_core():
+    command = [sys.executable, '-c', 'import src.api.core']
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    return lambda: subprocess.run(command, env=env, cwd=ROOT, check=True), 1
+
+
+def run(names: list[str], repeat: int) -> dict:
+    """
+    Times each benchmark 'repeat' times and keeps the fastest, which is the least disturbed by other load.
+    :return: name -> seconds per call.
+    """
+    results = {}
+    for name in names:
+        function, number = BENCHMARKS[name]()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                function()
+            timings.append((time.perf_counter() - start) / number)
+        results[name] = min(timings)
+        print(f"{name:45s} {_format_seconds(results[name]):>12s}", flush=True)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Compares results with a baseline.
+    :param threshold: The allowed slow-down, 0.25 for 25%.
+    :return: The names of the benchmarks which regressed by more than 'threshold'.
+    """
+    regressions = []
+    print(f"\n{'benchmark':45s} {'baseline':>12s} {'current':>12s} {'ratio':>8s}")
+    for name, seconds in results.items():
+        if name not in baseline:
+            continue
+        ratio = seconds / baseline[name]
+        flag = ''
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:45s} {_format_seconds(baseline[name]):>12s} {_format_seconds(seconds):>12s} {ratio:8.2f}{flag}")
+    return regressions
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.1f} ms"
+    return f"{seconds:.2f} s"
+
+
+def _metadata() -> dict:
+    return {'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks for hackable dice roller.")
+    parser.add_argument('--filter', default='', help="Only run benchmarks whose name contains this text.")
+    parser.add_argument('--repeat', type=int, default=5, help="Timings per benchmark; the fastest is kept.")
+    parser.add_argument('--output', default=None, help="Write the results to this JSON file.")
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help="The baseline JSON file to compare with.")
+    parser.add_argument('--save-baseline', action='store_true', help="Store the results as the baseline.")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Fail when a benchmark is slower than the baseline by more than this fraction.")
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    report = {'metadata': _metadata(), 'results': run(names, args.repeat)}
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(report, indent=2))
+        return 0
+    if Path(args.baseline).exists():
+        baseline = json.loads(Path(args.baseline).read_text())['results']
+        regressions = compare(report['results'], baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}.")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+# hackable_dice_roller.convergence
+"""
+Adaptive Monte Carlo estimates of a statistic of the throw totals of Dice, which roll in vectorized batches only
+until a requested precision is reached.
+
+    estimate = convergence.estimate(dice, 'mean', precision=0.01)
+    estimate = convergence.estimate(dice, 'quantile', q=0.9, precision=0.5)
+    estimate = convergence.estimate(dice, 'tail', at_least=15, precision=0.001, seed=7)
+
+The precision is the half-width of the confidence interval, or a fraction of the estimate when 'relative' is True.
+"""
+import math
+import time
+from statistics import NormalDist
+from typing import NamedTuple
+import numpy as np
+
+from src.api import core
+from src.api import summary
+
+STATISTICS = ('mean', 'quantile', 'tail')
+
+# The rows of the first batch, and the fewest of any later one.
+DEFAULT_BATCH_SIZE = 65_536
+
+# An estimate stops here, unconverged, rather than roll forever.
+DEFAULT_MAX_SAMPLES = 100_000_000
+
+
+class Estimate(NamedTuple):
+    """
+    An estimate of a statistic of the throw totals and how it was reached.
+    """
+    statistic: str
+    value: float
+    standard_error: float
+    low: float  # the confidence interval
+    high: float
+    confidence: float
+    samples: int
+    batches: int
+    seconds: float
+    converged: bool
+
+    def half_width(self) -> float:
+        return (self.high - self.low) / 2
+
+    def to_string(self) -> str:
+        return (f"{self.statistic}: {self.value}  standard_error: {self.standard_error:.6g}  "
+                f"{self.confidence:.0%} interval: [{self.low}, {self.high}]\n"
+                f"samples: {self.samples}  batches: {self.batches}  seconds: {self.seconds:.3f}  "
+                f"converged: {self.converged}")
+
+
+class _Mean:
+    def __init__(self):
+        self._moments = summary.Moments()
+
+    def update(self, totals) -> type[None]:
+        self._moments.update(totals)
+
+    def estimate(self, z: float) -> tuple[float, float, float, float]:
+        value = self._moments.mean()
+        error = math.sqrt(self._moments.variance() / self._moments.count())
+        return value, error, value - z * error, value + z * error
+
+
+class _Quantile:
+    """
+    The interval is between the order statistics whose ranks are z binomial standard deviations either side of q,
+    which needs no assumption about the distribution of the totals.
+    """
+    def __init__(self, q: float):
+        if not 0 < q < 1:
+            raise ValueError("Parameter 'q' must be between 0 and 1.")
+        self._q = q
+        self._histogram = summary.Histogram()
+        self._count = 0
+
+    def update(self, totals) -> type[None]:
+        self._histogram.update(totals)
+        self._count += len(totals)
+
+    def estimate(self, z: float) -> tuple[float, float, float, float]:
+        spread = z * math.sqrt(self._q * (1 - self._q) / self._count)
+        low = self._histogram.quantile(max(self._q - spread, 0.0))
+        high = self._histogram.quantile(min(self._q + spread, 1.0))
+        return self._histogram.quantile(self._q), (high - low) / (2 * z), low, high
+
+
+class _Tail:
+    """
+    The interval is Wilson's score interval, which stays honest when the probability is near 0 or 1, where the
+    normal approximation would claim a precision of 0 after a run of misses.
+    """
+    def __init__(self, at_least: float):
+        if at_least is None:
+            raise ValueError("A tail probability needs 'at_least'.")
+        self._at_least = at_least
+        self._hits = 0
+        self._count = 0
+
+    def update(self, totals) -> type[None]:
+        self._hits += int(np.count_nonzero(totals >= self._at_least))
+        self._count += len(totals)
+
+    def estimate(self, z: float) -> tuple[float, float, float, float]:
+        n = self._count
+        p = self._hits / n
+        centre = (p + z * z / (2 * n)) / (1 + z * z / n)
+        spread = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+        return p, math.sqrt(p * (1 - p) / n), centre - spread, centre + spread
+
+
+def estimate(dice: core.Dice,
+             statistic: str = 'mean',
+             precision: float = 0.01,
+             q: float = 0.5,
+             at_least: float = None,
+             relative: bool = False,
+             confidence: float = 0.95,
+             batch_size: int = DEFAULT_BATCH_SIZE,
+             max_samples: int = DEFAULT_MAX_SAMPLES,
+             seed: int = None,
+             workers: int = None,
+             rng: np.random.Generator = None) -> Estimate:
+    """
+    Rolls the dice in batches until the confidence interval of a statistic of their throw totals is narrow enough.
+    After each batch the number of rows still needed is predicted from the interval's width, which narrows with
+    the square root of the samples, so the precision is usually met in a few large vectorized batches.
+    :param dice: a core.Dice.
+    :param statistic: 'mean', 'quantile' for the q-th quantile, or 'tail' for the probability that a total is at
+        least 'at_least'.
+    :param precision: The largest half-width of the confidence interval at which to stop.
+    :param q: The quantile, for 'quantile'.
+    :param at_least: The smallest total counted, for 'tail'.
+    :param relative: If True 'precision' is a fraction of the estimate's magnitude rather than an absolute width.
+    :param confidence: The confidence of the interval.
+    :param batch_size: The rows of the first batch and the fewest of any later one but the last.
+    :param max_samples: The most rows to roll.  The estimate is returned unconverged when they run out.
+    :param seed: If given, the batches are consecutive rows of the run this seed gives, as for Rolls, so the
+        estimate can be repeated exactly.
+    :param workers: The number of processes which share the rolling.  As for Rolls, workers draw from a seed, and
+        fresh entropy is drawn if none is given.
+    :param rng: A numpy.random.Generator for an unseeded run, instead of the dice's own.
+    :return: An Estimate.
+    """
+    if statistic not in STATISTICS:
+        raise ValueError(f"Parameter 'statistic' must be one of {', '.join(STATISTICS)}.")
+    if precision <= 0:
+        raise ValueError("Parameter 'precision' must be positive.")
+    if not 0 < confidence < 1:
+        raise ValueError("Parameter 'confidence' must be between 0 and 1.")
+    if batch_size < 2 or max_samples < 2:
+        raise ValueError("Parameters 'batch_size' and 'max_samples' must be at least 2.")
+    if seed is not None and rng is not None:
+        raise ValueError("Parameters 'seed' and 'rng' cannot both be used.")
+    if workers is not None and workers > 1 and rng is not None:
+        raise ValueError("Parameters 'workers' and 'rng' cannot both be used.  Workers draw from a seed.")
+    if workers is not None and workers > 1 and seed is None:
+        seed = np.random.SeedSequence().entropy
+    tracker = _Mean() if statistic == 'mean' else _Quantile(q) if statistic == 'quantile' else _Tail(at_least)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+
+    started = time.perf_counter()
+    samples = batches = 0
+    rows = min(batch_size, max_samples)
+    while True:
+        _, totals = dice.dice_throws(rows, seed=seed, start=samples, workers=workers, rng=rng)
+        tracker.update(totals)
+        samples += rows
+        batches += 1
+        value, error, low, high = tracker.estimate(z)
+        target = precision * abs(value) if relative else precision
+        half_width = (high - low) / 2
+        converged = half_width <= target
+        if converged or samples >= max_samples:
+            break
+        # the half-width shrinks as 1 / sqrt(samples); aim a little past the prediction, and at most double
+        needed = samples * (half_width / target) ** 2 * 1.1 if target > 0 else 2 * samples
+        rows = int(min(max(needed - samples, batch_size), samples, max_samples - samples))
+    return Estimate(statistic, value, error, low, high, confidence, samples, batches,
+                    time.perf_counter() - started, converged)
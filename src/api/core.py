@@ -1,64 +1,291 @@
 # hackable_dice_roller.rolls
-from typing import Callable
-from random import randrange
+from typing import Callable, NamedTuple
+from functools import partial
+import inspect
+import io
 import numpy as np
-import pandas as pd
 
+from src.api import parallel
+from src.api import profiling
+from src.api import summary
+from src.api import transforms
+from src.api import writers
 
-def add_currying(x: float):
+# The most whole numbers Rolls.column_dtypes transforms one by one to find the range of a non-monotone transform.
+_RANGE_SCAN_LIMIT = 1 << 16
+
+
+def add_currying(x: float) -> transforms.Affine:
     """
     add_curring supplies one float to which a curried float is added.
     :param x: the provided number to add.
-    :return: The results of a currying lambda which accepts a parameter 'y' as the curried value.
+    :return: A transforms.Affine which, like the curried lambda it replaces, is called with 'y' as the curried
+        value.  Unlike a lambda it can be pickled, hashed, and applied to a whole numpy array at once.
     """
-    return lambda y: x + y
+    return transforms.Affine(1, x)
 
 
-def multiply_currying(x):
+def multiply_currying(x) -> transforms.Affine:
     """
     multiply_curring supplies one float with which a curried float is multiplied.
     :param x: the provided number to multiply.
-    :return: The results of a currying lambda which accepts a parameter 'y' as the curried value.
+    :return: A transforms.Affine which, like the curried lambda it replaces, is called with 'y' as the curried
+        value.  Unlike a lambda it can be pickled, hashed, and applied to a whole numpy array at once.
+    """
+    return transforms.Affine(x, 0)
+
+
+@profiling.instrumented
+def _apply_transform(transform: Callable[[float], float], values):
+    """
+    Applies a transform to a whole numpy array in one call.  A transforms.Transform always works on whole arrays,
+    as do most lambdas of arithmetic; any other transform is applied element by element.
+    :param transform: a transforms.Transform, a curried transform, or None.
+    :param values: a numpy array of samples or totals.
+    :return: a numpy array with the same shape as 'values'.
+    """
+    if transform is None:
+        return values
+    if isinstance(transform, transforms.Transform):
+        return transform(values)
+    try:
+        transformed = transform(values)
+    except (TypeError, ValueError):
+        transformed = None
+    if not isinstance(transformed, np.ndarray) or transformed.shape != values.shape:
+        transformed = np.vectorize(transform)(values)
+    return transformed
+
+
+def _transformed_range(transform: Callable[[float], float], low: int, high: int):
+    """
+    The values a transform can give for the whole numbers 'low' to 'high'.  A monotone transform is applied to the
+    two ends; any other to every number between them, if there are at most _RANGE_SCAN_LIMIT.
+    :return: a numpy array holding the least and greatest of them, or None if they are not known without rolling.
+    """
+    ends = np.array([low, high])
+    if transforms.is_monotone(transform):
+        return _apply_transform(transform, ends)
+    if ends.dtype.kind in 'iu' and high - low < _RANGE_SCAN_LIMIT:
+        return _apply_transform(transform, np.arange(low, high + 1))
+    return None
+
+
+def _wide_dtype(transform: Callable[[float], float], sample):
+    """
+    :return: int64 if 'transform' gives integers for 'sample', otherwise float64.
+    """
+    return np.dtype(np.int64 if _apply_transform(transform, sample).dtype.kind in 'iu' else np.float64)
+
+
+def _read_only(array):
+    """
+    A view of 'array' which cannot be written to, so results can be handed out without copying them.  Each throw
+    replaces the arrays rather than filling them in, so a view keeps showing the throw it was taken from, though
+    rerolls of that throw, which change it in place, show through.
+    :param array: a numpy array.
+    :return: a read-only numpy view sharing the array's memory.
+    """
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+def _frozen(array):
+    """
+    Makes a newly drawn array read-only, in place, so it can be handed out as an immutable result.
+    :param array: a numpy array nothing else refers to.
+    :return: the same array.
+    """
+    array.flags.writeable = False
+    return array
+
+
+def _distinct(values):
+    """
+    The distinct values of an array in ascending order, like numpy.unique, which is slow for large integer arrays.
+    :param values: a 1-d numpy array.
+    :return: a sorted numpy array without repeats.
+    """
+    values = np.sort(values)
+    return values[np.r_[True, values[1:] != values[:-1]]] if values.size else values
+
+
+def _generator_method(method: str, die_args: tuple, rng, shape):
+    """
+    Samples from the numpy.random.Generator method named 'method'.  It is a module function so that it can be pickled
+    to worker processes.
     """
-    return lambda y: x * y
+    return getattr(rng, method)(*die_args, size=shape)
+
+
+def _alias_table(weights):
+    """
+    Builds Vose's alias table, so that a weighted choice costs one uniform index and one uniform fraction.
+    :param weights: non-negative weights, at least one of them positive.
+    :return: A tuple of a numpy array of the probability of keeping each column and a numpy array of each column's
+        alias.
+    """
+    n = len(weights)
+    scaled = np.asarray(weights, dtype=np.float64) * n / np.sum(weights)
+    probability = np.ones(n)
+    alias = np.arange(n)
+    small = [i for i in range(n) if scaled[i] < 1]
+    large = [i for i in range(n) if scaled[i] >= 1]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        probability[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1 - scaled[less]
+        (small if scaled[more] < 1 else large).append(more)
+    # whatever is left over is 1 up to round-off, and keeps its own column
+    return probability, alias
+
+
+def _alias_sample(faces, probability, alias, rng, shape):
+    """
+    Samples faces from an alias table.  It is a module function so that it can be pickled to worker processes.
+    :return: one face if 'shape' is None, otherwise a numpy array of faces.
+    """
+    # One uniform draw gives both the column, from its whole part, and the fraction compared with the column's
+    # probability.  Two separate draws would make the first n samples depend on how many are asked for, which
+    # seeded runs rely on not happening.
+    draws = np.asarray(rng.random(size=shape)) * len(faces)
+    columns = np.minimum(draws.astype(np.intp), len(faces) - 1)  # in case round-off reaches len(faces)
+    keep = draws - columns < probability[columns]
+    return faces[np.where(keep, columns, alias[columns])]
+
+
+def _accepts_size(die: Callable[..., float]) -> bool:
+    """
+    Detects the numpy convention of a 'size' keyword which asks a probability function for a whole array of samples.
+    :param die: the probability function handed to Die.
+    :return: True if 'die' has a parameter called 'size'.
+    """
+    try:
+        return 'size' in inspect.signature(die).parameters
+    except (TypeError, ValueError):  # some builtins cannot be introspected
+        return False
 
 
 class Die:
     """
     'Die' represents a physical polyhedral die or probability function.
     """
+    __slots__ = ('_die', '_name', '_transform', '_die_args', '_sized', '_rng', '_die_value')
+
     def __init__(self,
-                 die: Callable[..., float],
+                 die: Callable[..., float] | str,
                  die_name: str = "",
                  transform: Callable[[float], float] = None,
-                 *die_args):
+                 *die_args,
+                 sized: bool = None,
+                 rng: np.random.Generator = None):
         """
-        :param die:  A probability function from which hackable dice roller will draw one sample.
+        :param die:  A probability function from which hackable dice roller will draw one sample, or the name of a
+            numpy.random.Generator method such as "binomial", which is then called on 'rng'.
         :param die_name: A string naming the parameter 'die'. The empty string is the default.
         :param transform: A function which reserves one curried parameter where the result of a selected sample
-            can be placed.  The function must be curried, and since it must be lazily evaluated, it must be a Python
-            lambda.  This parameter is empty, or None by default.  'transform' may be removed in a future version
-            leaving all data transformation to post-processing.
+            can be placed, preferably a transforms.Transform, which can be pickled and hashed and transforms whole
+            arrays at once.  A lambda still works.  This parameter is empty, or None by default.  'transform' may be
+            removed in a future version leaving all data transformation to post-processing.
         :param die_args: positional arguments to the function provided as a parameter to 'die'.
+        :param sized: True if 'die' is a batch sampler which accepts a numpy style 'size' keyword and returns an array
+            of that shape, as numpy.random.binomial does.  Dice and Rolls then draw a whole block of samples in one
+            call.  None, the default, detects a 'size' parameter from the signature of 'die'.
+        :param rng: The numpy.random.Generator a named Generator method draws from.  None uses the calling thread's
+            own generator.  An arbitrary probability function keeps its own source of randomness.
         """
         self._die = die
         self._name = die_name
         self._transform = transform
         self._die_args = die_args
+        if isinstance(die, str):
+            self._sized = True
+        else:
+            self._sized = _accepts_size(die) if sized is None else sized
+        self._rng = rng
 
         self._die_value: float = 0
 
         self.die_roll()  # need in set up to populate all get methods with valid values
 
-    def die_roll(self) -> float:
+    def _draw(self, rng, size=None):
+        """
+        Calls the probability function once, for one sample or, when 'size' is given, for a block of samples.
+        :param rng: a generator which overrides this die's own, or None.
+        :param size: None for one sample, or a numpy shape.
+        :return: one sample or a block of samples, untransformed.
         """
+        if isinstance(self._die, str):
+            return getattr(rng or self._rng or parallel.thread_rng(), self._die)(*self._die_args, size=size)
+        if size is None:
+            return self._die(*self._die_args)
+        return self._die(*self._die_args, size=size)
+
+    @profiling.instrumented
+    def die_roll(self, rng: np.random.Generator = None) -> float:
+        """
+        :param rng: a generator which overrides this die's own for this roll.
         :return: returns one sample from 'die' as altered by 'transform'.
         """
-        roll = self._die(*self._die_args)
+        self._die_value = self.sample(rng)
+        return self._die_value
+
+    def sample(self, rng: np.random.Generator = None) -> float:
+        """
+        Rolls the die without remembering the result, so one Die can be rolled by several threads at once.
+        :param rng: a generator which overrides this die's own for this roll.
+        :return: one sample from 'die' as altered by 'transform'.
+        """
+        roll = self._draw(rng)
+        if isinstance(roll, np.generic):
+            roll = roll.item()
         if self._transform is not None:
             roll = self._transform(roll)
-        self._die_value = roll
-        return self._die_value
+        return roll
+
+    @profiling.instrumented
+    def die_rolls(self, shape, rng: np.random.Generator = None):
+        """
+        Draws a whole array of samples at once.  A batch sampler is asked for the whole block in one call; any other
+        probability function is called once per sample.  Either way the transform is applied to the finished array.
+        :param shape: an int or a tuple of ints, as for numpy.
+        :param rng: a generator which overrides this die's own for these rolls.
+        :return: a numpy array of samples from 'die' as altered by 'transform'.
+        """
+        if self._sized:
+            samples = np.asarray(self._draw(rng, shape))
+        else:
+            count = int(np.prod(shape))
+            samples = np.asarray([self._draw(rng) for _ in range(count)]).reshape(shape)
+        return _apply_transform(self._transform, samples)
+
+    def block_sampler(self):
+        """
+        A picklable sampler for seeded and parallel rolls, or None if this die cannot draw from a given generator.
+        :return: A sampler for a named Generator method, or None for an arbitrary probability function.
+        """
+        if isinstance(self._die, str):
+            return partial(_generator_method, self._die, self._die_args)
+        return None
+
+    def seeded_rolls(self, seed: int, start: int, stop: int, number_of_dice: int, workers: int = None):
+        """
+        Draws rows 'start' to 'stop' of a seeded run, possibly across several processes.  The same seed always gives
+        the same rows, whatever the number of workers, and no earlier rows need to be drawn first.
+        :param seed: the entropy of a numpy.random.SeedSequence.
+        :param start: the first row to draw.
+        :param stop: one past the last row to draw.
+        :param number_of_dice: the number of columns.
+        :param workers: the number of processes.  None or 1 draws in this process.
+        :return: a 2-d numpy array of samples as altered by 'transform'.
+        """
+        sampler = self.block_sampler()
+        if sampler is None:
+            raise ValueError(f"Die '{self._name}' cannot be rolled from a seed or in parallel.")
+        samples = parallel.roll_rows(sampler, seed, start, stop, number_of_dice, workers)
+        return _apply_transform(self._transform, samples)
 
     def die_value(self) -> float:
         """Gets the value of a die which was previously rolled."""
@@ -67,6 +294,10 @@ class Die:
     def die_name(self) -> str:
         return self._name
 
+    def transform(self) -> Callable[[float], float]:
+        """Gets the transform applied to each sample, or None."""
+        return self._transform
+
     def to_string(self) -> str:
         return self.__str__()
 
@@ -77,110 +308,342 @@ class Die:
 class IntegerDie(Die):
     """
     IntegerDie is used to model a polyhedral die, or any other range of integers with an arbitrary starting point.
-    It wraps random.randrange().
+    It wraps numpy.random.Generator.integers().
     """
+    __slots__ = ('_sides', '_base')
+
     def __init__(self,
                  transform_fn: Callable[[float], float] = None,
                  sides: int = 6,
-                 base: int = 1):
+                 base: int = 1,
+                 rng: np.random.Generator = None):
         """
         Used to model one pseudo-random selection from an arbitrary range of integers.
         :param transform_fn:  A function which reserves one curried parameter where the result of a selected sample
-            can be placed.  The function must be curried, and since it must be lazily evaluated, it must be a Python
-            lambda.  This parameter is empty, or None by default.  'transform' may be removed in a future version
-            leaving all data transformation to post-processing.
+            can be placed, preferably a transforms.Transform, which can be pickled and hashed and transforms whole
+            arrays at once.  A lambda still works.  This parameter is empty, or None by default.  'transform' may be
+            removed in a future version leaving all data transformation to post-processing.
         :param sides: The number of sides on the polyhedral die, or more generally the size of the integer range.
             It must be at least 1.
         :param base: 'Floor' might have been a better name.  This is the inclusive start of the integer range.
+        :param rng: The numpy.random.Generator to draw from.  None uses the calling thread's own generator.
         """
         if sides <= 0:
             raise ValueError("Parameter 'die' must be at least 1")
 
-        super().__init__(randrange,  # the probability function
+        super().__init__("integers",  # the Generator method
                          "d" + str(sides),  # name
                          transform_fn,
-                         base,  # arg0 = start
-                         base + sides,  # arg1 = stop
-                         1)  # arg2 = step = 1
+                         base,  # arg0 = low
+                         base + sides,  # arg1 = high, exclusive
+                         rng=rng)
 
         self._sides = sides
         self._base = base
-             
+
     def get_bottom(self) -> int:
-        """Return the start of random.randrange()."""
+        """Return the inclusive start of the integer range."""
         return self._base
 
     def get_sides(self) -> int:
-        """Return random.randrange()'s stop."""
+        """Return the size of the integer range."""
         return self._sides
 
 
+class DiceReroll(NamedTuple):
+    """
+    One reroll of some of a throw's dice, as returned by Dice.reroll.  A copy of the Dice can be brought up to date
+    with Dice.apply_reroll.
+    """
+    indices: np.ndarray  # the positions of the rerolled dice, ascending
+    old: np.ndarray  # what they showed before
+    new: np.ndarray  # what they show now
+    total: float  # the throw's transformed total afterwards
+
+
+class DiceThrow(NamedTuple):
+    """
+    One throw of Dice, as Dice.throw returns it.  The array is read-only and nothing changes it afterwards.
+    """
+    throws: np.ndarray  # the die rolls
+    total: float  # the transformed total
+
+
+class WeightedDie(Die):
+    """
+    WeightedDie models a loaded die, or any other discrete probability function over a fixed set of faces.  An
+    alias table is built once, after which every sample costs the same whatever the number of faces, singly or in
+    whole arrays.
+    """
+    __slots__ = ('_faces', '_weights')
+
+    def __init__(self,
+                 faces,
+                 weights,
+                 transform_fn: Callable[[float], float] = None,
+                 die_name: str = None,
+                 rng: np.random.Generator = None):
+        """
+        :param faces: The numeric value of each face.
+        :param weights: The relative weight of each face.  Weights must not be negative, and need not sum to 1.
+        :param transform_fn: A curried transform applied to each sample, as for IntegerDie.
+        :param die_name: A name for the die.  The default is 'w' and the number of faces, e.g. 'w6'.
+        :param rng: The numpy.random.Generator to draw from.  None uses the calling thread's own generator.
+        """
+        faces = np.asarray(faces)
+        weights = np.asarray(weights, dtype=np.float64)
+        if faces.ndim != 1 or len(faces) == 0:
+            raise ValueError("Parameter 'faces' must be a non-empty list of values.")
+        if weights.shape != faces.shape:
+            raise ValueError("Parameters 'faces' and 'weights' must be the same length.")
+        if (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError("Parameter 'weights' must not be negative and must not all be 0.")
+        self._faces = faces
+        self._weights = weights
+
+        super().__init__(_alias_sample,
+                         f"w{len(faces)}" if die_name is None else die_name,
+                         transform_fn,
+                         faces,
+                         *_alias_table(weights),
+                         sized=True,
+                         rng=rng)
+
+    def _draw(self, rng, size=None):
+        return self._die(*self._die_args, rng or self._rng or parallel.thread_rng(), size)
+
+    def block_sampler(self):
+        return partial(self._die, *self._die_args)
+
+    def faces(self):
+        """Return a numpy array of the faces."""
+        return self._faces.copy()
+
+    def probabilities(self):
+        """Return a numpy array of the probability of each face."""
+        return self._weights / self._weights.sum()
+
+
+class TableDie(WeightedDie):
+    """
+    TableDie is a die whose faces are listed explicitly, one entry per equally likely outcome, e.g. [1, 1, 2, 3].
+    Repeated entries are folded into one weighted face.
+    """
+    __slots__ = ()
+
+    def __init__(self,
+                 table,
+                 transform_fn: Callable[[float], float] = None,
+                 die_name: str = None,
+                 rng: np.random.Generator = None):
+        """
+        :param table: The value of every outcome.
+        :param transform_fn: A curried transform applied to each sample, as for IntegerDie.
+        :param die_name: A name for the die.  The default is 't' and the number of outcomes, e.g. 't4'.
+        :param rng: The numpy.random.Generator to draw from.  None uses the calling thread's own generator.
+        """
+        faces, counts = np.unique(np.asarray(table), return_counts=True)
+        super().__init__(faces,
+                         counts,
+                         transform_fn,
+                         f"t{len(table)}" if die_name is None else die_name,
+                         rng)
+
+
 class Dice:
     """
     'Dice' represents one 'throw' of N dice with the same number of sides, or N distinct single samples of the same
     probability function.
     """
+    __slots__ = ('_die', '_transform_fn', '_number_of_dice', '_rng', '_throws', '_sum', '_total', '_log')
 
     def __init__(self,
                  die: Die,
                  transform_fn: Callable[[float], float] = None,
-                 number_of_dice: int = 1):
+                 number_of_dice: int = 1,
+                 rng: np.random.Generator = None):
         """
         'Dice' represents one throw of 'number_of_dice' having the same number of sides or
         the same probability function.
         :param die: an object of class Die in this submodule which models the kind of dice used in this throw.
         :param transform_fn: A function which reserves one curried parameter where the result of a selected sample
-            can be placed.  The function must be curried, and since it must be lazily evaluated, it must be a Python
-            lambda.  This parameter is empty, or None by default.  'transform' may be removed in a future version
-            leaving all data transformation to post-processing.  This transforms the dice throw's total only.
+            can be placed, preferably a transforms.Transform, which can be pickled and hashed and transforms whole
+            arrays at once.  A lambda still works.  This parameter is empty, or None by default.  'transform' may be
+            removed in a future version leaving all data transformation to post-processing.  This transforms the
+            dice throw's total only.
         :param number_of_dice: The number of times to throw the die.  It must be at least 1.
+        :param rng: A numpy.random.Generator which overrides the die's own.  None leaves the choice to the die.
         """
         if number_of_dice < 1:
             raise ValueError("Parameter 'number_of_dice' to roll must be at least l.")
         self._die = die
         self._transform_fn = transform_fn
         self._number_of_dice = number_of_dice
+        self._rng = rng
 
-        self._throws: list[float] = []
+        self._throws = np.empty(0)
+        self._sum: float = 0  # the untransformed total, kept up to date by rerolls
         self._total: float = 0
+        self._log = []
 
         self.dice_throw()  # initializes 'get' methods.
 
-    def dice_throw(self) -> tuple[list[float], float]:
+    @profiling.instrumented
+    def dice_throw(self):
         """
         'dice_roll' emulates a throw of one or more polyhedral dice, or several independent selections from a
         probability function
-        :return: 'dice' roll returns a list of rolls or experiments and the sum of the rolls or experiments' results.
+        :return: 'dice' roll returns a numpy array of rolls or experiments and the sum of the rolls or experiments'
+            results.
         """
         self._clear()
-        for _ in range(self._number_of_dice):
-            self._throws.append(self._die.die_roll())
+        self._throws = self._die.die_rolls(self._number_of_dice, self._rng)
 
-        self._total = sum(self._throws)
+        self._sum = self._throws.sum().item()
+        self._total = self._sum
         if self._transform_fn is not None:
             self._total = self._transform_fn(self._total)
 
         return self._throws, self._total
 
+    @profiling.instrumented
+    def throw(self, rng: np.random.Generator = None) -> DiceThrow:
+        """
+        Throws the dice without changing this object, unlike dice_throw, so one Dice can serve several threads at
+        once.  Unseeded draws come from the calling thread's own generator unless the dice or die have their own.
+        :param rng: A generator which overrides this object's own for this throw.
+        :return: A DiceThrow.
+        """
+        throws = self._die.die_rolls(self._number_of_dice, rng or self._rng)
+        total = throws.sum().item()
+        if self._transform_fn is not None:
+            total = self._transform_fn(total)
+        return DiceThrow(_frozen(throws), total)
+
+    def draw_dice(self, count: int, rng: np.random.Generator = None):
+        """
+        Draws 'count' single dice as this throw would, for rerolls.
+        :param count: The number of dice.
+        :param rng: A generator which overrides this object's own.
+        :return: A numpy array of die rolls.
+        """
+        return self._die.die_rolls(count, rng or self._rng)
+
+    def reroll(self, indices) -> DiceReroll:
+        """
+        Rerolls only the dice at 'indices', e.g. to reroll the 1s, and updates the total from the difference, so the
+        cost depends on the number of dice rerolled rather than the number thrown.
+        :param indices: The positions of the dice to reroll, from 0.  Repeats are rerolled once.
+        :return: A DiceReroll, which is also added to reroll_log().
+        """
+        indices = _distinct(np.asarray(indices, dtype=np.intp).ravel())
+        if indices.size and (indices[0] < 0 or indices[-1] >= self._number_of_dice):
+            raise IndexError(f"Dice indices must be from 0 to {self._number_of_dice - 1}.")
+        old = self._throws[indices]
+        new = self.draw_dice(indices.size)
+        self._replace_dice(indices, new)
+        event = DiceReroll(indices, old, new, self._total)
+        self._log.append(event)
+        return event
+
+    def reroll_where(self, predicate: Callable) -> DiceReroll:
+        """
+        Rerolls the dice a predicate picks out.
+        :param predicate: A function from the numpy array of die rolls to a boolean array, e.g. lambda d: d == 1.
+        :return: A DiceReroll, which is also added to reroll_log().
+        """
+        return self.reroll(np.flatnonzero(predicate(self._throws)))
+
+    def apply_reroll(self, event: DiceReroll) -> type[None]:
+        """
+        Replays a reroll made by a copy of these dice, so that both show the same throw.
+        :param event: A DiceReroll.
+        :return: None.
+        """
+        self._replace_dice(event.indices, event.new)
+        self._log.append(event)
+
+    def _replace_dice(self, indices, new) -> type[None]:
+        self._sum += (new.sum() - self._throws[indices].sum()).item()
+        self._throws[indices] = new
+        self._total = self._sum
+        if self._transform_fn is not None:
+            self._total = self._transform_fn(self._total)
+
+    def reroll_log(self) -> list[DiceReroll]:
+        """
+        :return: The rerolls since the dice were last thrown, oldest first.
+        """
+        return list(self._log)
+
+    @profiling.instrumented
+    def dice_throws(self,
+                    number_of_throws: int,
+                    seed: int = None,
+                    start: int = 0,
+                    workers: int = None,
+                    rng: np.random.Generator = None):
+        """
+        Throws the dice 'number_of_throws' times in one vectorized draw without changing this throw's results.
+        :param number_of_throws: The number of rows to draw.
+        :param seed: If given, the rows are rows 'start' onwards of the run seeded by this SeedSequence entropy.
+        :param start: The first row of a seeded run to draw.
+        :param workers: The number of processes drawing a seeded run.
+        :param rng: A generator which overrides this object's own for an unseeded draw.
+        :return: A tuple of a 2-d numpy array of die rolls, one row per throw, and a numpy array of each throw's
+            transformed total.
+        """
+        if seed is None:
+            throws = self._die.die_rolls((number_of_throws, self._number_of_dice), rng or self._rng)
+        else:
+            throws = self._die.seeded_rolls(seed, start, start + number_of_throws, self._number_of_dice, workers)
+        totals = _apply_transform(self._transform_fn, throws.sum(axis=1))
+        return throws, totals
+
+    def estimate(self, statistic: str = 'mean', precision: float = 0.01, **kwargs):
+        """
+        Rolls the dice in vectorized batches only until a statistic of the throw totals is known to 'precision',
+        rather than a fixed, usually far larger, number of times.  The other options are convergence.estimate's.
+        :param statistic: 'mean', 'quantile' or 'tail'.
+        :param precision: The largest half-width of the confidence interval at which to stop.
+        :return: A convergence.Estimate, with the samples used and the seconds taken.
+        """
+        from src.api import convergence
+        return convergence.estimate(self, statistic, precision, **kwargs)
+
     def _clear(self) -> type[None]:
         """
         clears the list of rolls and the throw's total so the next throw is tabla rasa.
         :return: None.
         """
-        self._throws = []
+        self._throws = np.empty(0)
+        self._sum = 0
         self._total = 0
+        self._log = []
 
     def number_of_dice(self) -> int:
         return self._number_of_dice
 
+    def die(self) -> Die:
+        """Gets the Die thrown 'number_of_dice' times."""
+        return self._die
+
+    def transform_fn(self) -> Callable[[float], float]:
+        """Gets the transform applied to each throw's total, or None."""
+        return self._transform_fn
+
+    @profiling.instrumented
     def throws(self) -> list[float]:
         """
         :return: deep copies and returns the list of rolls.
         """
-        copy_list = []
-        for roll in self._throws:
-            copy_list.append(roll)
-        return copy_list
+        return self._throws.tolist()
+
+    def throws_view(self):
+        """
+        :return: A read-only numpy view of the throw's die rolls, without copying them.
+        """
+        return _read_only(self._throws)
 
     def total(self) -> float:
         """
@@ -207,131 +670,377 @@ class Dice:
         This is a convenience function which appends the calculated total to the list of individual die rolls.
         :return: [rolls].append total.
         """
-        data = self._throws.copy()
+        data = self.throws()
         data.append(self.total())
         return data
 
-    def dice_to_numpy(self, with_total: bool = False):
+    @profiling.instrumented
+    def dice_to_numpy(self, with_total: bool = False, copy: bool = False):
         """
-        Converts the list from get_rolls_with_total to a numpy array.
-        :param with_total: includes the throw's total if True.
+        The throw as a numpy array.
+        :param with_total: includes the throw's total if True, in a new array.
+        :param copy: Without the total, False returns a read-only view of the throw, as throws_view does, and True a
+            writable copy.
         :return: A numpy array.
         """
-        to_numpy_list = self.throws()
         if with_total:
-            to_numpy_list.append(self._total)
-        return np.asarray(to_numpy_list)
+            return np.append(self._throws, self._total)
+        return self._throws.copy() if copy else _read_only(self._throws)
 
-    def dice_to_pandas(self, with_total: bool = False):
+    @profiling.instrumented
+    def dice_to_pandas(self, with_total: bool = False, dtype=float):
         """
-        Converts the list to a one-row pandas DataFrame
+        Converts the throw to a one-row pandas DataFrame, built from one typed array rather than a list per value.
         :param with_total: includes the throw's total if True.
+        :param dtype: The dtype of every column.  float, the default, is what this has always returned.
         :return: A one-row pandas DataFrame.
         """
-        header = self.headers(with_total)
-        if with_total:
-            data = self.rolls_with_total()
-        else:
-            data = self.throws()
-        data = [data]  # a list of a list makes pandas think this is a row in a table.
-        return pd.DataFrame(data,
-                            columns=header,
-                            index=None,
-                            dtype=float)
+        import pandas as pd  # imported here so that plain text output never pays for pandas
+        data = self.dice_to_numpy(with_total).astype(dtype).reshape(1, -1)
+        return pd.DataFrame(data, columns=self.headers(with_total))
 
-    def dice_to_csv(self, path_or_buf=None) -> None:
+    @profiling.instrumented
+    def dice_to_csv(self, path_or_buf=None):
         """
-        Uses pandas to output the dice roll and its total as a csv file.
-        :param path_or_buf: Where to save the csv output.
-        :return: None.
+        Outputs the dice roll and its total as a csv file in the same layout as pandas, without building a DataFrame.
+        :param path_or_buf: Where to save the csv output, a path or an open buffer.  None returns the CSV as a string.
+        :return: None, or the CSV if 'path_or_buf' is None.
         """
-        self.dice_to_pandas(with_total=True).to_csv(path_or_buf=path_or_buf)
+        # dice_to_pandas has always written floats, so this does too.
+        chunk = RollsChunk(0, self._throws.reshape(1, -1).astype(float), np.asarray([self._total], dtype=float),
+                           self._total)
+        buf = io.StringIO() if path_or_buf is None else path_or_buf
+        with writers.CsvChunkWriter(buf, self.headers(with_total=True)) as writer:
+            writer.write(chunk)
+        if path_or_buf is None:
+            return buf.getvalue()
 
     def __str__(self) -> str:
-        return self.dice_to_pandas(with_total=True).to_string()
+        # laid out like dice_to_pandas(with_total=True).to_string(), whose columns are floats, without pandas
+        columns = [[float(value)] for value in self.rolls_with_total()]
+        return writers.format_text_table(self.headers(with_total=True), columns)
 
     def to_string(self) -> str:
         return self.__str__()
 
 
+# The number of rows Rolls.roll_chunks draws at a time unless told otherwise.
+DEFAULT_CHUNK_SIZE = 65_536
+
+
+class RollsChunk(NamedTuple):
+    """
+    One block of consecutive rows from Rolls.roll_chunks.
+    """
+    start: int  # the row number of the chunk's first row
+    rolls: np.ndarray  # a 2-d array of die rolls, one row per throw
+    totals: np.ndarray  # each throw's transformed total
+    running_total: float  # the untransformed grand total up to and including this chunk
+
+
+class RollsTable(NamedTuple):
+    """
+    One table of Rolls, as Rolls.roll returns it.  The arrays are read-only and nothing changes them afterwards.
+    """
+    rolls: np.ndarray  # a 2-d array of die rolls, one row per throw
+    totals: np.ndarray  # each throw's transformed total
+    grand_total: float  # the transformed grand total
+
+
+class RollsReroll(NamedTuple):
+    """
+    One reroll of some of a table's dice, as returned by the Rolls reroll methods.  A copy of the Rolls can be
+    brought up to date with Rolls.apply_reroll.
+    """
+    rows: np.ndarray  # the row of each rerolled die
+    columns: np.ndarray  # the column of each rerolled die
+    old: np.ndarray  # what they showed before
+    new: np.ndarray  # what they show now
+    changed_rows: np.ndarray  # each row with a rerolled die, once, ascending
+    totals: np.ndarray  # those rows' transformed totals afterwards
+    grand_total: float  # the transformed grand total afterwards
+
+
 class Rolls:
     """
     Rolls represents several dice rolls or throws, and is effectively a list of dice rolls.  Rolls have a Dice object.
     Dice represents one throw (or roll) of several similar dice. Dice have a Die object.
     Die is a single die and its roll or one probability function experiment. Die are atomic.
     """
+    __slots__ = ('_dice', '_transform_fn', '_number_of_rolls', '_stream', '_workers', '_seed', '_rng',
+                 '_rolls', '_totals', '_sum', '_total', '_log')
+
     def __init__(self,
                  dice: Dice,
                  transform_fn: Callable[[float], float] = None,
-                 number_of_rolls: int = 1):
+                 number_of_rolls: int = 1,
+                 stream: bool = False,
+                 workers: int = None,
+                 seed: int = None,
+                 rng: np.random.Generator = None):
         """
         Rolls is a list of Dice rolls.
         :param dice: A Dice object which can be thrown to provide a dice roll.
-        :param transform_fn: A lambda function with one curried numeric parameter which accepts the grand total of
-            the rolls.  transform_fn may be removed in a future version
+        :param transform_fn: A transforms.Transform, or a lambda function with one curried numeric parameter, which
+            accepts the grand total of the rolls.  transform_fn may be removed in a future version
         :param number_of_rolls: The number of times to throw the Dice.  (You can think of this as the number of rows
             in a table of random experiments.)  .
+        :param stream: If True the table is never held in memory.  Rows are drawn chunk by chunk by roll_chunks, and
+            the exporters write each chunk as it is drawn.  rolls() and list_of_totals() stay empty, and total() is
+            set once a pass over the chunks is complete.
+        :param workers: The number of processes which share the rolling.  Each block of rows draws from its own
+            stream spawned from one numpy.random.SeedSequence, so a seed gives bit-identical tables for any number of
+            workers.  None rolls in this process.
+        :param seed: The entropy of that SeedSequence.  If workers are requested without a seed, fresh entropy is
+            drawn and can be read back from seed() to repeat the run.  Any row of a seeded run can be drawn again
+            with regenerate_rows without drawing the rows before it.
+        :param rng: A numpy.random.Generator which overrides the dice's own for an unseeded run in this process.
         """
         if number_of_rolls < 1:
             raise ValueError("Parameter 'number_of_rolls' must be at l.")
+        if seed is not None and rng is not None:
+            raise ValueError("Parameters 'seed' and 'rng' cannot both be used.")
+        if workers is not None and workers > 1 and rng is not None:
+            raise ValueError("Parameters 'workers' and 'rng' cannot both be used.  Workers draw from a seed.")
         self._dice = dice
         self._transform_fn = transform_fn
         self._number_of_rolls = number_of_rolls
+        self._stream = stream
+        self._workers = workers
+        if workers is not None and workers > 1 and seed is None:
+            seed = np.random.SeedSequence().entropy
+        self._seed = seed
+        self._rng = rng
 
-        self._list_of_rolls: list[list[float]] = []
-        self._list_of_totals: list[float] = []
+        self._rolls = np.empty((0, dice.number_of_dice()))
+        self._totals = np.empty(0)
 
+        self._sum: float = 0  # the untransformed grand total, kept up to date by rerolls
         self._total: float = 0
+        self._log = []
 
-        self.roll_n_times()  # ensures 'get' methods are populated.
+        if not stream:
+            self.roll_n_times()  # ensures 'get' methods are populated.
 
-    def roll_n_times(self) -> tuple[list[list[float]], list[float], float]:
+    @profiling.instrumented
+    def roll_n_times(self):
         """
-        Simulates several throws of a set of identical dice.
-        :return: A tuple of a 2-d list of die rolls, a list of each dice throw's total, and a grand total.
+        Simulates several throws of a set of identical dice.  The whole table is drawn as one numpy array and the
+        totals are array reductions.
+        :return: A tuple of a 2-d numpy array of die rolls, a numpy array of each dice throw's total, and a grand total.
         """
         self._clear()
-        for _ in range(self._number_of_rolls):
-            self._dice.dice_throw()
-            current_total = self._dice.total()
-            self._total += current_total
-            self._list_of_totals.append(current_total)
-            self._list_of_rolls.append(self._dice.throws())
+        self._rolls, self._totals = self._dice.dice_throws(self._number_of_rolls,
+                                                           seed=self._seed,
+                                                           workers=self._workers,
+                                                           rng=self._rng)
+        self._sum = self._totals.sum().item()
+        self._total = self._sum
 
         if self._transform_fn is not None:
             self._total = self._transform_fn(self._total)
 
-        return self._list_of_rolls, self._list_of_totals, self._total
+        return self._rolls, self._totals, self._total
+
+    @profiling.instrumented
+    def roll(self, rng: np.random.Generator = None) -> RollsTable:
+        """
+        Rolls the whole table without changing this object, unlike roll_n_times, so one Rolls can serve several
+        threads at once.  A seeded Rolls gives the same table every time; an unseeded one draws from the calling
+        thread's own generator unless it, its dice or their die have their own.
+        :param rng: A generator which overrides this object's own for an unseeded table.
+        :return: A RollsTable.
+        """
+        rolls, totals = self._dice.dice_throws(self._number_of_rolls,
+                                               seed=self._seed,
+                                               workers=self._workers,
+                                               rng=rng or self._rng)
+        grand_total = totals.sum().item()
+        if self._transform_fn is not None:
+            grand_total = self._transform_fn(grand_total)
+        return RollsTable(_frozen(rolls), _frozen(totals), grand_total)
+
+    @profiling.instrumented
+    def reroll(self, rows, columns) -> RollsReroll:
+        """
+        Rerolls single dice in place, and updates only their rows' totals and the grand total, so the cost depends
+        on the number of dice rerolled rather than the size of the table.  Rerolled rows no longer match
+        regenerate_rows.
+        :param rows: The row of each die to reroll.
+        :param columns: The column of each die to reroll.  A die named more than once is rerolled once.
+        :return: A RollsReroll, which is also added to reroll_log().
+        """
+        if self._stream:
+            raise ValueError("A streaming Rolls holds no table to reroll.")
+        cells = _distinct(np.ravel_multi_index((np.asarray(rows, dtype=np.intp).ravel(),
+                                                np.asarray(columns, dtype=np.intp).ravel()), self._rolls.shape))
+        rows, columns = np.unravel_index(cells, self._rolls.shape)
+        old = self._rolls[rows, columns]
+        new = self._dice.draw_dice(cells.size, self._rng)
+        changed_rows = self._replace_dice(rows, columns, new)
+        event = RollsReroll(rows, columns, old, new, changed_rows, self._totals[changed_rows], self._total)
+        self._log.append(event)
+        return event
+
+    def reroll_where(self, predicate: Callable) -> RollsReroll:
+        """
+        Rerolls the dice a predicate picks out.
+        :param predicate: A function from the 2-d numpy array of die rolls to a boolean array, e.g. lambda d: d == 1.
+        :return: A RollsReroll, which is also added to reroll_log().
+        """
+        return self.reroll(*np.nonzero(predicate(self._rolls)))
+
+    def reroll_rows(self, rows) -> RollsReroll:
+        """
+        Rerolls every die of the given rows.
+        :param rows: The rows to reroll.
+        :return: A RollsReroll, which is also added to reroll_log().
+        """
+        rows = _distinct(np.asarray(rows, dtype=np.intp).ravel())
+        number_of_dice = self._dice.number_of_dice()
+        return self.reroll(np.repeat(rows, number_of_dice), np.tile(np.arange(number_of_dice), rows.size))
+
+    def apply_reroll(self, event: RollsReroll) -> type[None]:
+        """
+        Replays a reroll made by a copy of this table, so that both hold the same rolls.
+        :param event: A RollsReroll.
+        :return: None.
+        """
+        self._replace_dice(event.rows, event.columns, event.new)
+        self._log.append(event)
+
+    def _replace_dice(self, rows, columns, new):
+        """
+        Writes new dice into the table and updates the totals of their rows and the grand total by difference.
+        :return: The changed rows.
+        """
+        self._rolls[rows, columns] = new
+        changed_rows = _distinct(rows)
+        totals = _apply_transform(self._dice.transform_fn(), self._rolls[changed_rows].sum(axis=1))
+        self._sum += (totals.sum() - self._totals[changed_rows].sum()).item()
+        self._totals[changed_rows] = totals
+        self._total = self._sum
+        if self._transform_fn is not None:
+            self._total = self._transform_fn(self._total)
+        return changed_rows
+
+    def reroll_log(self) -> list[RollsReroll]:
+        """
+        :return: The rerolls since the table was last rolled, oldest first.
+        """
+        return list(self._log)
+
+    def roll_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Simulates the throws 'chunk_size' rows at a time without storing them, so memory stays constant however many
+        rolls there are.  A streaming Rolls keeps the transformed grand total once the last chunk has been drawn.
+        With several workers the rows are drawn a block per worker at a time, so every worker is busy, and handed out
+        chunk by chunk.
+        :param chunk_size: The most rows in one chunk.  It must be at least 1.
+        :return: A generator of RollsChunk.
+        """
+        if chunk_size < 1:
+            raise ValueError("Parameter 'chunk_size' must be at least 1.")
+        draw_size = chunk_size
+        if self._workers is not None and self._workers > 1:
+            draw_size = max(chunk_size, self._workers * parallel.BLOCK_SIZE)
+        running_total = 0
+        for draw_start in range(0, self._number_of_rolls, draw_size):
+            draw_rolls, draw_totals = self._dice.dice_throws(min(draw_size, self._number_of_rolls - draw_start),
+                                                             seed=self._seed,
+                                                             start=draw_start,
+                                                             workers=self._workers,
+                                                             rng=self._rng)
+            for offset in range(0, len(draw_totals), chunk_size):
+                rolls, totals = draw_rolls[offset:offset + chunk_size], draw_totals[offset:offset + chunk_size]
+                running_total += totals.sum().item()
+                yield RollsChunk(draw_start + offset, rolls, totals, running_total)
+
+        if self._stream:
+            self._total = running_total
+            if self._transform_fn is not None:
+                self._total = self._transform_fn(self._total)
+
+    @profiling.instrumented
+    def regenerate_rows(self, start: int, stop: int):
+        """
+        Draws rows 'start' to 'stop' of a seeded run again.  Each block of rows has its own stream, keyed by the
+        block number, so only the block holding 'start' needs to be replayed from its beginning, not the whole run.
+        :param start: The first row.
+        :param stop: One past the last row.
+        :return: A tuple of a 2-d numpy array of die rolls and a numpy array of each throw's total.
+        """
+        if self._seed is None:
+            raise ValueError("Only a seeded Rolls can regenerate its rows.")
+        if not 0 <= start < stop <= self._number_of_rolls:
+            raise ValueError(f"Rows {start} to {stop} are outside 0 to {self._number_of_rolls}.")
+        return self._dice.dice_throws(stop - start, seed=self._seed, start=start, workers=self._workers)
+
+    def is_streaming(self) -> bool:
+        return self._stream
+
+    def dice(self) -> Dice:
+        """Gets the Dice thrown 'number_of_rolls' times."""
+        return self._dice
+
+    def transform_fn(self) -> Callable[[float], float]:
+        """Gets the transform applied to the grand total, or None."""
+        return self._transform_fn
+
+    def number_of_rolls(self) -> int:
+        return self._number_of_rolls
+
+    def seed(self) -> int:
+        """
+        :return: The SeedSequence entropy this table is drawn from, or None if it draws from a generator.
+        """
+        return self._seed
+
+    def stream_headers(self) -> list[str]:
+        """
+        Headers for the tables written from roll_chunks, which carry a running grand total in the rightmost column.
+        :return: A list of headers.
+        """
+        headers = self._dice.headers(with_total=True)
+        headers.append('running_grand_total')
+        return headers
 
     def _clear(self) -> type[None]:
         """
         Clears the Rolls object for a subsequent set of dice rolls
         :return: None.
         """
-        self._list_of_rolls = []
-        self._list_of_totals = []
+        self._rolls = np.empty((0, self._dice.number_of_dice()))
+        self._totals = np.empty(0)
+        self._sum = 0
         self._total = 0
+        self._log = []
 
+    @profiling.instrumented
     def rolls(self) -> list[list[float]]:
         """
         :return: Makes a deep copy of the 2-D list of die rolls and returns it.
         """
-        outer_list = []
-        for dice_list in self._list_of_rolls:
-            row = []
-            for die in dice_list:
-                row.append(die)
-            outer_list.append(row)
-        return outer_list
+        return self._rolls.tolist()
 
+    @profiling.instrumented
     def list_of_totals(self) -> list[float]:
         """
         :return: Makes a deep copy of the list of each Dice rolls total and returns it.
         """
-        dice_totals = []
-        for dice_total in self._list_of_totals:
-            dice_totals.append(dice_total)
-        return dice_totals
+        return self._totals.tolist()
+
+    def rolls_view(self):
+        """
+        :return: A read-only 2-d numpy view of the die rolls, one row per throw, without copying them.
+        """
+        return _read_only(self._rolls)
+
+    def totals_view(self):
+        """
+        :return: A read-only numpy view of each throw's total, without copying them.
+        """
+        return _read_only(self._totals)
 
     def total(self) -> float:
         """
@@ -350,62 +1059,270 @@ class Rolls:
             headers.append('grand_total')
         return headers
 
+    @profiling.instrumented
     def rolls_with_totals(self) -> list[list[float]]:
         """
         Appends totals to the raw 2-D list of Die rolls
         :return: the 2-D list of die rolls with or without.
         """
         local_rolls = self.rolls()
-        local_totals = self.list_of_totals()
-        for i in range(len(local_rolls)):
-            local_rolls[i].append(local_totals[i])  # row total
-            local_rolls[i].append(self._total)  # grand total
+        for row, row_total in zip(local_rolls, self.list_of_totals()):
+            row.append(row_total)  # row total
+            row.append(self._total)  # grand total
         return local_rolls
 
-    def rolls_to_numpy(self, with_totals: bool = False):
+    @profiling.instrumented
+    def rolls_to_numpy(self, with_totals: bool = False, copy: bool = False):
         """
-        Converts the 2-D list of die rolls to a numpy array, either with or without totals
-        :param with_totals: If True, the row total and grand total are appended to the right two columns
+        The die rolls as a numpy array, either with or without totals.
+        :param with_totals: If True, the row total and grand total are appended to the right two columns, in a new
+            array filled column by column.
+        :param copy: Without totals, False returns a read-only view of the table without copying it, as rolls_view
+            does, and True a writable copy.
         :return: A numpy array of the die rolls, possibly with totals.
         """
         if with_totals:
-            return np.asarray(self.rolls_with_totals())
-        else:
-            return np.asarray(self.rolls())
+            number_of_dice = self._rolls.shape[1]
+            dtype = np.result_type(self._rolls, self._totals, self._total)
+            table = np.empty((len(self._totals), number_of_dice + 2), dtype=dtype)
+            table[:, :number_of_dice] = self._rolls
+            table[:, -2] = self._totals
+            table[:, -1] = self._total
+            return table
+        return self._rolls.copy() if copy else _read_only(self._rolls)
 
-    def rolls_to_pandas(self, with_totals: bool = False):
+    @profiling.instrumented
+    def rolls_to_pandas(self, with_totals: bool = False, dtype=None):
         """
-        Creates a pandas.DataFrame with standard column headings and a sequential index from the 2-D list of Die rolls.
-        :param with_totals: If true row and grand totals are included in the rightmost two columns.
+        Creates a pandas.DataFrame with standard column headings and a sequential index straight from the arrays of
+        die rolls and totals, one typed column at a time, without building a list per row.
+        :param with_totals: If true row and grand totals are included in the rightmost two columns.  The grand total
+            is a scalar which pandas broadcasts down its column.
+        :param dtype: None keeps the dtypes of the arrays.  'compact' uses the smallest dtypes which hold every value,
+            as column_dtypes gives.  'category' makes the die columns categorical, with every face of an IntegerDie or
+            WeightedDie as a category even if it was never rolled, and the row totals compact.  Any other dtype is
+            used for the die and row total columns.
         :return: A pandas.DataFrame from the Die rolls, and possibly the totals.
         """
+        import pandas as pd
+        headers = self.headers(with_totals)
+        if dtype is None:
+            rolls_dtype, totals_dtype = self._rolls.dtype, self._totals.dtype
+        elif isinstance(dtype, str) and dtype in ('compact', 'category'):
+            rolls_dtype, totals_dtype = self.column_dtypes()
+        else:
+            rolls_dtype = totals_dtype = np.dtype(dtype)
+
+        columns = {}
+        for column, header in enumerate(headers[:self._dice.number_of_dice()]):
+            if isinstance(dtype, str) and dtype == 'category':
+                columns[header] = pd.Categorical(self._rolls[:, column], categories=self._faces())
+            else:
+                columns[header] = writers.cast_column(self._rolls[:, column], rolls_dtype)
         if with_totals:
-            return pd.DataFrame(data=self.rolls_with_totals(), columns=self.headers(with_totals))
+            columns[headers[-2]] = writers.cast_column(self._totals, totals_dtype)
+            columns[headers[-1]] = self._total
+        return pd.DataFrame(columns, index=pd.RangeIndex(len(self._totals)), columns=headers)
+
+    @profiling.instrumented
+    def rolls_to_csv(self, path_or_buf=None, compression: str = 'infer', grand_total_footer: bool = False):
+        """
+        Outputs to CSV with totals, in the same layout as pandas but formatted chunk by chunk straight from the
+        arrays, so memory stays flat however many rows there are.
+        :param path_or_buf: Where to save the CSV output, a path or an open buffer.  None returns the CSV as a string.
+        :param compression: None, 'gzip', 'zstd', or 'infer' to choose from a '.gz' or '.zst' suffix.
+        :param grand_total_footer: If True the grand total is written once in a footer line rather than in a column.
+        :return: None, or the CSV if 'path_or_buf' is None.  Outputs a CSV document as a side effect.
+        """
+        buf = io.StringIO() if path_or_buf is None else path_or_buf
+        if self._stream:
+            writer = writers.CsvChunkWriter(buf, self.stream_headers(),
+                                            footer=grand_total_footer,
+                                            compression=compression)
         else:
-            return pd.DataFrame(data=self.rolls(), columns=self.headers(with_totals))
+            writer = writers.CsvChunkWriter(buf, self.headers(with_totals=True),
+                                            grand_total=self._total,
+                                            footer=grand_total_footer,
+                                            compression=compression)
+        self.write_chunks(writer)
+        if path_or_buf is None:
+            return buf.getvalue()
 
-    def rolls_to_csv(self, path_or_buf=None) -> type[None]:
+    @profiling.instrumented
+    def rolls_to_excel(self,
+                       excel_writer,
+                       sheet_name='Sheet1',
+                       float_format=None,
+                       summary: bool = False,
+                       sheets_per_workbook: int = None) -> list:
         """
-        Uses pandas to output to CSV with totals.
-        :param path_or_buf: Where to save the CSV output
-        :return: None. Outputs a CSV document as a side effect.
+        Streams the Die rolls, with totals, into an Excel workbook chunk by chunk with writers.XlsxChunkWriter, in
+        the layout pandas writes but without pandas, so memory stays flat however many rows there are.  Rows past
+        Excel's limit of 1,048,576 continue on further sheets.
+        :param excel_writer: Where to save the output Excel document.  The file path, or an open binary buffer.
+        :param sheet_name: The name of the sheet in the workbook, which later sheets number on from.
+        :param float_format: How to format floating point numbers, e.g. '%.2f'.
+        :param summary: If True the grand total is written once, on a 'Summary' sheet with the moments, quantiles
+            and histograms of the totals and faces, rather than in a column on every row.
+        :param sheets_per_workbook: The most sheets of rows in one workbook, after which further workbooks are
+            written beside the first with '_2', '_3' and so on added to its name.  None puts every sheet in one.
+        :return: The paths of the workbooks written.  Outputs Excel documents as a side effect.
         """
-        self.rolls_to_pandas(with_totals=True).to_csv(path_or_buf=path_or_buf)
+        writer = writers.XlsxChunkWriter(excel_writer,
+                                         self._table_headers(),
+                                         grand_total=None if self._stream else self._total,
+                                         sheet_name=sheet_name,
+                                         float_format=float_format,
+                                         summary=summary,
+                                         sheets_per_workbook=sheets_per_workbook)
+        self.write_chunks(writer)
+        return writer.paths()
 
-    def rolls_to_excel(self, excel_writer, sheet_name='Sheet1', float_format=None) -> type[None]:
+    def _faces(self):
         """
-        Converts to 2-D array of Die rolls, with totals, to Excel using pandas.
-        :param excel_writer: Where to save the output Excel document.  The file path.
-        :param sheet_name: The name of the sheet in the workbook.
-        :param float_format: How to format floating point numbers
-        :return: None, but outputs an Excel document as a side effect.
+        :return: A numpy array of every value one die can show, after its transform, for an IntegerDie or a
+            WeightedDie, or None for any other die.  They are the categories of rolls_to_pandas(dtype='category').
         """
-        self.rolls_to_pandas(with_totals=True).to_excel(excel_writer,
-                                                        sheet_name=sheet_name,
-                                                        float_format=float_format)
+        die = self._dice.die()
+        if isinstance(die, IntegerDie):
+            faces = np.arange(die.get_bottom(), die.get_bottom() + die.get_sides())
+        elif isinstance(die, WeightedDie):
+            faces = die.faces()
+        else:
+            return None
+        return _distinct(np.ravel(_apply_transform(die.transform(), faces)))
+
+    def column_dtypes(self):
+        """
+        The compact dtypes for binary exports.  For an IntegerDie or a WeightedDie they are sized from the values
+        its faces can take under the die and total transforms, so int8 or int16 are enough for ordinary dice.  Each
+        face of a WeightedDie is transformed, as is each face and each possible total under a transform not known to
+        be monotone, such as a lambda; when there are too many of those the columns are int64 or float64.
+        :return: A tuple of the die columns' dtype and the row total column's dtype.
+        """
+        die = self._dice.die()
+        if isinstance(die, (IntegerDie, WeightedDie)):
+            total_transform = self._dice.transform_fn()
+            number_of_dice = self._dice.number_of_dice()
+            if isinstance(die, WeightedDie):
+                values = _apply_transform(die.transform(), np.asarray(die.faces()))
+            else:
+                values = _transformed_range(die.transform(), die.get_bottom(), die.get_bottom() + die.get_sides() - 1)
+            if values is None:
+                ends = np.array([die.get_bottom(), die.get_bottom() + die.get_sides() - 1])
+                rolls_dtype = _wide_dtype(die.transform(), ends)
+                return rolls_dtype, _wide_dtype(total_transform, np.zeros(1, dtype=rolls_dtype))
+            totals = _transformed_range(total_transform, number_of_dice * values.min(), number_of_dice * values.max())
+            if totals is None:
+                return writers.compact_dtype(values), _wide_dtype(total_transform, values[:1] * number_of_dice)
+            return writers.compact_dtype(values), writers.compact_dtype(totals)
+        if not self._stream:
+            return writers.compact_dtype(self._rolls), writers.compact_dtype(self._totals)
+        return np.dtype(np.float64), np.dtype(np.float64)
+
+    @profiling.instrumented
+    def write_chunks(self, writer: writers.ChunkWriter) -> type[None]:
+        """
+        Feeds a chunk writer and closes it.  A streaming Rolls is drawn chunk by chunk; otherwise the table is
+        written in chunks which are views of its arrays.
+        :param writer: a writers.ChunkWriter.
+        :return: None.
+        """
+        with writer:
+            if self._stream:
+                for chunk in self.roll_chunks():
+                    writer.write(chunk)
+            else:
+                running_total = 0
+                for start in range(0, self._number_of_rolls, DEFAULT_CHUNK_SIZE):
+                    rows = slice(start, start + DEFAULT_CHUNK_SIZE)
+                    running_total += self._totals[rows].sum().item()
+                    writer.write(RollsChunk(start, self._rolls[rows], self._totals[rows], running_total))
+            writer.set_grand_total(self._total)
+
+    @profiling.instrumented
+    def summarize(self, max_bins: int = summary.DEFAULT_MAX_BINS) -> summary.RollsSummary:
+        """
+        Aggregates the rolls into exact face and total counts, moments and quantiles.  A streaming Rolls is drawn
+        chunk by chunk and no row is kept, so memory does not grow with the number of rolls.
+        :param max_bins: The most distinct values each histogram counts exactly, as for summary.Histogram.
+        :return: A summary.RollsSummary, which can be merged with the summaries of other runs of the same dice.
+        """
+        rolls_summary = summary.RollsSummary(self._table_headers(), max_bins, self._transform_fn)
+        self.write_chunks(rolls_summary)
+        return rolls_summary
+
+    @profiling.instrumented
+    def rolls_to_npy(self, path) -> type[None]:
+        """
+        Writes the die columns and the row total as one compact 2-d .npy array through a memory map, without pandas.
+        :param path: Where to save the .npy file.
+        :return: None, but outputs a .npy file as a side effect.
+        """
+        dtype = np.promote_types(*self.column_dtypes())
+        self.write_chunks(writers.NpyChunkWriter(path, self._table_headers(), self._number_of_rolls, dtype))
+
+    @profiling.instrumented
+    def rolls_to_npz(self, path) -> type[None]:
+        """
+        Writes the die rolls, the row totals and the grand total as arrays named 'rolls', 'totals' and
+        'grand_total' in one .npz archive.  The table must be held in memory, so use rolls_to_npy when streaming.
+        :param path: Where to save the .npz file.
+        :return: None, but outputs a .npz file as a side effect.
+        """
+        if self._stream:
+            raise ValueError("A streaming Rolls cannot be written to .npz; use rolls_to_npy.")
+        rolls_dtype, totals_dtype = self.column_dtypes()
+        np.savez(path,
+                 rolls=writers.cast_column(self._rolls, rolls_dtype),
+                 totals=writers.cast_column(self._totals, totals_dtype),
+                 grand_total=np.asarray(self._total))
+
+    @profiling.instrumented
+    def rolls_to_mapped(self, path):
+        """
+        Writes the table into a memory-mapped file with a header describing the dice, the seed and the grand total,
+        and opens it.  A streaming Rolls is drawn straight into the file, so the table need not fit in memory.
+        :param path: Where to save the file.
+        :return: A mapped.MappedRolls of the file.
+        """
+        from src.api import mapped
+        return mapped.MappedRolls.create(path, self)
+
+    @profiling.instrumented
+    def rolls_to_arrow(self, path) -> type[None]:
+        """
+        Writes an Arrow IPC file with one compact column per die and a row total column.  It needs pyarrow.
+        :param path: Where to save the Arrow file.
+        :return: None, but outputs an Arrow file as a side effect.
+        """
+        self.write_chunks(writers.ArrowChunkWriter(path, self._table_headers(), *self.column_dtypes()))
+
+    @profiling.instrumented
+    def rolls_to_parquet(self, path) -> type[None]:
+        """
+        Writes a Parquet file with one compact column per die and a row total column.  It needs pyarrow.
+        :param path: Where to save the Parquet file.
+        :return: None, but outputs a Parquet file as a side effect.
+        """
+        self.write_chunks(writers.ParquetChunkWriter(path, self._table_headers(), *self.column_dtypes()))
+
+    def _table_headers(self) -> list[str]:
+        return self.stream_headers() if self._stream else self.headers(with_totals=True)
 
     def to_string(self):
         return self.__str__()
 
     def __str__(self):
-        return self.rolls_to_pandas(with_totals=True).to_string()
+        if self._stream:
+            buf = io.StringIO()
+            self.write_chunks(writers.TextChunkWriter(buf, self.stream_headers()))
+            return buf.getvalue().rstrip('\n')
+        # laid out like rolls_to_pandas(with_totals=True).to_string(), without pandas
+        columns = self._rolls.T.tolist()
+        columns.append(self.list_of_totals())
+        columns.append([self._total] * self._number_of_rolls)
+        return writers.format_text_table(self.headers(with_totals=True), columns)
+
+
+profiling.start_from_environment()
@@ -0,0 +1,414 @@
+# hackable_dice_roller.distribution
+from collections import OrderedDict
+from typing import Callable, NamedTuple
+import os
+import tempfile
+import threading
+import numpy as np
+
+from src.api import core
+from src.api import transforms
+
+# Above this many terms in the result repeated squaring with numpy.convolve is slower than one FFT.
+_FFT_THRESHOLD = 2048
+
+# The most memory, in bytes, the distributions a DistributionCache holds may take, by default.
+DEFAULT_MAX_BYTES = 256 << 20
+
+
+def affine_coefficients(transform: Callable[[float], float]) -> tuple[float, float]:
+    """
+    Reads a transform back as the affine map 'multiplier * y + addend'.
+    :param transform: None, or an affine transforms.Transform such as add_currying and multiply_currying return.
+    :return: A tuple of (multiplier, addend).
+    """
+    if transform is None:
+        return 1, 0
+    if isinstance(transform, transforms.Transform):
+        transform = transforms.compose(transform)  # fuses a composition of affine maps into one
+        if isinstance(transform, transforms.Affine):
+            return transform.multiplier, transform.addend
+    raise ValueError("Only affine transforms, such as add_currying or multiply_currying make, have an exact "
+                     "distribution.")
+
+
+def spec_key(sides: int = 6,
+             base: int = 1,
+             number_of_dice: int = 1,
+             die_transform: Callable[[float], float] = None,
+             dice_transform: Callable[[float], float] = None) -> tuple:
+    """
+    The canonical, hashable description of a distribution, with each transform reduced to its affine coefficients.
+    Transforms which are the same map give the same key, whichever lambda made them.
+    :return: A tuple of (sides, base, number_of_dice, (die multiplier, die addend), (dice multiplier, dice addend)).
+    """
+    if sides <= 0:
+        raise ValueError("Parameter 'sides' must be at least 1")
+    if number_of_dice < 1:
+        raise ValueError("Parameter 'number_of_dice' must be at least 1.")
+    return sides, base, number_of_dice, affine_coefficients(die_transform), affine_coefficients(dice_transform)
+
+
+def dice_spec_key(dice: core.Dice) -> tuple:
+    """
+    The spec_key of a Dice object's total.
+    :param dice: Dice thrown with an IntegerDie.
+    :return: A tuple as from spec_key.
+    """
+    die = dice.die()
+    if not isinstance(die, core.IntegerDie):
+        raise ValueError("Exact distributions are only available for an IntegerDie.")
+    return spec_key(die.get_sides(), die.get_bottom(), dice.number_of_dice(), die.transform(), dice.transform_fn())
+
+
+def _convolution_power(pmf, n: int):
+    """
+    The distribution of the sum of 'n' independent draws from 'pmf', by polynomial convolution.
+    :param pmf: probabilities of the offsets 0, 1, 2, ...
+    :param n: the number of draws, at least 1.
+    :return: probabilities of the offsets 0 .. n * (len(pmf) - 1).
+    """
+    size = n * (len(pmf) - 1) + 1
+    if size > _FFT_THRESHOLD:
+        fft_length = 1 << (size - 1).bit_length()
+        result = np.fft.irfft(np.fft.rfft(pmf, fft_length) ** n, fft_length)[:size]
+        result = np.clip(result, 0, None)  # FFT round-off leaves tiny negative probabilities
+        return result / result.sum()
+
+    result = np.ones(1)
+    power = pmf
+    while n:  # repeated squaring
+        if n & 1:
+            result = np.convolve(result, power)
+        n >>= 1
+        if n:
+            power = np.convolve(power, power)
+    return result
+
+
+class DiceDistribution:
+    """
+    DiceDistribution is the exact probability distribution of one throw's total of 'number_of_dice' integer dice,
+    computed without sampling.  The die and total transforms must be affine, as from add_currying or
+    multiply_currying.
+    """
+    def __init__(self,
+                 sides: int = 6,
+                 base: int = 1,
+                 number_of_dice: int = 1,
+                 die_transform: Callable[[float], float] = None,
+                 dice_transform: Callable[[float], float] = None):
+        """
+        :param sides: The number of sides on each die.  It must be at least 1.
+        :param base: The lowest face of each die.
+        :param number_of_dice: The number of dice in the throw.  It must be at least 1.
+        :param die_transform: A curried transform applied to each die, as for IntegerDie.
+        :param dice_transform: A curried transform applied to the throw's total, as for Dice.
+        """
+        self._set_spec(*spec_key(sides, base, number_of_dice, die_transform, dice_transform))
+        self._set_pmf(_convolution_power(np.full(sides, 1 / sides), number_of_dice))
+
+    def _set_spec(self, sides: int, base: int, number_of_dice: int, die_affine: tuple, dice_affine: tuple):
+        self._spec = sides, base, number_of_dice, tuple(die_affine), tuple(dice_affine)
+        self._sides = sides
+        self._base = base
+        self._number_of_dice = number_of_dice
+        die_multiplier, die_addend = die_affine
+        dice_multiplier, dice_addend = dice_affine
+        # total = multiplier * (sum of face offsets) + offset
+        self._multiplier = dice_multiplier * die_multiplier
+        self._offset = dice_multiplier * number_of_dice * (die_multiplier * base + die_addend) + dice_addend
+
+    def _set_pmf(self, probabilities):
+        """
+        Lays the probabilities of the offsets 0, 1, 2, ... out over the transformed totals.
+        """
+        self._offset_pmf = probabilities  # kept whole, as the disk tier shares it with every base and transform
+        values = self._multiplier * np.arange(len(probabilities)) + self._offset
+        if self._multiplier == 0:
+            values, probabilities = values[:1].copy(), np.ones(1)  # a copy, so the whole range is not kept
+        elif self._multiplier < 0:
+            values, probabilities = values[::-1], probabilities[::-1]
+        self._values = values
+        self._pmf = probabilities
+        self._cdf = np.cumsum(probabilities)
+        self._cdf[-1] = 1.0
+
+    @classmethod
+    def _from_pmf(cls, spec: tuple, probabilities):
+        """
+        Rebuilds a distribution from a spec_key and the probabilities of its face offsets, without convolving.
+        """
+        distribution = cls.__new__(cls)
+        sides, base, number_of_dice, die_affine, dice_affine = spec
+        distribution._set_spec(sides, base, number_of_dice, die_affine, dice_affine)
+        distribution._set_pmf(probabilities)
+        return distribution
+
+    @classmethod
+    def from_dice(cls, dice: core.Dice):
+        """
+        Builds the exact distribution of a Dice object's total.
+        :param dice: Dice thrown with an IntegerDie.
+        :return: A DiceDistribution.
+        """
+        return cls._from_spec(dice_spec_key(dice))
+
+    @classmethod
+    def _from_spec(cls, spec: tuple):
+        sides, _, number_of_dice, _, _ = spec
+        return cls._from_pmf(spec, _convolution_power(np.full(sides, 1 / sides), number_of_dice))
+
+    def spec(self) -> tuple:
+        """
+        :return: The canonical spec_key of this distribution.
+        """
+        return self._spec
+
+    def nbytes(self) -> int:
+        """
+        :return: The memory its arrays take, in bytes.  The probabilities of the totals are a view of those of the
+            face offsets, or a single 1.
+        """
+        return self._offset_pmf.nbytes + self._values.nbytes + self._cdf.nbytes
+
+    def support(self):
+        """
+        :return: A numpy array of every possible total in ascending order.
+        """
+        return self._values.copy()
+
+    def pmf(self):
+        """
+        :return: A numpy array of the probability of each total in support().
+        """
+        return self._pmf.copy()
+
+    def cdf(self):
+        """
+        :return: A numpy array of the probability of a total less than or equal to each total in support().
+        """
+        return self._cdf.copy()
+
+    def probability(self, total: float) -> float:
+        """
+        :param total: A possible total.
+        :return: The probability of throwing exactly 'total'.
+        """
+        if self._multiplier == 0:
+            return 1.0 if np.isclose(total, self._offset, rtol=0, atol=1e-9) else 0.0
+        # the totals are a lattice, so the face offset is found exactly rather than by a relative tolerance, which
+        # would match several neighbouring totals of a wide support
+        offset = (total - self._offset) / self._multiplier
+        index = round(offset)
+        if not 0 <= index < len(self._offset_pmf) or abs(offset - index) > 1e-9 * max(1, index):
+            return 0.0
+        return float(self._offset_pmf[index])
+
+    def cumulative(self, total: float) -> float:
+        """
+        :param total: Any number.
+        :return: The probability of throwing 'total' or less.
+        """
+        index = np.searchsorted(self._values, total, side='right')
+        return 0.0 if index == 0 else float(self._cdf[index - 1])
+
+    def quantile(self, q: float) -> float:
+        """
+        :param q: A probability between 0 and 1.
+        :return: The smallest total whose cumulative probability is at least 'q'.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("Parameter 'q' must be between 0 and 1.")
+        index = np.searchsorted(self._cdf, q - 1e-12, side='left')
+        return self._values[min(index, len(self._values) - 1)].item()
+
+    def mean(self) -> float:
+        """
+        :return: The expected total, in closed form.
+        """
+        return self._multiplier * self._number_of_dice * (self._sides - 1) / 2 + self._offset
+
+    def variance(self) -> float:
+        """
+        :return: The variance of the total, in closed form.
+        """
+        return self._multiplier ** 2 * self._number_of_dice * (self._sides ** 2 - 1) / 12
+
+    def std(self) -> float:
+        """
+        :return: The standard deviation of the total.
+        """
+        return self.variance() ** 0.5
+
+    def headers(self) -> list[str]:
+        """
+        :return: Standard headers for a distribution table.
+        """
+        return ['total', 'probability', 'cumulative']
+
+    def to_pandas(self):
+        """
+        :return: A pandas.DataFrame with one row per possible total.
+        """
+        import pandas as pd
+        return pd.DataFrame({'total': self._values, 'probability': self._pmf, 'cumulative': self._cdf},
+                            columns=self.headers())
+
+    def to_string(self) -> str:
+        return self.__str__()
+
+    def __str__(self) -> str:
+        return self.to_pandas().to_string(index=False)
+
+
+class CacheInfo(NamedTuple):
+    hits: int  # found in memory
+    disk_hits: int  # found on disk
+    misses: int  # computed
+    size: int  # distributions held in memory
+    maxsize: int
+    nbytes: int  # the memory they take
+    maxbytes: int
+
+
+class DistributionCache:
+    """
+    DistributionCache keeps the distributions most recently asked for, keyed by spec_key, so that popular dice such
+    as 3d6 or 2d20 are convolved once.  Distributions are immutable, so one object is shared by every caller.  An
+    optional directory keeps the probabilities on disk as well, for other processes and later runs.
+    """
+    def __init__(self, maxsize: int = 256, directory=None, maxbytes: int = DEFAULT_MAX_BYTES):
+        """
+        :param maxsize: The most distributions held in memory.  The least recently used is dropped first.
+        :param directory: A directory for the persistent tier, created if needed.  None keeps the cache in memory.
+        :param maxbytes: The most memory the distributions held may take.  The least recently used are dropped
+            first, and a distribution larger than this on its own is returned without being held.
+        """
+        if maxsize < 1:
+            raise ValueError("Parameter 'maxsize' must be at least 1.")
+        if maxbytes < 1:
+            raise ValueError("Parameter 'maxbytes' must be at least 1.")
+        self._maxsize = maxsize
+        self._maxbytes = maxbytes
+        self._nbytes = 0
+        self._directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self._distributions: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+    def get(self,
+            sides: int = 6,
+            base: int = 1,
+            number_of_dice: int = 1,
+            die_transform: Callable[[float], float] = None,
+            dice_transform: Callable[[float], float] = None) -> DiceDistribution:
+        """
+        The distribution DiceDistribution(sides, base, number_of_dice, die_transform, dice_transform) would compute.
+        :return: A shared DiceDistribution.
+        """
+        return self.get_spec(spec_key(sides, base, number_of_dice, die_transform, dice_transform))
+
+    def from_dice(self, dice: core.Dice) -> DiceDistribution:
+        """
+        :param dice: Dice thrown with an IntegerDie.
+        :return: The shared DiceDistribution of the dice's total.
+        """
+        return self.get_spec(dice_spec_key(dice))
+
+    def get_spec(self, spec: tuple) -> DiceDistribution:
+        """
+        :param spec: a tuple from spec_key.
+        :return: The shared DiceDistribution for 'spec', from memory, from disk or computed.
+        """
+        with self._lock:
+            distribution = self._distributions.get(spec)
+            if distribution is not None:
+                self._distributions.move_to_end(spec)
+                self._hits += 1
+                return distribution
+
+        distribution = self._load(spec)
+        with self._lock:
+            if distribution is not None:
+                self._disk_hits += 1
+            else:
+                self._misses += 1
+        if distribution is None:
+            distribution = DiceDistribution._from_spec(spec)
+            self._save(spec, distribution)
+
+        nbytes = distribution.nbytes()
+        if nbytes > self._maxbytes:
+            return distribution
+        with self._lock:
+            replaced = self._distributions.pop(spec, None)  # another thread computed it meanwhile
+            if replaced is not None:
+                self._nbytes -= replaced.nbytes()
+            self._distributions[spec] = distribution
+            self._nbytes += nbytes
+            while len(self._distributions) > self._maxsize or self._nbytes > self._maxbytes:
+                _, dropped = self._distributions.popitem(last=False)
+                self._nbytes -= dropped.nbytes()
+        return distribution
+
+    def _path(self, spec: tuple) -> str:
+        """
+        The file for a spec's face offset probabilities, which only depend on the sides and the number of dice, so
+        every base and transform of the same dice shares it.
+        """
+        sides, _, number_of_dice, _, _ = spec
+        return os.path.join(self._directory, f"{sides}_sides_{number_of_dice}_dice.npy")
+
+    def _load(self, spec: tuple):
+        """
+        :return: The distribution stored on disk for 'spec', or None.
+        """
+        if self._directory is None:
+            return None
+        try:
+            probabilities = np.load(self._path(spec))
+        except (OSError, ValueError):  # missing, or left half written by a process which died
+            return None
+        sides, _, number_of_dice, _, _ = spec
+        if probabilities.shape != (number_of_dice * (sides - 1) + 1,):
+            return None  # not the face offsets of these dice, so computed again and overwritten
+        return DiceDistribution._from_pmf(spec, probabilities)
+
+    def _save(self, spec: tuple, distribution: DiceDistribution) -> type[None]:
+        """
+        Stores the probabilities of the face offsets, which are written to a temporary file and renamed, so that
+        readers never see a partial file.
+        """
+        if self._directory is None:
+            return
+        descriptor, temporary = tempfile.mkstemp(dir=self._directory, suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as file:
+            np.save(file, distribution._offset_pmf)
+        os.replace(temporary, self._path(spec))
+
+    def cache_info(self) -> CacheInfo:
+        """
+        :return: The hit and miss counters, for monitoring.
+        """
+        with self._lock:
+            return CacheInfo(self._hits, self._disk_hits, self._misses, len(self._distributions), self._maxsize,
+                             self._nbytes, self._maxbytes)
+
+    def clear(self) -> type[None]:
+        """
+        Empties the memory tier and zeroes the counters.  Files on disk are left alone.
+        :return: None.
+        """
+        with self._lock:
+            self._distributions.clear()
+            self._nbytes = 0
+            self._hits = self._disk_hits = self._misses = 0
+
+
+# The cache shdroll and the roll service share.
+default_cache = DistributionCache()
@@ -0,0 +1,311 @@
+# hackable_dice_roller.mapped
+"""
+A disk-backed table of rolls, for tables larger than memory.
+
+    store = mapped.MappedRolls.create('audit.hdr', Rolls(dice, number_of_rolls=10 ** 9, seed=7, stream=True))
+    store = mapped.MappedRolls('audit.hdr')     # re-opened later without reading the rows
+    rolls, totals = store[500_000_000:500_000_010]
+
+The file starts with an 8 byte magic string and the length of a JSON header describing the dice, the seed, the
+dtypes and the grand total.  The die rolls follow as one C-ordered 2-d array and then the row totals, each starting
+on a page boundary, and both are opened as numpy memory maps so that rows are only read when they are touched.
+"""
+import json
+import os
+import numpy as np
+
+from src.api import core
+from src.api import summary
+from src.api import writers
+
+MAGIC = b'HDRMAP01'
+
+# The arrays start on multiples of this many bytes, the common page size.
+_ALIGNMENT = 4096
+
+# Room kept in the header for the grand total, which is only known after the last row is written.
+_GRAND_TOTAL_ROOM = 256
+
+
+def _aligned(size: int) -> int:
+    return -(-size // _ALIGNMENT) * _ALIGNMENT
+
+
+def _plain(value):
+    """
+    :return: 'value' as a Python number if it is a numpy scalar, so that it can be written as JSON.
+    """
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def dice_spec(rolls: core.Rolls) -> dict:
+    """
+    Describes the dice a Rolls throws, for the header of a mapped file.  Transforms are recorded by their repr.
+    :param rolls: a core.Rolls.
+    :return: A JSON-ready dict.
+    """
+    dice = rolls.dice()
+    die = dice.die()
+    spec = {'die': type(die).__name__,
+            'die_name': die.die_name(),
+            'number_of_dice': dice.number_of_dice()}
+    if isinstance(die, core.IntegerDie):
+        spec.update(sides=die.get_sides(), base=die.get_bottom())
+    elif isinstance(die, core.WeightedDie):
+        spec.update(faces=die.faces().tolist(), probabilities=die.probabilities().tolist())
+    elif hasattr(die, 'plan'):
+        spec.update(expression=die.plan().expression())
+    for name, transform in (('die_transform', die.transform()),
+                            ('total_transform', dice.transform_fn()),
+                            ('grand_total_transform', rolls.transform_fn())):
+        spec[name] = None if transform is None else repr(transform)
+    return spec
+
+
+class MappedChunkWriter(writers.ChunkWriter):
+    """
+    Writes the chunks of a Rolls into a mapped file, copying each one straight into the memory map.  The header is
+    written again on close, with the grand total.
+    """
+    def __init__(self,
+                 path,
+                 headers: list[str],
+                 number_of_rolls: int,
+                 rolls_dtype,
+                 totals_dtype,
+                 spec: dict = None,
+                 seed: int = None):
+        """
+        :param path: Where to save the file.
+        :param headers: one header per die, then the row total's header and the grand total's.
+        :param number_of_rolls: The number of rows the file will hold.
+        :param rolls_dtype: The dtype of the die columns, such as one from Rolls.column_dtypes.
+        :param totals_dtype: The dtype of the row total column.
+        :param spec: A description of the dice, such as dice_spec returns.
+        :param seed: The seed of the rolls, or None.
+        """
+        super().__init__(headers)
+        number_of_dice = len(headers) - 2
+        self._path = path
+        self._header = {'format': 1,
+                        'headers': headers[:-1],
+                        'number_of_rolls': number_of_rolls,
+                        'number_of_dice': number_of_dice,
+                        'rolls_dtype': np.dtype(rolls_dtype).str,
+                        'totals_dtype': np.dtype(totals_dtype).str,
+                        'seed': _plain(seed),
+                        'spec': spec or {},
+                        'grand_total': None}
+        header_size = len(json.dumps(self._header).encode()) + len(MAGIC) + 8 + _GRAND_TOTAL_ROOM
+        rolls_offset = _aligned(header_size)
+        totals_offset = rolls_offset + _aligned(number_of_rolls * number_of_dice * np.dtype(rolls_dtype).itemsize)
+        size = totals_offset + number_of_rolls * np.dtype(totals_dtype).itemsize
+        self._header.update(rolls_offset=rolls_offset, totals_offset=totals_offset)
+
+        with open(path, 'wb') as file:
+            file.truncate(size)  # sparse where the file system allows, so nothing is written twice
+        self._write_header()
+        self._rolls = np.memmap(path, dtype=rolls_dtype, mode='r+', offset=rolls_offset,
+                                shape=(number_of_rolls, number_of_dice))
+        self._totals = np.memmap(path, dtype=totals_dtype, mode='r+', offset=totals_offset,
+                                 shape=(number_of_rolls,))
+
+    def _write_header(self) -> type[None]:
+        encoded = json.dumps(self._header).encode()
+        if len(MAGIC) + 8 + len(encoded) > self._header['rolls_offset']:
+            raise ValueError("The grand total is too long for the header of the mapped file.")
+        with open(self._path, 'r+b') as file:
+            file.write(MAGIC)
+            file.write(len(encoded).to_bytes(8, 'little'))
+            file.write(encoded)
+
+    def _write(self, chunk) -> type[None]:
+        rows = slice(chunk.start, chunk.start + len(chunk.totals))
+        self._rolls[rows] = writers.cast_column(chunk.rolls, self._rolls.dtype)
+        self._totals[rows] = writers.cast_column(chunk.totals, self._totals.dtype)
+
+    def set_grand_total(self, grand_total: float) -> type[None]:
+        self._header['grand_total'] = _plain(grand_total)
+
+    def close(self) -> type[None]:
+        if self._rolls is None:
+            return
+        self._rolls.flush()
+        self._totals.flush()
+        self._rolls = self._totals = None
+        self._write_header()
+
+
+def read_header(path) -> dict:
+    """
+    :param path: A mapped file.
+    :return: The dict in its header.
+    """
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"'{path}' is not a mapped rolls file.")
+        length = int.from_bytes(file.read(8), 'little')
+        return json.loads(file.read(length))
+
+
+class MappedRolls:
+    """
+    MappedRolls is a read-only table of rolls kept in a file and opened as numpy memory maps, so it can be far larger
+    than memory.  Opening one reads only the header; rows are paged in by the operating system when they are
+    touched, so random access to any row and slicing cost the same wherever the rows are.  It has the read side of
+    Rolls: views, headers, chunks for any writers.ChunkWriter, and summaries.
+    """
+    __slots__ = ('_path', '_header', '_rolls', '_totals')
+
+    def __init__(self, path):
+        """
+        Opens a mapped file made by create or Rolls.rolls_to_mapped.
+        :param path: The file.
+        """
+        self._path = os.fspath(path)
+        self._header = read_header(path)
+        number_of_rolls = self._header['number_of_rolls']
+        self._rolls = np.memmap(path, dtype=np.dtype(self._header['rolls_dtype']), mode='r',
+                                offset=self._header['rolls_offset'],
+                                shape=(number_of_rolls, self._header['number_of_dice']))
+        self._totals = np.memmap(path, dtype=np.dtype(self._header['totals_dtype']), mode='r',
+                                 offset=self._header['totals_offset'], shape=(number_of_rolls,))
+
+    @classmethod
+    def create(cls, path, rolls: core.Rolls) -> 'MappedRolls':
+        """
+        Writes a Rolls into a new mapped file chunk by chunk and opens it.  A streaming Rolls is drawn straight into
+        the file, so the table never has to fit in memory.
+        :param path: Where to save the file.
+        :param rolls: a core.Rolls.
+        :return: A MappedRolls of the file.
+        """
+        rolls.write_chunks(MappedChunkWriter(path,
+                                             rolls.headers(with_totals=True),
+                                             rolls.number_of_rolls(),
+                                             *rolls.column_dtypes(),
+                                             spec=dice_spec(rolls),
+                                             seed=rolls.seed()))
+        return cls(path)
+
+    def path(self) -> str:
+        return self._path
+
+    def spec(self) -> dict:
+        """
+        :return: A copy of the description of the dice the rolls were thrown with, as dice_spec made it.
+        """
+        return dict(self._header['spec'])
+
+    def seed(self) -> int:
+        """
+        :return: The seed the rolls were drawn from, or None.
+        """
+        return self._header['seed']
+
+    def number_of_rolls(self) -> int:
+        return self._header['number_of_rolls']
+
+    def number_of_dice(self) -> int:
+        return self._header['number_of_dice']
+
+    def total(self) -> float:
+        """
+        :return: The grand total of all the Die throws.
+        """
+        return self._header['grand_total']
+
+    def headers(self, with_totals: bool = False) -> list[str]:
+        """
+        :param with_totals: True includes the row total and grand total headers.
+        :return: A list of headers, as Rolls.headers gives.
+        """
+        headers = list(self._header['headers'])
+        return headers + ['grand_total'] if with_totals else headers[:-1]
+
+    def column_dtypes(self):
+        """
+        :return: A tuple of the die columns' dtype and the row total column's dtype.
+        """
+        return self._rolls.dtype, self._totals.dtype
+
+    def rolls_view(self):
+        """
+        :return: A read-only 2-d memory map of the die rolls, one row per throw.
+        """
+        return self._rolls
+
+    def totals_view(self):
+        """
+        :return: A read-only memory map of each throw's total.
+        """
+        return self._totals
+
+    def rolls_to_numpy(self, with_totals: bool = False):
+        """
+        :param with_totals: If True, the row total and grand total are appended to the right two columns, which
+            copies the whole table into memory.
+        :return: Without totals, the read-only memory map of the die rolls itself; nothing is copied.
+        """
+        if with_totals:
+            grand_totals = np.full(len(self._totals), self.total())
+            return np.column_stack((self._rolls, self._totals, grand_totals))
+        return self._rolls
+
+    def __len__(self) -> int:
+        return self.number_of_rolls()
+
+    def __getitem__(self, rows):
+        """
+        :param rows: A row, a slice of rows or an array of row numbers.
+        :return: A tuple of the die rolls and the totals of those rows.  Slices are views into the file.
+        """
+        return self._rolls[rows], self._totals[rows]
+
+    def roll_chunks(self, chunk_size: int = core.DEFAULT_CHUNK_SIZE):
+        """
+        Reads the table 'chunk_size' rows at a time, as Rolls.roll_chunks draws it.
+        :param chunk_size: The most rows in one chunk.  It must be at least 1.
+        :return: A generator of core.RollsChunk whose arrays are views into the file.
+        """
+        if chunk_size < 1:
+            raise ValueError("Parameter 'chunk_size' must be at least 1.")
+        running_total = 0
+        for start in range(0, self.number_of_rolls(), chunk_size):
+            rows = slice(start, start + chunk_size)
+            running_total += self._totals[rows].sum().item()
+            yield core.RollsChunk(start, self._rolls[rows], self._totals[rows], running_total)
+
+    def write_chunks(self, writer: writers.ChunkWriter) -> type[None]:
+        """
+        Feeds a chunk writer and closes it.
+        :param writer: a writers.ChunkWriter.
+        :return: None.
+        """
+        with writer:
+            for chunk in self.roll_chunks():
+                writer.write(chunk)
+            writer.set_grand_total(self.total())
+
+    def summarize(self, max_bins: int = summary.DEFAULT_MAX_BINS) -> summary.RollsSummary:
+        """
+        Aggregates the table chunk by chunk, as Rolls.summarize does.
+        :param max_bins: The most distinct values each histogram counts exactly, as for summary.Histogram.
+        :return: A summary.RollsSummary.
+        """
+        rolls_summary = summary.RollsSummary(self.headers(with_totals=True), max_bins)
+        self.write_chunks(rolls_summary)
+        return rolls_summary
+
+    def close(self) -> type[None]:
+        """
+        Drops this object's maps.  Views handed out earlier stay valid until they are released too.
+        :return: None.
+        """
+        self._rolls = self._totals = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,365 @@
+# hackable_dice_roller.notation
+"""
+Dice notation, e.g. '4d6kh3 + 2d8! - 1', compiled once into a plan which rolls any number of trials as numpy arrays.
+
+    NdS         N dice of S sides, numbered 1 to S.  N defaults to 1 and 'd%' is a d100.
+    khK, kK     keep the highest K dice          klK      keep the lowest K dice
+    dhK         drop the highest K dice          dlK      drop the lowest K dice
+    !           explode: a die showing its highest face is rolled again and the new roll added to it, repeatedly
+    rP          reroll a die showing P until it does not
+    roP         reroll a die showing P once
+    + - * /     arithmetic on totals and numbers, with parentheses and unary minus
+
+An explosion or reroll point may be written '=P' (the default), '<P' for P or lower, or '>P' for P or higher, as in
+'r<2' or '!>5'.  A pool's rerolls happen first, then its explosions, then keep or drop.
+"""
+import re
+from functools import lru_cache, partial
+import numpy as np
+
+from src.api import core
+from src.api import parallel
+
+# An exploding die stops after this many extra rolls, which a die of 2 or more sides reaches with a probability of
+# at most 2 ** -100.
+_MAX_REPEATS = 100
+
+_TOKEN = re.compile(r"\s*(?:(\d+(?:\.\d+)?)|(kh|kl|dh|dl|ro|[kdr!<>=%+\-*/()]))")
+
+
+def _tokenize(expression: str) -> list[tuple[str, int]]:
+    """
+    :return: A list of (token, position) tuples, ending with ('', len(expression)).
+    """
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if match is None:
+            raise ValueError(f"Unexpected '{expression[position:].strip()[0]}' at {position} in '{expression}'.")
+        tokens.append((match.group(1) or match.group(2), match.start(match.lastindex)))
+        position = match.end()
+    tokens.append(('', len(expression)))
+    return tokens
+
+
+def _matches(values, point: tuple[str, int]):
+    """
+    :param point: a comparison, '=', '<' (at most) or '>' (at least), and a face.
+    :return: A boolean numpy array of the values at the point.
+    """
+    comparison, face = point
+    if comparison == '<':
+        return values <= face
+    if comparison == '>':
+        return values >= face
+    return values == face
+
+
+class _Constant:
+    def __init__(self, value):
+        self.value = value
+
+    def evaluate(self, shape, rng):
+        return np.full(shape, self.value)
+
+    def __str__(self):
+        return str(self.value)
+
+
+class _Negate:
+    def __init__(self, operand):
+        self.operand = operand
+
+    def evaluate(self, shape, rng):
+        return -self.operand.evaluate(shape, rng)
+
+    def __str__(self):
+        return f"-{self.operand}"
+
+
+class _Arithmetic:
+    _OPERATORS = {'+': np.add, '-': np.subtract, '*': np.multiply, '/': np.true_divide}
+
+    def __init__(self, operator: str, left, right):
+        self.operator = operator
+        self.left = left
+        self.right = right
+
+    def evaluate(self, shape, rng):
+        left = self.left.evaluate(shape, rng)
+        return self._OPERATORS[self.operator](left, self.right.evaluate(shape, rng))
+
+    def __str__(self):
+        return f"({self.left} {self.operator} {self.right})"
+
+
+class _DicePool:
+    """
+    A pool of identical dice rolled for every trial at once, as a 2-d array with one row per trial.
+    """
+    def __init__(self, count: int, sides: int):
+        self.count = count
+        self.sides = sides
+        self.reroll = None  # (point, once)
+        self.explode = None  # point
+        self.keep = None  # (slice of the sorted pool, notation)
+
+    def _draw(self, rng, size):
+        return rng.integers(1, self.sides + 1, size=size)
+
+    def evaluate(self, shape, rng):
+        rolls = self._draw(rng, shape + (self.count,))
+        if self.reroll is not None:
+            point, once = self.reroll
+            for _ in range(1 if once else _MAX_REPEATS):
+                again = _matches(rolls, point)
+                if not again.any():
+                    break
+                rolls[again] = self._draw(rng, int(again.sum()))
+        if self.explode is not None:
+            flat = rolls.reshape(-1)
+            exploding = np.flatnonzero(_matches(flat, self.explode))
+            for _ in range(_MAX_REPEATS):
+                if not exploding.size:
+                    break
+                extra = self._draw(rng, exploding.size)
+                flat[exploding] += extra
+                exploding = exploding[_matches(extra, self.explode)]
+        if self.keep is not None:
+            rolls = np.sort(rolls, axis=-1)[..., self.keep[0]]
+        return rolls.sum(axis=-1)
+
+    def __str__(self):
+        text = f"{self.count}d{self.sides}"
+        if self.reroll is not None:
+            (comparison, face), once = self.reroll
+            text += f"{'ro' if once else 'r'}{'' if comparison == '=' else comparison}{face}"
+        if self.explode is not None:
+            comparison, face = self.explode
+            text += '!' if self.explode == ('=', self.sides) else f"!{'' if comparison == '=' else comparison}{face}"
+        if self.keep is not None:
+            text += self.keep[1]
+        return text
+
+
+class _Parser:
+    """
+    A recursive descent parser:  expression = term (('+' | '-') term)*,  term = factor (('*' | '/') factor)*,
+    factor = '-' factor | '(' expression ')' | number | dice.
+    """
+    def __init__(self, expression: str):
+        self._expression = expression
+        self._tokens = _tokenize(expression)
+        self._index = 0
+
+    def _peek(self) -> str:
+        return self._tokens[self._index][0]
+
+    def _next(self) -> str:
+        token = self._tokens[self._index][0]
+        self._index += 1
+        return token
+
+    def _error(self, message: str):
+        position = self._tokens[self._index][1]
+        return ValueError(f"{message} at {position} in '{self._expression}'.")
+
+    def _integer(self, what: str) -> int:
+        token = self._peek()
+        if not token.isdigit():
+            raise self._error(f"Expected {what}")
+        self._next()
+        return int(token)
+
+    def parse(self):
+        node = self._expression_node()
+        if self._peek() != '':
+            raise self._error(f"Unexpected '{self._peek()}'")
+        return node
+
+    def _expression_node(self):
+        node = self._term()
+        while self._peek() in ('+', '-'):
+            node = _Arithmetic(self._next(), node, self._term())
+        return node
+
+    def _term(self):
+        node = self._factor()
+        while self._peek() in ('*', '/'):
+            node = _Arithmetic(self._next(), node, self._factor())
+        return node
+
+    def _factor(self):
+        token = self._peek()
+        if token == '-':
+            self._next()
+            return _Negate(self._factor())
+        if token == '(':
+            self._next()
+            node = self._expression_node()
+            if self._next() != ')':
+                self._index -= 1
+                raise self._error("Expected ')'")
+            return node
+        if token == 'd':
+            return self._dice(1)
+        if token and token[0].isdigit():
+            self._next()
+            if self._peek() == 'd':
+                if '.' in token:
+                    raise self._error("The number of dice must be a whole number")
+                return self._dice(int(token))
+            return _Constant(float(token) if '.' in token else int(token))
+        raise self._error("Expected a number, dice or '('" if token else "Unexpected end")
+
+    def _point(self, default: int) -> tuple[str, int]:
+        comparison = '='
+        if self._peek() in ('=', '<', '>'):
+            comparison = self._next()
+        elif not self._peek().isdigit():
+            return comparison, default
+        return comparison, self._integer("a face")
+
+    def _dice(self, count: int):
+        self._next()  # 'd'
+        if self._peek() == '%':
+            self._next()
+            sides = 100
+        else:
+            sides = self._integer("the number of sides")
+        if count < 1 or sides < 1:
+            raise self._error("Dice need at least 1 die of at least 1 side")
+        pool = _DicePool(count, sides)
+        while self._peek() in ('kh', 'k', 'kl', 'dh', 'dl', '!', 'r', 'ro'):
+            modifier = self._next()
+            if modifier == '!':
+                pool.explode = self._point(sides)
+                if _matches(np.arange(1, sides + 1), pool.explode).all():
+                    raise self._error("Every face would explode")
+            elif modifier in ('r', 'ro'):
+                point = self._point(None)
+                if point[1] is None:
+                    raise self._error("Expected the face to reroll")
+                if modifier == 'r' and _matches(np.arange(1, sides + 1), point).all():
+                    raise self._error("Every face would be rerolled")
+                pool.reroll = point, modifier == 'ro'
+            else:
+                n = self._integer("the number of dice")
+                if n > count:
+                    raise self._error(f"Cannot {'keep' if modifier[0] == 'k' else 'drop'} {n} of {count} dice")
+                pool.keep = {'kh': slice(count - n, None),
+                             'k': slice(count - n, None),
+                             'kl': slice(None, n),
+                             'dh': slice(None, count - n),
+                             'dl': slice(n, None)}[modifier], f"{modifier}{n}"
+        return pool
+
+
+class DicePlan:
+    """
+    DicePlan is a compiled dice expression.  Each pool of dice is rolled for every trial in one numpy call, and
+    keep, drop, reroll and explode work on whole arrays, so millions of trials cost a handful of array operations.
+    Plans are immutable and shared through compile_expression's cache.
+    """
+    def __init__(self, expression: str):
+        """
+        :param expression: an expression in dice notation.  See this module's documentation.
+        """
+        self._expression = expression
+        self._root = _Parser(expression).parse()
+
+    def expression(self) -> str:
+        return self._expression
+
+    def number_of_dice(self) -> int:
+        """
+        :return: The dice one trial rolls before rerolls and explosions, which bounds the memory a roll needs.
+        """
+        count, nodes = 0, [self._root]
+        while nodes:
+            node = nodes.pop()
+            if isinstance(node, _DicePool):
+                count += node.count
+            elif isinstance(node, _Negate):
+                nodes.append(node.operand)
+            elif isinstance(node, _Arithmetic):
+                nodes += [node.left, node.right]
+        return count
+
+    def roll(self, trials=None, rng: np.random.Generator = None):
+        """
+        Evaluates the expression.
+        :param trials: None for one result, or an int or a tuple of ints giving the shape of an array of results.
+        :param rng: The numpy.random.Generator to draw from.  None uses the calling thread's own generator.
+        :return: One result, or a numpy array of independent results.
+        """
+        rng = rng or parallel.thread_rng()
+        if trials is None:
+            return self._root.evaluate((), rng).item()
+        shape = (trials,) if isinstance(trials, int) else tuple(trials)
+        return self._root.evaluate(shape, rng)
+
+    def __str__(self) -> str:
+        return str(self._root)
+
+
+@lru_cache(maxsize=256)
+def _compile(expression: str) -> DicePlan:
+    return DicePlan(expression)
+
+
+def compile_expression(expression: str) -> DicePlan:
+    """
+    Compiles dice notation into a DicePlan, or returns the plan already compiled for the same expression.
+    :param expression: an expression in dice notation.  Case and runs of whitespace do not matter.
+    :return: A DicePlan.
+    """
+    return _compile(' '.join(expression.lower().split()))
+
+
+def _block_sample(expression: str, rng, shape):
+    """
+    Rolls a whole block of a seeded run and keeps the rows asked for.  Rerolls and explosions draw a varying
+    amount from the generator, so the first rows are only the same however many are asked for if the whole block
+    is always rolled.  It is a module function so that it can be pickled to worker processes.
+    """
+    rows, columns = shape
+    return compile_expression(expression).roll((parallel.BLOCK_SIZE, columns), rng)[:rows]
+
+
+class ExpressionDie(core.Die):
+    """
+    ExpressionDie rolls a dice expression as one die, so that Dice, Rolls, their exporters and summaries can be
+    used with any expression, e.g. Rolls(Dice(ExpressionDie('4d6kh3'), number_of_dice=6)) for a character's
+    ability scores.
+    """
+    __slots__ = ('_plan',)
+
+    def __init__(self,
+                 expression: str,
+                 transform_fn=None,
+                 die_name: str = None,
+                 rng: np.random.Generator = None):
+        """
+        :param expression: an expression in dice notation.
+        :param transform_fn: A curried transform applied to each result, as for IntegerDie.
+        :param die_name: A name for the die.  The expression without spaces is the default.
+        :param rng: The numpy.random.Generator to draw from.  None uses the calling thread's own generator.
+        """
+        self._plan = compile_expression(expression)
+        super().__init__(self._plan.roll,
+                         self._plan.expression().replace(' ', '') if die_name is None else die_name,
+                         transform_fn,
+                         sized=True,
+                         rng=rng)
+
+    def _draw(self, rng, size=None):
+        return self._plan.roll(size, rng or self._rng)
+
+    def block_sampler(self):
+        return partial(_block_sample, self._plan.expression())
+
+    def plan(self) -> DicePlan:
+        return self._plan
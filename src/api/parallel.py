@@ -0,0 +1,108 @@
+# hackable_dice_roller.parallel
+import itertools
+import os
+import threading
+import numpy as np
+
+# Seeded rolls are drawn in blocks of this many rows.  Block j always draws from the j-th child of the run's
+# SeedSequence, so the same seed gives the same table whichever process draws which block.
+BLOCK_SIZE = 65_536
+
+# One process pool per worker count, created on first use and reused for every later table or chunk.
+_executors: dict = {}
+_executors_lock = threading.Lock()  # so that threads sharing a Rolls with workers create one pool, not one each
+
+# Unseeded rolls draw from a generator of the calling thread's own.  Thread n's is the n-th child of one
+# SeedSequence, so the streams are independent, and no generator is shared, so no roll waits on another thread.
+_thread_entropy = np.random.SeedSequence().entropy
+_thread_keys = itertools.count()
+_thread_keys_lock = threading.Lock()  # taken once per thread, by its first unseeded roll
+_thread_state = threading.local()
+
+
+def block_rng(seed: int, block: int):
+    """
+    The generator for one block of a seeded run.
+    :param seed: the entropy of the run's numpy.random.SeedSequence.
+    :param block: the block number, row // BLOCK_SIZE.
+    :return: A numpy.random.Generator spawned from the run's SeedSequence.
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(block,)))
+
+
+def thread_rng() -> np.random.Generator:
+    """
+    The calling thread's generator, which unseeded rolls draw from unless given another.
+    :return: A numpy.random.Generator spawned from the process's SeedSequence with the next spawn key.
+    """
+    rng = getattr(_thread_state, 'rng', None)
+    if rng is None:
+        with _thread_keys_lock:
+            key = next(_thread_keys)
+        rng = _thread_state.rng = np.random.default_rng(np.random.SeedSequence(_thread_entropy, spawn_key=(key,)))
+    return rng
+
+
+def _reseed_threads() -> type[None]:
+    """
+    Gives a forked process fresh streams, so that it does not repeat its parent's rolls, and fresh locks.
+    """
+    global _thread_entropy, _thread_keys, _thread_keys_lock, _thread_state, _executors_lock
+    _thread_entropy = np.random.SeedSequence().entropy
+    _thread_keys = itertools.count()
+    _thread_keys_lock = threading.Lock()
+    _thread_state = threading.local()
+    _executors_lock = threading.Lock()  # another thread may have held it at the fork
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reseed_threads)
+
+
+def _roll_rows(sampler, seed: int, start: int, stop: int, number_of_dice: int):
+    """
+    Draws rows 'start' to 'stop' of a seeded run in the current process.  A block is always drawn from its first
+    row, because a generator's first n samples do not depend on how many more are asked for.
+    :return: A 2-d numpy array of untransformed samples.
+    """
+    blocks = []
+    for block in range(start // BLOCK_SIZE, (stop - 1) // BLOCK_SIZE + 1):
+        block_start = block * BLOCK_SIZE
+        rows = min(stop, block_start + BLOCK_SIZE) - block_start
+        samples = sampler(block_rng(seed, block), (rows, number_of_dice))
+        blocks.append(samples[max(start - block_start, 0):])
+    return blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+
+
+def _executor(workers: int):
+    executor = _executors.get(workers)
+    if executor is None:
+        from concurrent.futures import ProcessPoolExecutor  # only parallel runs need it
+        with _executors_lock:
+            executor = _executors.get(workers)
+            if executor is None:
+                executor = _executors[workers] = ProcessPoolExecutor(max_workers=workers)
+    return executor
+
+
+def roll_rows(sampler, seed: int, start: int, stop: int, number_of_dice: int, workers: int = None):
+    """
+    Draws rows 'start' to 'stop' of a seeded run, split by block across a pool of 'workers' processes.
+    :param sampler: A picklable function sampler(generator, shape) returning an array of untransformed samples.
+    :param seed: the entropy of the run's numpy.random.SeedSequence.
+    :param start: the first row to draw.
+    :param stop: one past the last row to draw.
+    :param number_of_dice: the number of columns.
+    :param workers: the number of processes.  None or 1 draws in this process.
+    :return: A 2-d numpy array of untransformed samples, identical for any number of workers.
+    """
+    first_block, last_block = start // BLOCK_SIZE, (stop - 1) // BLOCK_SIZE
+    workers = min(workers or 1, last_block - first_block + 1)
+    if workers <= 1:
+        return _roll_rows(sampler, seed, start, stop, number_of_dice)
+
+    # Give each worker a contiguous run of whole blocks, then concatenate the arrays in row order.
+    bounds = np.linspace(first_block, last_block + 1, workers + 1).astype(int)
+    ranges = [(max(lo * BLOCK_SIZE, start), min(hi * BLOCK_SIZE, stop)) for lo, hi in zip(bounds, bounds[1:])]
+    futures = [_executor(workers).submit(_roll_rows, sampler, seed, lo, hi, number_of_dice) for lo, hi in ranges]
+    return np.concatenate([future.result() for future in futures])
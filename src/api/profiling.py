@@ -0,0 +1,187 @@
+# hackable_dice_roller.profiling
+"""
+Opt-in timings of the core API's hot paths: sampling, throws, list copies, DataFrames and the exporters.
+
+    HDR_PROFILE=1 python src/cli/shdroll.py -d 3 -r 100000 --to-csv out.csv      # stage report on stderr at exit
+    HDR_PROFILE=run.pstats python src/cli/shdroll.py ...                         # and a cProfile dump
+    python src/cli/shdroll.py ... --profile [run.pstats]                         # the same from the command line
+
+Methods decorated with instrumented record their calls, inclusive wall time, and the number of samples and bytes of
+the arrays they return.  The timed wrappers are only swapped in while profiling is enabled, so the hot paths run
+unchanged the rest of the time.
+"""
+import atexit
+import cProfile
+import functools
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+# Setting this environment variable to 1 enables profiling when the core API is imported, and any other value
+# except 0 is also the path of a cProfile dump.
+ENVIRONMENT_VARIABLE = 'HDR_PROFILE'
+
+_enabled = False
+_started = False
+_stages: dict[str, list] = {}  # stage: [calls, seconds, samples, nbytes]
+_lock = threading.Lock()
+_instrumented = []  # the original functions, in the order they were decorated
+
+
+def _owner(function):
+    """
+    :return: The class or module 'function' is an attribute of, found from its module and qualified name.
+    """
+    owner = sys.modules[function.__module__]
+    for name in function.__qualname__.split('.')[:-1]:
+        owner = getattr(owner, name)
+    return owner
+
+
+def enable() -> type[None]:
+    """
+    Starts recording, by replacing every instrumented function with its timed wrapper.
+    :return: None.
+    """
+    global _enabled
+    _enabled = True
+    for function in _instrumented:
+        owner = _owner(function)
+        if getattr(owner, function.__name__) is function:
+            setattr(owner, function.__name__, _timed(function))
+
+
+def disable() -> type[None]:
+    """
+    Stops recording, by putting the original functions back.
+    :return: None.
+    """
+    global _enabled
+    _enabled = False
+    for function in _instrumented:
+        setattr(_owner(function), function.__name__, function)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> type[None]:
+    """
+    Forgets the timings recorded so far.
+    :return: None.
+    """
+    with _lock:
+        _stages.clear()
+
+
+def _measure(result) -> tuple[int, int]:
+    """
+    :param result: what an instrumented function returned.
+    :return: A tuple of the samples in its arrays, lists and DataFrames, and the bytes of its arrays and DataFrames.
+    """
+    samples = nbytes = 0
+    for value in result if isinstance(result, tuple) else (result,):
+        if isinstance(value, np.ndarray):
+            samples += value.size
+            nbytes += value.nbytes
+        elif isinstance(value, list):
+            samples += len(value)
+        elif hasattr(value, 'memory_usage'):  # a pandas.DataFrame, without importing pandas
+            samples += value.size
+            nbytes += int(value.memory_usage(index=False).sum())
+    return samples, nbytes
+
+
+def _timed(function):
+    """
+    :return: A wrapper of 'function' which records its calls under its qualified name, e.g. 'Rolls.rolls_to_csv'.
+    """
+    stage = function.__qualname__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        result = function(*args, **kwargs)
+        seconds = time.perf_counter() - started
+        samples, nbytes = _measure(result)
+        with _lock:
+            totals = _stages.setdefault(stage, [0, 0.0, 0, 0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += samples
+            totals[3] += nbytes
+        return result
+
+    return wrapper
+
+
+def instrumented(function):
+    """
+    Marks a module function or a method to be timed while profiling is enabled.  Until then the function itself
+    is left in place, so instrumentation costs nothing at all while it is disabled.
+    :param function: a function or method defined at the top level of a module or class.
+    :return: 'function', or its timed wrapper if profiling is already enabled.
+    """
+    _instrumented.append(function)
+    return _timed(function) if _enabled else function
+
+
+def stages() -> dict[str, dict]:
+    """
+    :return: A JSON-ready dict from each stage to its calls, seconds, samples and bytes.
+    """
+    with _lock:
+        return {stage: {'calls': calls, 'seconds': seconds, 'samples': samples, 'bytes': nbytes}
+                for stage, (calls, seconds, samples, nbytes) in _stages.items()}
+
+
+def format_report() -> str:
+    """
+    :return: The stages as a text table, slowest first.  Times include the stages called from inside a stage.
+    """
+    lines = [f"{'stage':<32} {'calls':>9} {'seconds':>10} {'us/call':>10} {'samples':>13} {'MB':>9}"]
+    for stage, recorded in sorted(stages().items(), key=lambda item: -item[1]['seconds']):
+        per_call = recorded['seconds'] / recorded['calls'] * 1e6
+        lines.append(f"{stage:<32} {recorded['calls']:>9} {recorded['seconds']:>10.4f} {per_call:>10.1f} "
+                     f"{recorded['samples']:>13} {recorded['bytes'] / 2 ** 20:>9.2f}")
+    return '\n'.join(lines)
+
+
+def _finish(profiler, pstats_path, stream) -> type[None]:
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(pstats_path)
+    print(format_report(), file=stream)
+
+
+def start(pstats_path=None, stream=None) -> type[None]:
+    """
+    Enables profiling until the interpreter exits, then prints the stage report.  Only the first call has any
+    effect, so HDR_PROFILE and --profile do not report twice.
+    :param pstats_path: None, or where to dump a cProfile of the whole run, which pstats and snakeviz can read.
+    :param stream: Where to print the report.  None is sys.stderr, so that the report does not mix with tables.
+    :return: None.
+    """
+    global _started
+    if _started:
+        return
+    _started = True
+    enable()
+    profiler = None
+    if pstats_path:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    atexit.register(_finish, profiler, pstats_path, stream or sys.stderr)
+
+
+def start_from_environment() -> type[None]:
+    """
+    Calls start if the HDR_PROFILE environment variable asks for profiling.
+    :return: None.
+    """
+    value = os.environ.get(ENVIRONMENT_VARIABLE, '')
+    if value not in ('', '0'):
+        start(None if value == '1' else value)
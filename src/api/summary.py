@@ -0,0 +1,302 @@
+# hackable_dice_roller.summary
+from typing import Callable
+import numpy as np
+
+from src.api import writers
+
+# A histogram keeps one bin per distinct value until it has more than this many, which only happens for
+# continuous dice.  It is then compressed to this many bins, so memory is bounded whatever is rolled.
+DEFAULT_MAX_BINS = 2048
+
+# The quantiles RollsSummary.to_string reports.
+SUMMARY_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+class Histogram:
+    """
+    Histogram counts values exactly while there are at most 'max_bins' distinct values, as there are for integer
+    dice.  Beyond that it becomes a quantile sketch: neighbouring bins are merged into bins of roughly equal count,
+    each kept at the mean of its values.  Histograms of separate chunks or processes merge into one.
+    """
+    def __init__(self, max_bins: int = DEFAULT_MAX_BINS):
+        """
+        :param max_bins: The most bins kept.  It must be at least 2.
+        """
+        if max_bins < 2:
+            raise ValueError("Parameter 'max_bins' must be at least 2.")
+        self._max_bins = max_bins
+        self._values = np.empty(0)
+        self._counts = np.empty(0, dtype=np.int64)
+        self._exact = True
+
+    def update(self, values) -> type[None]:
+        """
+        Counts an array of values.
+        :param values: a numpy array.
+        :return: None.
+        """
+        values, counts = np.unique(np.asarray(values).ravel(), return_counts=True)
+        self._add(values, counts)
+
+    def merge(self, other: 'Histogram') -> type[None]:
+        """
+        Adds another histogram's counts to this one's.
+        :param other: a Histogram.
+        :return: None.
+        """
+        self._exact = self._exact and other._exact
+        self._add(other._values, other._counts)
+
+    def _add(self, values, counts) -> type[None]:
+        if not len(self._values):
+            merged_values, merged_counts = values, counts.astype(np.int64)
+        else:
+            merged_values, inverse = np.unique(np.concatenate((self._values, values)), return_inverse=True)
+            merged_counts = np.zeros(len(merged_values), dtype=np.int64)
+            np.add.at(merged_counts, inverse, np.concatenate((self._counts, counts)))
+        if len(merged_values) > self._max_bins:
+            merged_values, merged_counts = self._compress(merged_values, merged_counts)
+            self._exact = False
+        self._values, self._counts = merged_values, merged_counts
+
+    def _compress(self, values, counts):
+        """
+        Merges sorted bins into at most 'max_bins' bins of roughly equal count.
+        :return: the merged bins' means and counts.
+        """
+        before = np.cumsum(counts) - counts
+        groups = before * self._max_bins // counts.sum()
+        starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        merged_counts = np.add.reduceat(counts, starts)
+        merged_values = np.add.reduceat(values * counts, starts) / merged_counts
+        return merged_values, merged_counts
+
+    def is_exact(self) -> bool:
+        """
+        :return: True while every distinct value has its own bin.
+        """
+        return self._exact
+
+    def values(self):
+        """
+        :return: A numpy array of the values counted, or of the bins' means once compressed, in ascending order.
+        """
+        return self._values.copy()
+
+    def counts(self):
+        """
+        :return: A numpy array of the count of each value in values().
+        """
+        return self._counts.copy()
+
+    def count(self) -> int:
+        return int(self._counts.sum())
+
+    def quantile(self, q: float) -> float:
+        """
+        :param q: A probability between 0 and 1.
+        :return: The smallest value whose cumulative count reaches 'q' of the whole, exactly while is_exact().
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("Parameter 'q' must be between 0 and 1.")
+        if not len(self._values):
+            raise ValueError("An empty histogram has no quantiles.")
+        cumulative = np.cumsum(self._counts)
+        index = np.searchsorted(cumulative, q * cumulative[-1] - 1e-9, side='left')
+        return self._values[min(index, len(self._values) - 1)].item()
+
+
+class Moments:
+    """
+    Moments keeps the count, mean and sum of squared deviations of a stream of values by Welford's method.  Each
+    array is reduced on its own and folded in with Chan's pairwise update, which also merges separate Moments.
+    """
+    def __init__(self):
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._min = np.inf
+        self._max = -np.inf
+
+    def update(self, values) -> type[None]:
+        """
+        Folds in an array of values.
+        :param values: a numpy array.
+        :return: None.
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not values.size:
+            return
+        mean = values.mean()
+        self._fold(values.size, mean, np.square(values - mean).sum(), values.min(), values.max())
+
+    def merge(self, other: 'Moments') -> type[None]:
+        """
+        Folds in the values another Moments has seen.
+        :param other: a Moments.
+        :return: None.
+        """
+        if other._count:
+            self._fold(other._count, other._mean, other._m2, other._min, other._max)
+
+    def _fold(self, count: int, mean: float, m2: float, low: float, high: float) -> type[None]:
+        total = self._count + count
+        delta = mean - self._mean
+        self._mean += delta * count / total
+        self._m2 += m2 + delta * delta * self._count * count / total
+        self._count = total
+        self._min = min(self._min, float(low))
+        self._max = max(self._max, float(high))
+
+    def count(self) -> int:
+        return self._count
+
+    def mean(self) -> float:
+        return float(self._mean)
+
+    def variance(self) -> float:
+        """
+        :return: The population variance, as for DiceDistribution.variance.
+        """
+        return float(self._m2 / self._count) if self._count else 0.0
+
+    def std(self) -> float:
+        return self.variance() ** 0.5
+
+    def min(self) -> float:
+        return self._min
+
+    def max(self) -> float:
+        return self._max
+
+
+class RollsSummary(writers.ChunkWriter):
+    """
+    RollsSummary is a chunk writer which aggregates the chunks of Rolls.roll_chunks without keeping any rows: exact
+    counts of each die's faces and of the throw totals, and the moments and quantiles of the totals.  Its memory
+    depends on the number of dice and the faces they can show, never on the number of rolls.  Summaries of separate
+    chunks, runs or processes merge into one.
+    """
+    def __init__(self,
+                 headers: list[str],
+                 max_bins: int = DEFAULT_MAX_BINS,
+                 transform_fn: Callable[[float], float] = None):
+        """
+        :param headers: one header per die, then the row total's and the grand total's headers.
+        :param max_bins: The most distinct values each histogram counts exactly.
+        :param transform_fn: The transform of the grand total, as for Rolls.  It is applied once to the sum of the
+            throw totals, also after a merge.  A lambda cannot be pickled, so summaries sent between processes need
+            a transforms.Transform.
+        """
+        super().__init__(headers)
+        self._faces = [Histogram(max_bins) for _ in headers[:-2]]
+        self._totals = Histogram(max_bins)
+        self._moments = Moments()
+        self._transform_fn = transform_fn
+        self._sum: float = 0  # of the throw totals, before the transform
+        self._grand_total: float = None
+
+    def _write(self, chunk) -> type[None]:
+        for i, faces in enumerate(self._faces):
+            faces.update(chunk.rolls[:, i])
+        self._totals.update(chunk.totals)
+        self._moments.update(chunk.totals)
+        self._sum += chunk.totals.sum().item()
+
+    def merge(self, other: 'RollsSummary') -> 'RollsSummary':
+        """
+        Adds the rolls another summary of the same dice has aggregated.  The grand total becomes the transform of
+        the sum of both summaries' throw totals, not the sum of their transformed grand totals.
+        :param other: a RollsSummary with the same transform_fn.
+        :return: this RollsSummary.
+        """
+        if other._headers[:-1] != self._headers[:-1]:
+            raise ValueError("Only summaries of the same dice can be merged.")
+        if other._transform_fn != self._transform_fn:
+            raise ValueError("Only summaries with the same grand total transform can be merged.")
+        for faces, other_faces in zip(self._faces, other._faces):
+            faces.merge(other_faces)
+        self._totals.merge(other._totals)
+        self._moments.merge(other._moments)
+        self._sum += other._sum
+        self._grand_total = None  # recomputed from the merged sum
+        self._rows_written += other._rows_written
+        return self
+
+    def set_grand_total(self, grand_total: float) -> type[None]:
+        """
+        :param grand_total: The grand total of the rolls summarized, as from Rolls.total().
+        :return: None.
+        """
+        self._grand_total = grand_total
+
+    def grand_total(self) -> float:
+        """
+        :return: The grand total given to set_grand_total, or else, as after a merge, the transform of the sum of
+            the throw totals.
+        """
+        if self._grand_total is not None:
+            return self._grand_total
+        return self._sum if self._transform_fn is None else self._transform_fn(self._sum)
+
+    def face_counts(self, column: int = None):
+        """
+        :param column: The die's column, or None to pool every die.
+        :return: A tuple of a numpy array of the faces rolled, in ascending order, and a numpy array of their counts.
+        """
+        if column is not None:
+            return self._faces[column].values(), self._faces[column].counts()
+        pooled = Histogram(self._totals._max_bins)
+        for faces in self._faces:
+            pooled.merge(faces)
+        return pooled.values(), pooled.counts()
+
+    def total_counts(self):
+        """
+        :return: A tuple of a numpy array of the throw totals rolled, in ascending order, and a numpy array of their
+            counts.
+        """
+        return self._totals.values(), self._totals.counts()
+
+    def is_exact(self) -> bool:
+        """
+        :return: True if every count, and so every quantile, is exact rather than sketched.
+        """
+        return self._totals.is_exact() and all(faces.is_exact() for faces in self._faces)
+
+    def mean(self) -> float:
+        return self._moments.mean()
+
+    def variance(self) -> float:
+        return self._moments.variance()
+
+    def std(self) -> float:
+        return self._moments.std()
+
+    def min(self) -> float:
+        return self._moments.min()
+
+    def max(self) -> float:
+        return self._moments.max()
+
+    def quantile(self, q: float) -> float:
+        """
+        :param q: A probability between 0 and 1.
+        :return: The smallest throw total at least 'q' of the rolls do not exceed.
+        """
+        return self._totals.quantile(q)
+
+    def to_string(self) -> str:
+        return self.__str__()
+
+    def __str__(self) -> str:
+        total_header = self._headers[-2]
+        values, counts = self.total_counts()
+        lines = [f"rolls: {self.rows_written()}  grand_total: {self.grand_total()}",
+                 f"mean: {self.mean()}  variance: {self.variance()}  std: {self.std()}",
+                 f"min: {self.min()}  max: {self.max()}",
+                 "  ".join(f"{q:.0%}: {self.quantile(q)}" for q in SUMMARY_QUANTILES),
+                 writers.format_text_table([total_header, 'count'], [values.tolist(), counts.tolist()])]
+        values, counts = self.face_counts()
+        lines.append(writers.format_text_table(['face', 'count'], [values.tolist(), counts.tolist()]))
+        return "\n".join(lines)
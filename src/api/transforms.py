@@ -0,0 +1,228 @@
+# hackable_dice_roller.transforms
+import math
+import numpy as np
+
+
+class Transform:
+    """
+    Transform is the base class of the declarative transforms a Die, Dice or Rolls applies to its samples or
+    totals.  Unlike a lambda a transform can be pickled to worker processes, hashed as part of a cache key and
+    compared for equality.  Calling a transform on a number gives a number, and calling it on a numpy array
+    transforms the whole array in one operation.
+    """
+    __slots__ = ()
+
+    def __call__(self, value):
+        raise NotImplementedError
+
+    def _key(self) -> tuple:
+        """
+        :return: A tuple of the transform's parameters, which decides equality and the hash.
+        """
+        raise NotImplementedError
+
+    def then(self, other: 'Transform') -> 'Transform':
+        """
+        :param other: the transform to apply after this one.
+        :return: The composition, fused into one transform where possible.
+        """
+        return compose(self, other)
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash((type(self).__name__, self._key()))
+
+    def __getstate__(self):
+        return self._key()
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}{self._key()!r}"
+
+
+class Affine(Transform):
+    """
+    Affine maps y to 'multiplier * y + addend'.  It is what add_currying and multiply_currying return.
+    """
+    __slots__ = ('multiplier', 'addend')
+
+    def __init__(self, multiplier: float = 1, addend: float = 0):
+        """
+        :param multiplier: the number each value is multiplied by.
+        :param addend: the number then added.
+        """
+        object.__setattr__(self, 'multiplier', multiplier)
+        object.__setattr__(self, 'addend', addend)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Transforms cannot be changed.")
+
+    def __call__(self, value):
+        if self.multiplier != 1:
+            value = self.multiplier * value
+        return value + self.addend if self.addend != 0 else value
+
+    def _key(self) -> tuple:
+        return self.multiplier, self.addend
+
+    def __repr__(self) -> str:
+        return f"Affine(multiplier={self.multiplier!r}, addend={self.addend!r})"
+
+
+class Clamp(Transform):
+    """
+    Clamp limits values to the range 'low' to 'high', inclusive.
+    """
+    __slots__ = ('low', 'high')
+
+    def __init__(self, low: float = None, high: float = None):
+        """
+        :param low: the lowest value let through, or None for no lower limit.
+        :param high: the highest value let through, or None for no upper limit.
+        """
+        if low is not None and high is not None and low > high:
+            raise ValueError("Parameter 'low' must not be greater than 'high'.")
+        object.__setattr__(self, 'low', low)
+        object.__setattr__(self, 'high', high)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Transforms cannot be changed.")
+
+    def __call__(self, value):
+        if isinstance(value, np.ndarray):
+            return np.clip(value, self.low, self.high)
+        if self.low is not None and value < self.low:
+            return self.low
+        if self.high is not None and value > self.high:
+            return self.high
+        return value
+
+    def _key(self) -> tuple:
+        return self.low, self.high
+
+    def __repr__(self) -> str:
+        return f"Clamp(low={self.low!r}, high={self.high!r})"
+
+
+class Floor(Transform):
+    """
+    Floor rounds values down to whole numbers, e.g. after halving a total.
+    """
+    __slots__ = ()
+
+    def __call__(self, value):
+        if isinstance(value, np.ndarray):
+            return value if value.dtype.kind in 'iub' else np.floor(value)
+        return math.floor(value)
+
+    def _key(self) -> tuple:
+        return ()
+
+    def __repr__(self) -> str:
+        return "Floor()"
+
+
+class Compose(Transform):
+    """
+    Compose applies its transforms in order, the first to the value and each later one to the result.  Use
+    compose() to build one, which fuses neighbouring Affine maps.
+    """
+    __slots__ = ('transforms',)
+
+    def __init__(self, *transforms: Transform):
+        """
+        :param transforms: the transforms to apply, first to last.
+        """
+        object.__setattr__(self, 'transforms', tuple(transforms))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Transforms cannot be changed.")
+
+    def __call__(self, value):
+        for transform in self.transforms:
+            value = transform(value)
+        return value
+
+    def _key(self) -> tuple:
+        return self.transforms
+
+    def __repr__(self) -> str:
+        return f"Compose{self.transforms!r}"
+
+
+def is_monotone(transform) -> bool:
+    """
+    :param transform: a transform, or None.
+    :return: True if it is None or a Transform known to keep or reverse the order of values, so that its least and
+        greatest results over a range come from the ends of the range.  Any other callable may not.
+    """
+    if transform is None or isinstance(transform, (Affine, Clamp, Floor)):
+        return True
+    return isinstance(transform, Compose) and all(is_monotone(part) for part in transform.transforms)
+
+
+def _clamped(bound, low, high, unbounded):
+    """
+    :return: 'bound' limited to the range 'low' to 'high', where None is no limit, or 'unbounded' if 'bound' is None.
+    """
+    if bound is None:
+        return unbounded
+    if low is not None and bound < low:
+        return low
+    if high is not None and bound > high:
+        return high
+    return bound
+
+
+def _floored(fused: list) -> bool:
+    """
+    :return: True if the values out of 'fused' are already whole, because it ends in a Floor and then only Clamps
+        to whole numbers.
+    """
+    for part in reversed(fused):
+        if isinstance(part, Floor):
+            return True
+        if not isinstance(part, Clamp) or any(bound is not None and not float(bound).is_integer()
+                                              for bound in (part.low, part.high)):
+            return False
+    return False
+
+
+def compose(*transforms) -> Transform:
+    """
+    Composes transforms, first to last.  Nested compositions are flattened, None and identity maps are dropped,
+    neighbouring Affine maps are multiplied out into one, as are neighbouring Clamps, and a Floor is dropped when
+    the values are already whole, after another Floor and any Clamps to whole numbers.
+    :param transforms: Transforms, or None.
+    :return: A single Transform: an Affine if every part is affine, otherwise a Compose.
+    """
+    fused = []
+    for transform in transforms:
+        parts = transform.transforms if isinstance(transform, Compose) else (transform,)
+        for part in parts:
+            if part is None or part == Affine(1, 0):
+                continue
+            if not isinstance(part, Transform):
+                raise TypeError("Only Transform objects can be composed; write other maps as a Transform subclass.")
+            previous = fused[-1] if fused else None
+            if isinstance(part, Affine) and isinstance(previous, Affine):
+                # m2 * (m1 * y + a1) + a2
+                fused[-1] = Affine(part.multiplier * previous.multiplier,
+                                   part.multiplier * previous.addend + part.addend)
+                if fused[-1] == Affine(1, 0):
+                    fused.pop()
+            elif isinstance(part, Clamp) and isinstance(previous, Clamp):
+                # the first clamp's range, limited to the second's
+                fused[-1] = Clamp(_clamped(previous.low, part.low, part.high, part.low),
+                                  _clamped(previous.high, part.low, part.high, part.high))
+            elif isinstance(part, Floor) and _floored(fused):
+                continue
+            else:
+                fused.append(part)
+    if not fused:
+        return Affine(1, 0)
+    return fused[0] if len(fused) == 1 else Compose(*fused)
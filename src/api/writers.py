@@ -0,0 +1,722 @@
+# hackable_dice_roller.writers
+import csv
+import io
+import os
+import re
+import zipfile
+from xml.sax.saxutils import escape
+import numpy as np
+
+# Integer dtypes from smallest to largest, for compact_dtype.
+_INTEGER_DTYPES = [np.dtype(np.int8), np.dtype(np.int16), np.dtype(np.int32), np.dtype(np.int64)]
+
+
+def compact_dtype(values):
+    """
+    The smallest dtype which holds every value in 'values'.
+    :param values: a numpy array, for instance the lowest and highest values a column can take.
+    :return: the smallest signed integer dtype covering the values' range if they are integers, otherwise float64.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind not in 'iu':
+        return np.dtype(np.float64)
+    low, high = (values.min(), values.max()) if values.size else (0, 0)
+    for dtype in _INTEGER_DTYPES:
+        if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+            return dtype
+    return np.dtype(np.int64)
+
+
+def cast_column(values, dtype):
+    """
+    Casts a column to a compact dtype, refusing to let integers wrap around.
+    :param values: a numpy array.
+    :param dtype: the dtype to write.
+    :return: 'values' as 'dtype'.
+    """
+    if dtype.kind == 'i' and values.size:
+        if values.dtype.kind not in 'iu' or values.min() < np.iinfo(dtype).min or values.max() > np.iinfo(dtype).max:
+            raise ValueError(f"Values from {values.min()} to {values.max()} do not fit in {dtype}.")
+    return values.astype(dtype, copy=False)
+
+
+def _require_pyarrow():
+    """
+    Imports pyarrow, which only the Arrow and Parquet writers need.
+    :return: the pyarrow module.
+    """
+    try:
+        import pyarrow
+    except ImportError as error:
+        raise ImportError("Arrow and Parquet output need the optional 'pyarrow' package.") from error
+    return pyarrow
+
+
+def running_totals(chunk):
+    """
+    The running grand total after each row of a chunk.
+    :param chunk: a core.RollsChunk.
+    :return: A numpy array with one running total per row.
+    """
+    previous_total = chunk.running_total - chunk.totals.sum()
+    return previous_total + np.cumsum(chunk.totals)
+
+
+class ChunkWriter:
+    """
+    ChunkWriter is the base class for writers which consume the chunks of Rolls.roll_chunks one at a time, so a
+    table of any length can be written while only one chunk is held in memory.
+    """
+    def __init__(self, headers: list[str]):
+        """
+        :param headers: one header per die, then the row total's and the running grand total's headers.
+        """
+        self._headers = headers
+        self._rows_written = 0
+
+    def write(self, chunk) -> type[None]:
+        """
+        Writes one chunk.
+        :param chunk: a core.RollsChunk.
+        :return: None.
+        """
+        self._write(chunk)
+        self._rows_written += len(chunk.totals)
+
+    def _write(self, chunk) -> type[None]:
+        raise NotImplementedError
+
+    def rows_written(self) -> int:
+        return self._rows_written
+
+    def set_grand_total(self, grand_total: float) -> type[None]:
+        """
+        Tells the writer the finished table's grand total, before it is closed.  Most writers have no use for it.
+        :param grand_total: The transformed grand total.
+        :return: None.
+        """
+        pass
+
+    def close(self) -> type[None]:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# A fixed-point number as pandas formats it, whose trailing zeros may be trimmed.
+_DECIMAL_NUMBER = re.compile(r"^\s*[+-]?[0-9]+\.[0-9]*$")
+
+
+def _format_floats(values: list[float]) -> list[str]:
+    """
+    Formats a float column the way pandas.DataFrame.to_string does: six decimals with the trailing zeros the whole
+    column shares trimmed, or scientific notation when some values are tiny or very long.
+    """
+    formatted = [f"{value: .6f}" for value in values]
+    while any(_DECIMAL_NUMBER.match(x) for x in formatted) and \
+            all(x.endswith('0') for x in formatted if _DECIMAL_NUMBER.match(x)):
+        formatted = [x[:-1] if _DECIMAL_NUMBER.match(x) else x for x in formatted]
+    formatted = [x + '0' if x.endswith('.') else x for x in formatted]
+
+    too_long = max((len(x) for x in formatted), default=0) > 12
+    has_large_values = any(abs(value) > 1e6 for value in values)
+    has_small_values = any(0 < abs(value) < 1e-6 for value in values)
+    if has_small_values or (too_long and has_large_values):
+        formatted = [f"{value: .6e}" for value in values]
+    return formatted
+
+
+def _format_text_column(values: list) -> list[str]:
+    """
+    Formats one column for a text table with the leading space pandas leaves for a sign.  A column holding any
+    float is formatted as floats, as pandas would infer it.
+    """
+    if any(isinstance(value, float) for value in values):
+        return _format_floats([float(value) for value in values])
+    if all(isinstance(value, int) for value in values):
+        return [f"{value: d}" for value in values]
+    return [f" {value}" for value in values]
+
+
+def format_text_table(headers: list[str], columns: list[list], start: int = 0, header: bool = True,
+                      widths: list[int] = None) -> str:
+    """
+    A pure Python text table laid out like pandas.DataFrame.to_string, for printing without importing pandas.
+    :param headers: one header per column.
+    :param columns: one list of Python numbers per column.
+    :param start: the index of the first row.
+    :param header: If False the header line is left out.
+    :param widths: the minimum widths of the index and of each column.  The list is updated to the widths used, so
+        a later table printed below this one stays aligned with it.
+    :return: The table, without a final newline.
+    """
+    number_of_rows = len(columns[0]) if columns else 0
+    index = [str(i) for i in range(start, start + number_of_rows)]
+    cells = [index] + [_format_text_column(column) for column in columns]
+    if widths is None:
+        widths = [0] * len(cells)
+    widths[0] = max(widths[0], *(len(x) for x in index))
+    for i, (title, column) in enumerate(zip(headers, cells[1:]), start=1):
+        widths[i] = max(widths[i], len(title) + 1, *(len(x) for x in column))
+
+    lines = []
+    if header:
+        lines.append(' '.join([' ' * widths[0]] + [title.rjust(width) for title, width in zip(headers, widths[1:])]))
+    for row in range(number_of_rows):
+        lines.append(' '.join([cells[0][row].ljust(widths[0])] +
+                              [column[row].rjust(width) for column, width in zip(cells[1:], widths[1:])]))
+    return '\n'.join(lines)
+
+
+def _integer_ascii(out, values) -> type[None]:
+    """
+    Writes integers as right-aligned ASCII digits into the rows of a uint8 array, with zero bytes for padding and a
+    leading '-' for negative numbers.
+    :param out: a 2-d uint8 array, one row per value, wide enough for the longest number and its sign.
+    :param values: a numpy array of integers.
+    :return: None.
+    """
+    if values.dtype.itemsize < 8:
+        values = values.astype(np.int64)  # np.abs of the most negative int8 or int16 wraps in the column's dtype
+    magnitude = np.abs(values)
+    remainder = magnitude.astype(np.int32 if magnitude.max(initial=0) < 2 ** 31 else np.int64)
+    width = out.shape[1] - 1
+    for column in range(width, 0, -1):
+        remainder, digit = np.divmod(remainder, 10)
+        out[:, column] = digit + ord('0')
+    for column in range(1, width):  # blank the leading zeros
+        out[magnitude < 10 ** (width - column), column] = 0
+    out[:, 0] = np.where(values < 0, ord('-'), 0)
+
+
+def _ascii_column(values):
+    """
+    Formats one column of a CSV as a 2-d uint8 array, one row per value, in which zero bytes are padding.
+    Integers, and floats which are whole numbers, are formatted with numpy arithmetic; a column with few distinct
+    integers is formatted once per distinct value and gathered.  Any other floats use numpy's shortest repr,
+    which is what pandas writes too.
+    :param values: a 1-d numpy array.
+    :return: a 2-d uint8 array.
+    """
+    suffix = b''
+    if values.dtype.kind == 'f':
+        if not (np.all(np.isfinite(values)) and np.all(values == np.round(values))
+                and np.abs(values).max(initial=0) < 2 ** 53):
+            return values.astype('S').view(np.uint8).reshape(len(values), -1)
+        values, suffix = values.astype(np.int64), b'.0'
+    elif values.dtype.kind not in 'iu':
+        return values.astype('S').view(np.uint8).reshape(len(values), -1)
+    elif values.dtype.itemsize < 8:
+        values = values.astype(np.int64)  # compact columns would wrap in 'values - low' below
+
+    low, high = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+    width = max(len(str(abs(low))), len(str(abs(high)))) + 1
+    out = np.empty((len(values), width + len(suffix)), np.uint8)
+    if high - low < len(values) // 4:
+        table = np.empty((high - low + 1, width), np.uint8)
+        _integer_ascii(table, np.arange(low, high + 1))
+        out[:, :width] = table[values - low]
+    else:
+        _integer_ascii(out[:, :width], values)
+    out[:, width:] = np.frombuffer(suffix, np.uint8)
+    return out
+
+
+def format_csv_rows(columns) -> bytes:
+    """
+    Formats columns of equal length as CSV rows without a Python loop over rows.
+    :param columns: a list of 1-d numpy arrays.
+    :return: The rows as ASCII bytes, each ending in a newline.
+    """
+    blocks = [_ascii_column(column) for column in columns]
+    table = np.empty((len(columns[0]), sum(block.shape[1] + 1 for block in blocks)), np.uint8)
+    position = 0
+    for block in blocks:
+        table[:, position:position + block.shape[1]] = block
+        position += block.shape[1]
+        table[:, position] = ord(',')
+        position += 1
+    table[:, -1] = ord('\n')
+    return table[table != 0].tobytes()
+
+
+def _open_binary(path: str, compression: str):
+    """
+    Opens a buffered binary file for writing, compressed with gzip or zstd if asked.
+    :param path: the file's path.
+    :param compression: None, 'gzip', 'zstd', or 'infer' to choose from a '.gz' or '.zst' suffix.
+    :return: a binary file object.
+    """
+    if compression == 'infer':
+        compression = 'gzip' if path.endswith('.gz') else 'zstd' if path.endswith('.zst') else None
+    if compression is None:
+        return open(path, 'wb', buffering=1 << 20)
+    if compression == 'gzip':
+        import gzip
+        return gzip.open(path, 'wb', compresslevel=6)
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError as error:
+            raise ImportError("zstd compression needs the optional 'zstandard' package.") from error
+        return zstandard.open(path, 'wb')
+    raise ValueError(f"Unknown compression '{compression}'.")
+
+
+class CsvChunkWriter(ChunkWriter):
+    """
+    Formats each chunk straight from its numpy arrays into a buffered, optionally compressed, CSV file.  Memory stays
+    at one chunk however many rows are written.  The layout matches pandas.DataFrame.to_csv: a leading index column
+    and a header row.
+    """
+    def __init__(self,
+                 path_or_buf,
+                 headers: list[str],
+                 grand_total: float = None,
+                 footer: bool = False,
+                 compression: str = 'infer'):
+        """
+        :param path_or_buf: Where to save the CSV output, a str or os.PathLike path, or an open text or binary buffer.
+        :param headers: one header per die and the row total's header, then optionally the grand total's.
+        :param grand_total: The grand total to repeat in the rightmost column.  None writes each row's running grand
+            total instead, as when streaming.
+        :param footer: If True the grand total column is left out and the grand total is written once, as a final
+            '# grand_total,<value>' line.
+        :param compression: None, 'gzip', 'zstd', or 'infer' to choose from the path's suffix.
+        """
+        super().__init__(headers)
+        self._grand_total = grand_total
+        self._footer = footer
+        self._last_running_total = 0
+        self._owns_file = isinstance(path_or_buf, (str, os.PathLike))
+        self._buf = _open_binary(os.fspath(path_or_buf), compression) if self._owns_file else path_or_buf
+        self._text = isinstance(self._buf, io.TextIOBase)
+
+        columns = headers[:-1] if footer and len(headers) > 1 else headers
+        header_line = io.StringIO()
+        csv.writer(header_line, lineterminator='\n').writerow([''] + columns)
+        self._emit(header_line.getvalue().encode())
+
+    def _emit(self, data: bytes) -> type[None]:
+        self._buf.write(data.decode() if self._text else data)
+
+    def set_grand_total(self, grand_total: float) -> type[None]:
+        self._grand_total = grand_total
+
+    def _write(self, chunk) -> type[None]:
+        rows = len(chunk.totals)
+        columns = [np.arange(chunk.start, chunk.start + rows)]
+        columns.extend(chunk.rolls[:, i] for i in range(chunk.rolls.shape[1]))
+        columns.append(chunk.totals)
+        if len(self._headers) > chunk.rolls.shape[1] + 1 and not self._footer:
+            if self._grand_total is None:
+                columns.append(running_totals(chunk))
+            else:
+                columns.append(np.full(rows, self._grand_total))
+        self._emit(format_csv_rows(columns))
+        self._last_running_total = chunk.running_total
+
+    def close(self) -> type[None]:
+        if self._footer:
+            grand_total = self._last_running_total if self._grand_total is None else self._grand_total
+            self._emit(f"# grand_total,{grand_total}\n".encode())
+        if self._owns_file:
+            self._buf.close()
+        else:
+            self._buf.flush()
+
+
+# The most rows, the header included, one Excel worksheet can hold.
+XLSX_MAX_ROWS = 1_048_576
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '{sheets}</Types>')
+_XLSX_SHEET_TYPE = ('<Override PartName="/xl/worksheets/sheet{n}.xml" '
+                    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>')
+_XLSX_PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="xl/workbook.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    '</Relationships>')
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>{sheets}</sheets>'
+    '</workbook>')
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{sheets}'
+    '<Relationship Id="rIdStyles" Target="styles.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/></Relationships>')
+_XLSX_SHEET_REL = ('<Relationship Id="rId{n}" Target="worksheets/sheet{n}.xml" '
+                   'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>')
+_XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill>'
+    '</fills><borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles></styleSheet>')
+_XLSX_SHEET_START = (b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                     b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+_XLSX_SHEET_END = b'</sheetData></worksheet>'
+
+
+def _column_letter(column: int) -> str:
+    """
+    :param column: a column number counting from 0.
+    :return: Its Excel letters, 'A' for 0 and 'AA' for 26.
+    """
+    letters = ''
+    column += 1
+    while column:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def _xlsx_cell(row: int, column: int, value) -> str:
+    """
+    :return: One cell with an explicit reference, a number or an inline string.
+    """
+    reference = f"{_column_letter(column)}{row}"
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+        return f'<c r="{reference}"><v>{value}</v></c>'
+    return f'<c r="{reference}" t="inlineStr"><is><t>{escape(str(value))}</t></is></c>'
+
+
+def format_xlsx_rows(columns, float_format: str = None) -> bytes:
+    """
+    Formats columns of equal length as worksheet rows without a Python loop over rows.  The rows and cells carry no
+    references, so each one follows the last, as the format allows.
+    :param columns: a list of 1-d numpy arrays of numbers.
+    :param float_format: A printf format, such as '%.2f', for columns of floats, or None for their shortest repr.
+    :return: The rows as UTF-8 bytes of SpreadsheetML.
+    """
+    blocks = []
+    for column in columns:
+        if float_format is not None and column.dtype.kind == 'f':
+            blocks.append(np.char.mod(float_format, column).astype('S').view(np.uint8).reshape(len(column), -1))
+        else:
+            blocks.append(_ascii_column(column))
+    cell_open, cell_close = np.frombuffer(b'<c><v>', np.uint8), np.frombuffer(b'</v></c>', np.uint8)
+    row_open, row_close = np.frombuffer(b'<row>', np.uint8), np.frombuffer(b'</row>', np.uint8)
+    width = len(row_open) + sum(len(cell_open) + block.shape[1] + len(cell_close) for block in blocks) + len(row_close)
+    table = np.empty((len(columns[0]), width), np.uint8)
+    table[:, :len(row_open)] = row_open
+    position = len(row_open)
+    for block in blocks:
+        for piece in (cell_open, block, cell_close):
+            table[:, position:position + piece.shape[-1]] = piece
+            position += piece.shape[-1]
+    table[:, position:] = row_close
+    return table[table != 0].tobytes()
+
+
+class XlsxChunkWriter(ChunkWriter):
+    """
+    Streams each chunk straight into the worksheet XML of an .xlsx file, formatted from its numpy arrays, so memory
+    stays at one chunk however many rows are written and no cell objects are ever built.  The layout matches
+    pandas.DataFrame.to_excel: a leading index column and a header row.  A sheet which reaches Excel's limit of
+    1,048,576 rows is continued on a new sheet, 'Sheet1 (2)' and so on, and with 'sheets_per_workbook' in a new
+    workbook, 'rolls_2.xlsx' and so on.  With 'summary' the grand total column is left out and a 'Summary' sheet
+    holds the grand total, the moments and quantiles of the totals, and histograms of the totals and the faces.
+    """
+    def __init__(self,
+                 path,
+                 headers: list[str],
+                 grand_total: float = None,
+                 sheet_name: str = 'Sheet1',
+                 float_format: str = None,
+                 summary: bool = False,
+                 max_rows: int = XLSX_MAX_ROWS,
+                 sheets_per_workbook: int = None):
+        """
+        :param path: Where to save the .xlsx file, or an open binary buffer if the rows fit one workbook.
+        :param headers: one header per die and the row total's header, then optionally the grand total's.
+        :param grand_total: The grand total to repeat in the rightmost column.  None writes each row's running grand
+            total instead, as when streaming.
+        :param sheet_name: The name of the first sheet, which later sheets number on from.
+        :param float_format: A printf format, such as '%.2f', for columns of floats.
+        :param summary: If True the grand total column is left out and a 'Summary' sheet is added.
+        :param max_rows: The most rows, the header included, on one sheet.
+        :param sheets_per_workbook: The most sheets of rows in one workbook, or None for no limit.
+        """
+        super().__init__(headers)
+        if max_rows < 2:
+            raise ValueError("Parameter 'max_rows' must leave room for a header and a row.")
+        self._path = path
+        self._grand_total = grand_total
+        self._sheet_name = sheet_name
+        self._float_format = float_format
+        self._max_rows = max_rows
+        self._sheets_per_workbook = sheets_per_workbook
+        self._with_grand_total = len(headers) > 2 and not summary
+        self._summary = None
+        if summary:
+            from src.api import summary as summary_module  # summary imports this module
+            self._summary = summary_module.RollsSummary(headers)
+        self._paths = []
+        self._zip = None
+        self._sheet = None
+        self._sheets = []  # the names of the current workbook's sheets
+        self._sheet_number = 0  # across every workbook
+        self._sheet_rows = 0
+
+    def paths(self) -> list:
+        """
+        :return: The paths of the workbooks written so far, the first being the path given.
+        """
+        return list(self._paths)
+
+    def _workbook_path(self):
+        if not self._paths:
+            return self._path
+        if not isinstance(self._path, (str, os.PathLike)):
+            raise ValueError("Rows which need more than one workbook can only be written to a path.")
+        stem, suffix = os.path.splitext(os.fspath(self._path))
+        return f"{stem}_{len(self._paths) + 1}{suffix}"
+
+    def _new_sheet(self) -> str:
+        """
+        Finishes the current sheet, and workbook if it is full, and starts the next sheet.
+        :return: The new sheet's name.
+        """
+        self._end_sheet()
+        if self._zip is not None and self._sheets_per_workbook and len(self._sheets) >= self._sheets_per_workbook:
+            self._end_workbook()
+        if self._zip is None:
+            path = self._workbook_path()
+            self._paths.append(path)
+            self._zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1)
+        self._sheet_number += 1
+        name = self._sheet_name if self._sheet_number == 1 else f"{self._sheet_name} ({self._sheet_number})"
+        self._open_sheet(name)
+        return name
+
+    def _open_sheet(self, name: str) -> type[None]:
+        self._sheets.append(name)
+        self._sheet = self._zip.open(f"xl/worksheets/sheet{len(self._sheets)}.xml", 'w', force_zip64=True)
+        self._sheet.write(_XLSX_SHEET_START)
+        self._sheet_rows = 0
+
+    def _end_sheet(self) -> type[None]:
+        if self._sheet is not None:
+            self._sheet.write(_XLSX_SHEET_END)
+            self._sheet.close()
+            self._sheet = None
+
+    def _end_workbook(self) -> type[None]:
+        self._end_sheet()
+        sheets = range(1, len(self._sheets) + 1)
+        self._zip.writestr('[Content_Types].xml', _XLSX_CONTENT_TYPES.format(
+            sheets=''.join(_XLSX_SHEET_TYPE.format(n=n) for n in sheets)))
+        self._zip.writestr('_rels/.rels', _XLSX_PACKAGE_RELS)
+        self._zip.writestr('xl/workbook.xml', _XLSX_WORKBOOK.format(sheets=''.join(
+            f'<sheet name="{escape(name, {chr(34): "&quot;"})}" sheetId="{n}" r:id="rId{n}"/>'
+            for n, name in zip(sheets, self._sheets))))
+        self._zip.writestr('xl/_rels/workbook.xml.rels', _XLSX_WORKBOOK_RELS.format(
+            sheets=''.join(_XLSX_SHEET_REL.format(n=n) for n in sheets)))
+        self._zip.writestr('xl/styles.xml', _XLSX_STYLES)
+        self._zip.close()
+        self._zip = None
+        self._sheets = []
+
+    def _write_header(self) -> type[None]:
+        headers = self._headers if self._with_grand_total else self._headers[:-1]
+        cells = ''.join(_xlsx_cell(1, column + 1, header) for column, header in enumerate(headers))
+        self._sheet.write(f'<row r="1">{cells}</row>'.encode())
+        self._sheet_rows = 1
+
+    def set_grand_total(self, grand_total: float) -> type[None]:
+        self._grand_total = grand_total
+        if self._summary is not None:
+            self._summary.set_grand_total(grand_total)
+
+    def _write(self, chunk) -> type[None]:
+        if self._summary is not None:
+            self._summary.write(chunk)
+        number_of_dice = chunk.rolls.shape[1]
+        rows = len(chunk.totals)
+        columns = [np.arange(chunk.start, chunk.start + rows)]
+        columns.extend(chunk.rolls[:, i] for i in range(number_of_dice))
+        columns.append(chunk.totals)
+        if self._with_grand_total:
+            columns.append(running_totals(chunk) if self._grand_total is None else np.full(rows, self._grand_total))
+        written = 0
+        while written < rows:
+            if self._sheet is None or self._sheet_rows == self._max_rows:
+                self._new_sheet()
+                self._write_header()
+            part = slice(written, written + min(rows - written, self._max_rows - self._sheet_rows))
+            self._sheet.write(format_xlsx_rows([column[part] for column in columns], self._float_format))
+            self._sheet_rows += part.stop - part.start
+            written = part.stop
+
+    def _write_summary(self) -> type[None]:
+        rolls_summary = self._summary
+        statistics = [('rolls', rolls_summary.rows_written()), ('grand_total', self._grand_total),
+                      ('mean', rolls_summary.mean()), ('variance', rolls_summary.variance()),
+                      ('std', rolls_summary.std()), ('min', rolls_summary.min()), ('max', rolls_summary.max())]
+        from src.api.summary import SUMMARY_QUANTILES
+        statistics.extend((f"{q:.0%}", rolls_summary.quantile(q)) for q in SUMMARY_QUANTILES)
+        totals, total_counts = rolls_summary.total_counts()
+        faces, face_counts = rolls_summary.face_counts()
+        tables = [(['statistic', 'value'], statistics),
+                  ([self._headers[-2], 'count'], list(zip(totals.tolist(), total_counts.tolist()))),
+                  (['face', 'count'], list(zip(faces.tolist(), face_counts.tolist())))]
+        rows = {}
+        for table, (headers, records) in enumerate(tables):
+            for row, record in enumerate([headers] + records, 1):
+                rows.setdefault(row, []).extend(_xlsx_cell(row, table * 3 + column, value)
+                                                for column, value in enumerate(record)
+                                                if value is not None)
+        if self._zip is None:
+            self._paths.append(self._workbook_path())
+            self._zip = zipfile.ZipFile(self._paths[-1], 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1)
+        self._end_sheet()
+        self._open_sheet('Summary')
+        for row in sorted(rows):
+            self._sheet.write(f'<row r="{row}">{"".join(rows[row])}</row>'.encode())
+
+    def close(self) -> type[None]:
+        if self._sheet is None and self._zip is None and not self._paths:
+            self._new_sheet()  # a workbook of no rows still has its header
+            self._write_header()
+        if self._summary is not None:
+            self._write_summary()
+        if self._zip is not None:
+            self._end_workbook()
+
+
+class TextChunkWriter(ChunkWriter):
+    """
+    Prints each chunk as a text table, with the header on the first chunk only.
+    """
+    def __init__(self, buf, headers: list[str]):
+        """
+        :param buf: An open text buffer such as sys.stdout.
+        :param headers: one header per die, then the row total's and the running grand total's headers.
+        """
+        super().__init__(headers)
+        self._buf = buf
+        self._widths = [0] * (len(headers) + 1)  # grows as chunks are printed, to keep later chunks aligned
+
+    def _write(self, chunk) -> type[None]:
+        columns = chunk.rolls.T.tolist()
+        columns.append(chunk.totals.tolist())
+        columns.append(running_totals(chunk).tolist())
+        self._buf.write(format_text_table(self._headers, columns,
+                                          start=chunk.start,
+                                          header=self._rows_written == 0,
+                                          widths=self._widths))
+        self._buf.write('\n')
+
+
+class NpyChunkWriter(ChunkWriter):
+    """
+    Writes the die columns and the row total into one 2-d .npy file through numpy.lib.format.open_memmap, so each
+    chunk is copied straight into the file.  The grand total is the sum of the last column.
+    """
+    def __init__(self, path, headers: list[str], number_of_rolls: int, dtype):
+        """
+        :param path: Where to save the .npy file.
+        :param headers: one header per die, then the row total's header and optionally the grand total's.
+        :param number_of_rolls: The number of rows the file will hold.
+        :param dtype: The dtype of every column, such as one from compact_dtype.
+        """
+        super().__init__(headers)
+        number_of_dice = len(headers) - 2
+        self._dtype = np.dtype(dtype)
+        self._array = np.lib.format.open_memmap(path, mode='w+', dtype=self._dtype,
+                                                shape=(number_of_rolls, number_of_dice + 1))
+
+    def _write(self, chunk) -> type[None]:
+        rows = slice(chunk.start, chunk.start + len(chunk.totals))
+        self._array[rows, :-1] = cast_column(chunk.rolls, self._dtype)
+        self._array[rows, -1] = cast_column(chunk.totals, self._dtype)
+
+    def close(self) -> type[None]:
+        self._array.flush()
+        del self._array
+
+
+class _ArrowChunkWriter(ChunkWriter):
+    """
+    The shared part of the Arrow IPC and Parquet writers: each chunk becomes one record batch with one column per die
+    and a row total column.
+    """
+    def __init__(self, headers: list[str], rolls_dtype, totals_dtype):
+        super().__init__(headers)
+        self._pa = _require_pyarrow()
+        self._rolls_dtype = np.dtype(rolls_dtype)
+        self._totals_dtype = np.dtype(totals_dtype)
+        number_of_dice = len(headers) - 2
+        fields = [self._pa.field(header, self._pa.from_numpy_dtype(self._rolls_dtype))
+                  for header in headers[:number_of_dice]]
+        fields.append(self._pa.field(headers[number_of_dice], self._pa.from_numpy_dtype(self._totals_dtype)))
+        self._schema = self._pa.schema(fields)
+
+    def _record_batch(self, chunk):
+        rolls = cast_column(chunk.rolls, self._rolls_dtype)
+        columns = [self._pa.array(np.ascontiguousarray(rolls[:, i])) for i in range(rolls.shape[1])]
+        columns.append(self._pa.array(cast_column(chunk.totals, self._totals_dtype)))
+        return self._pa.RecordBatch.from_arrays(columns, schema=self._schema)
+
+
+class ArrowChunkWriter(_ArrowChunkWriter):
+    """
+    Writes an Arrow IPC file, one record batch per chunk.  It needs pyarrow.
+    """
+    def __init__(self, path, headers: list[str], rolls_dtype, totals_dtype):
+        """
+        :param path: Where to save the Arrow file.
+        :param headers: one header per die, then the row total's header and optionally the grand total's.
+        :param rolls_dtype: The dtype of the die columns.
+        :param totals_dtype: The dtype of the row total column.
+        """
+        super().__init__(headers, rolls_dtype, totals_dtype)
+        self._writer = self._pa.ipc.new_file(path, self._schema)
+
+    def _write(self, chunk) -> type[None]:
+        self._writer.write_batch(self._record_batch(chunk))
+
+    def close(self) -> type[None]:
+        self._writer.close()
+
+
+class ParquetChunkWriter(_ArrowChunkWriter):
+    """
+    Writes a Parquet file, one row group per chunk.  It needs pyarrow.
+    """
+    def __init__(self, path, headers: list[str], rolls_dtype, totals_dtype):
+        """
+        :param path: Where to save the Parquet file.
+        :param headers: one header per die, then the row total's header and optionally the grand total's.
+        :param rolls_dtype: The dtype of the die columns.
+        :param totals_dtype: The dtype of the row total column.
+        """
+        super().__init__(headers, rolls_dtype, totals_dtype)
+        import pyarrow.parquet
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def _write(self, chunk) -> type[None]:
+        self._writer.write_batch(self._record_batch(chunk))
+
+    def close(self) -> type[None]:
+        self._writer.close()
@@ -1,58 +1,189 @@
 # shdroll.py
+import sys
+from contextlib import ExitStack
+import numpy as np
+
 from src.cli.shdroll_cli_parser import SimpleHDRollCliParser
+from src.api import convergence
 from src.api import core
+from src.api import distribution
+from src.api import mapped
+from src.api import notation
+from src.api import profiling
+from src.api import summary
+from src.api import writers
+
+
+def run(kwargs, out=None, rng: np.random.Generator = None) -> type[None]:
+    """
+    Rolls, or computes the exact distribution of, the dice one set of parsed arguments describes, and writes the
+    table or summary to 'out' and any exports to their paths.
+    :param kwargs: an argparse.Namespace from SimpleHDRollCliParser.
+    :param out: Where to print.  None is sys.stdout.
+    :param rng: A numpy.random.Generator for an unseeded run, instead of the calling thread's own.
+    :return: None.
+    """
+    out = out or sys.stdout
+
+    # Create an n-sided die.
+    if kwargs.add is not None:
+        transform = core.add_currying(kwargs.add)
+    elif kwargs.mult is not None:
+        transform = core.multiply_currying(kwargs.mult)
+    else:
+        transform = None
+
+    # Create a die, per se
+    if kwargs.expr is not None:
+        die = notation.ExpressionDie(kwargs.expr, transform_fn=transform)
+    else:
+        die = core.IntegerDie(transform_fn=transform,
+                              sides=kwargs.sides,
+                              base=kwargs.base)
+
+
+    # Creating dice
+    if kwargs.add_total is not None:
+        transform = core.add_currying(kwargs.add_total)
+    elif kwargs.mult_total is not None:
+        transform = core.multiply_currying(kwargs.mult_total)
+    else:
+        transform = None
+
+    # create M dice to throw
+    dice = core.Dice(die,
+                     transform_fn=transform,
+                     number_of_dice=kwargs.dice)
+
+    if kwargs.exact:
+        # Compute the distribution of one throw's total instead of sampling it.
+        exact = distribution.default_cache.from_dice(dice)
+        if kwargs.to_csv:
+            exact.to_pandas().to_csv(kwargs.to_csv, index=False)
+        if kwargs.to_xlsx:
+            exact.to_pandas().to_excel(kwargs.to_xlsx, index=False)
+        if kwargs.print_args: print(kwargs, file=out)
+        print(exact.to_string(), file=out)
+        print(f"mean: {exact.mean()}  variance: {exact.variance()}", file=out)
+        return
+
+    if kwargs.converge is not None:
+        # Roll only as many times as the precision needs.
+        estimate = convergence.estimate(dice, kwargs.statistic, kwargs.converge,
+                                        q=kwargs.quantile,
+                                        at_least=kwargs.at_least,
+                                        relative=kwargs.relative,
+                                        confidence=kwargs.confidence,
+                                        max_samples=kwargs.max_rolls,
+                                        seed=kwargs.seed,
+                                        workers=kwargs.workers,
+                                        rng=rng)
+        if kwargs.print_args: print(kwargs, file=out)
+        print(estimate.to_string(), file=out)
+        return
+
+    # Roll the set of dice.
+    if kwargs.add_grand_total is not None:
+        transform = core.add_currying(kwargs.add_grand_total)
+    elif kwargs.mult_grand_total is not None:
+        transform = core.multiply_currying(kwargs.mult_grand_total)
+    else:
+        transform = None
+
+    # Throw the set of dice K-times.
+    rolls = core.Rolls(dice,
+                       transform_fn=transform,
+                       number_of_rolls=kwargs.rolls,
+                       stream=kwargs.chunk_size is not None or kwargs.summary,
+                       workers=kwargs.workers,
+                       seed=kwargs.seed,
+                       rng=rng)
+
+    if rolls.is_streaming():
+        # One pass over the chunks feeds every output, so they all see the same rolls.
+        headers = rolls.stream_headers()
+        if kwargs.print_args: print(kwargs, file=out)
+        with ExitStack() as stack:
+            if kwargs.summary:
+                # Aggregate the rolls instead of printing them; exports still receive every row.
+                rolls_summary = summary.RollsSummary(headers)
+                chunk_writers = [stack.enter_context(rolls_summary)]
+            else:
+                chunk_writers = [stack.enter_context(writers.TextChunkWriter(out, headers))]
+            if kwargs.to_csv:
+                chunk_writers.append(stack.enter_context(writers.CsvChunkWriter(kwargs.to_csv, headers,
+                                                                                footer=kwargs.grand_total_footer)))
+            if kwargs.to_xlsx:
+                chunk_writers.append(stack.enter_context(
+                    writers.XlsxChunkWriter(kwargs.to_xlsx, headers,
+                                            summary=kwargs.xlsx_summary,
+                                            sheets_per_workbook=kwargs.xlsx_sheets_per_workbook)))
+            if kwargs.to_npy:
+                dtype = np.promote_types(*rolls.column_dtypes())
+                chunk_writers.append(stack.enter_context(writers.NpyChunkWriter(kwargs.to_npy, headers,
+                                                                                kwargs.rolls, dtype)))
+            if kwargs.to_mapped:
+                chunk_writers.append(stack.enter_context(mapped.MappedChunkWriter(kwargs.to_mapped,
+                                                                                  rolls.headers(with_totals=True),
+                                                                                  kwargs.rolls,
+                                                                                  *rolls.column_dtypes(),
+                                                                                  spec=mapped.dice_spec(rolls),
+                                                                                  seed=rolls.seed())))
+            if kwargs.to_arrow:
+                chunk_writers.append(stack.enter_context(writers.ArrowChunkWriter(kwargs.to_arrow, headers,
+                                                                                  *rolls.column_dtypes())))
+            if kwargs.to_parquet:
+                chunk_writers.append(stack.enter_context(writers.ParquetChunkWriter(kwargs.to_parquet, headers,
+                                                                                    *rolls.column_dtypes())))
+            for chunk in rolls.roll_chunks(kwargs.chunk_size or core.DEFAULT_CHUNK_SIZE):
+                for chunk_writer in chunk_writers:
+                    chunk_writer.write(chunk)
+            for chunk_writer in chunk_writers:
+                chunk_writer.set_grand_total(rolls.total())
+        if kwargs.summary:
+            print(rolls_summary.to_string(), file=out)
+        else:
+            print(f"grand_total: {rolls.total()}", file=out)
+        return
+
+    if kwargs.to_csv:
+        rolls.rolls_to_csv(kwargs.to_csv, grand_total_footer=kwargs.grand_total_footer)
 
-# parse tha command line arguments
-parse_cli_args = SimpleHDRollCliParser()
-kwargs = parse_cli_args.parse()
+    if kwargs.to_xlsx:
+        rolls.rolls_to_excel(kwargs.to_xlsx,
+                             summary=kwargs.xlsx_summary,
+                             sheets_per_workbook=kwargs.xlsx_sheets_per_workbook)
 
-# Create an n-sided die.
-if kwargs.add is not None:
-    transform = core.add_currying(kwargs.add)
-elif kwargs.mult is not None:
-    transform = core.multiply_currying(kwargs.mult)
-else:
-    transform = None
+    if kwargs.to_npy:
+        rolls.rolls_to_npy(kwargs.to_npy)
 
-# Create a die, per se
-die = core.IntegerDie(transform_fn=transform,
-                      sides=kwargs.sides,
-                      base=kwargs.base)
+    if kwargs.to_mapped:
+        rolls.rolls_to_mapped(kwargs.to_mapped).close()
 
+    if kwargs.to_arrow:
+        rolls.rolls_to_arrow(kwargs.to_arrow)
 
-# Creating dice
-if kwargs.add_total is not None:
-    transform = core.add_currying(kwargs.add_total)
-elif kwargs.mult_total is not None:
-    transform = core.multiply_currying(kwargs.mult_total)
-else:
-    transform = None
+    if kwargs.to_parquet:
+        rolls.rolls_to_parquet(kwargs.to_parquet)
 
-# create M dice to throw
-dice = core.Dice(die,
-                 transform_fn=transform,
-                 number_of_dice=kwargs.dice)
 
-# Roll the set of dice.
-if kwargs.add_grand_total is not None:
-    transform = core.add_currying(kwargs.add_grand_total)
-elif kwargs.mult_grand_total is not None:
-    transform = core.multiply_currying(kwargs.mult_grand_total)
-else:
-    transform = None
+    if kwargs.print_args: print(kwargs, file=out)
+    print(rolls.to_string(), file=out)
 
-# Throw the set of dice K-times.
-rolls = core.Rolls(dice,
-                   transform_fn=transform,
-                   number_of_rolls=kwargs.rolls)
 
+def main() -> type[None]:
+    # parse tha command line arguments
+    parse_cli_args = SimpleHDRollCliParser()
+    kwargs = parse_cli_args.parse()
 
-if kwargs.to_csv:
-    rolls.rolls_to_csv(kwargs.to_csv)
+    if kwargs.profile is not None:
+        profiling.start(kwargs.profile or None)
 
-if kwargs.to_xlsx:
-    rolls.rolls_to_excel(kwargs.to_xlsx)
+    if kwargs.batch is not None:
+        from src.cli import shdroll_batch
+        sys.exit(shdroll_batch.main(kwargs))
+    run(kwargs)
 
 
-if kwargs.print_args: print(kwargs)
-print(rolls.to_string())
+if __name__ == '__main__':
+    main()
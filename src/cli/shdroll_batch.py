@@ -0,0 +1,146 @@
+# shdroll_batch.py
+"""
+Batch jobs for shdroll: many dice specs and outputs run in one process, so the interpreter, numpy and pandas start
+once rather than once per spec.
+
+    python -m src.cli.shdroll --batch jobs.jsonl --jobs 4 --seed 7
+    generate_jobs | python -m src.cli.shdroll --batch -
+
+A JSON lines job file has one job per line, and blank lines and lines starting with '#' are skipped:
+
+    {"name": "3d6", "dice": 3, "rolls": 100000, "to_csv": "3d6.csv", "summary": true, "output": "3d6.txt"}
+    {"expr": "4d6kh3", "dice": 6, "rolls": 10, "seed": 42}
+
+A TOML job file has one [[job]] table per job with the same keys.  Jobs without a seed of their own draw from
+their own generator, or with workers from their own seed, spawned from the batch's --seed, so a seeded batch is
+repeatable and jobs run at once never share a generator.
+"""
+import io
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from src.cli import shdroll
+from src.cli.shdroll_cli_parser import SimpleHDRollCliParser
+
+
+def _require_tomllib():
+    """
+    Imports tomllib, which is in the standard library from Python 3.11, or the 'tomli' package it came from.
+    :return: the module.
+    """
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError as error:
+            raise ImportError("TOML job files need Python 3.11 or the optional 'tomli' package.") from error
+    return tomllib
+
+
+def parse_jobs(text: str, toml: bool = None) -> list[dict]:
+    """
+    :param text: the contents of a job file.
+    :param toml: True for TOML, False for JSON lines, or None to take TOML unless the first job starts with '{'.
+    :return: A list of job dicts.
+    """
+    if toml is None:
+        lines = [line.lstrip() for line in text.splitlines() if line.strip() and not line.lstrip().startswith('#')]
+        toml = bool(lines) and not lines[0].startswith('{')
+    if toml:
+        jobs = _require_tomllib().loads(text).get('job', [])
+    else:
+        jobs = []
+        for number, line in enumerate(text.splitlines(), 1):
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            try:
+                jobs.append(json.loads(line))
+            except ValueError as error:
+                raise SyntaxError(f"Line {number} of the job file is not JSON: {error}") from error
+    for job in jobs:
+        if not isinstance(job, dict):
+            raise SyntaxError("Each job must be a JSON object or a TOML table.")
+    return jobs
+
+
+def load_jobs(path) -> list[dict]:
+    """
+    :param path: a job file, or '-' for stdin.  A '.toml' file is read as TOML.
+    :return: A list of job dicts.
+    """
+    if path == '-':
+        return parse_jobs(sys.stdin.read())
+    with open(path, encoding='utf-8') as file:
+        return parse_jobs(file.read(), toml=True if str(path).endswith('.toml') else None)
+
+
+def run_jobs(jobs: list[dict], defaults=None, concurrency: int = 1, seed: int = None, out=None) -> int:
+    """
+    Runs the jobs in one process.  Each job's exports are streamed to their own paths as it runs.  What a job would
+    print goes to its 'output' path, or else to 'out' under a '== name ==' line, in the order of the jobs.
+    :param jobs: job dicts, as parse_jobs returns.
+    :param defaults: the parsed command line, whose options the jobs override, or None.
+    :param concurrency: The number of jobs run at once, in threads.
+    :param seed: The entropy the generators of the unseeded jobs are spawned from.  None draws fresh entropy.
+    :param out: Where to print.  None is sys.stdout.
+    :return: The number of jobs which failed.  Their errors are printed to stderr.
+    """
+    out = out or sys.stdout
+    parser = SimpleHDRollCliParser()
+    children = np.random.SeedSequence(seed).spawn(len(jobs))
+
+    def execute(index: int, job_out):
+        job = dict(jobs[index])
+        job.pop('name', None)
+        output = job.pop('output', None)
+        kwargs = parser.job_arguments(job, defaults)
+        rng = None
+        if kwargs.seed is None and kwargs.workers is None:
+            rng = np.random.default_rng(children[index])
+        elif kwargs.seed is None:
+            kwargs.seed = int(children[index].generate_state(1, np.uint64)[0])  # workers need a seed, not a generator
+        if output is None:
+            shdroll.run(kwargs, out=job_out, rng=rng)
+        else:
+            with open(output, 'w', encoding='utf-8') as file:
+                shdroll.run(kwargs, out=file, rng=rng)
+
+    names = [str(job.get('name', f"job {index + 1}")) for index, job in enumerate(jobs)]
+    failures = 0
+    if concurrency <= 1:
+        for index, name in enumerate(names):
+            print(f"== {name} ==", file=out, flush=True)
+            try:
+                execute(index, out)
+            except Exception as error:  # noqa: one job's failure does not stop the batch
+                print(f"{name}: {error}", file=sys.stderr)
+                failures += 1
+        return failures
+
+    buffers = [io.StringIO() for _ in jobs]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(execute, index, buffers[index]) for index in range(len(jobs))]
+        for name, future, buffer in zip(names, futures, buffers):
+            error = future.exception()
+            print(f"== {name} ==", file=out)
+            out.write(buffer.getvalue())
+            out.flush()
+            if error is not None:
+                print(f"{name}: {error}", file=sys.stderr)
+                failures += 1
+    return failures
+
+
+def main(kwargs) -> int:
+    """
+    Runs the batch the --batch option names.
+    :param kwargs: the parsed command line.
+    :return: The exit status, 1 if any job failed.
+    """
+    jobs = load_jobs(kwargs.batch)
+    seed = kwargs.seed
+    kwargs.seed = None  # the batch's seed seeds each job's generator, rather than every job the same
+    return 1 if run_jobs(jobs, kwargs, concurrency=kwargs.jobs, seed=seed) else 0
@@ -2,6 +2,18 @@
 import argparse
 
 
+def positive_int(value) -> int:
+    """
+    An argparse type for counts which must be at least 1.
+    :param value: the option's value.
+    :return: the value as an int.
+    """
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {number}")
+    return number
+
+
 class SimpleHDRollCliParser:
 
     def __init__(self):
@@ -22,6 +34,11 @@ class SimpleHDRollCliParser:
                                  help="The number of times to roll a set of dice. It must be at least 1.  "
                                       "Rolls defaults to 1.")
 
+        self.parser.add_argument('--expr', '-e', default=None,
+                                 help="Dice notation to roll as each die instead of --sides and --base, "
+                                      "e.g. '4d6kh3 + 2d8! - 1'.  Supports kh, kl, dh, dl, !, r, ro, + - * / "
+                                      "and parentheses.")
+
         self.parser.add_argument('--add', '-a', type=float, default=None,
                                  help="A number to add to each die. Enter a negative number to subtract."
                                       "--add is mutually exclusive with --mult.")
@@ -46,19 +63,116 @@ class SimpleHDRollCliParser:
                                       "Enter decimal less than one to divide."
                                       "--melt-grand-total is mutually exclusive with --add-grand-total")
 
+        self.parser.add_argument('--exact', action='store_true',
+                                 help="Print the exact probability distribution of one throw's total instead of "
+                                      "rolling.  --rolls and the grand-total options are ignored.")
+
+        self.parser.add_argument('--chunk-size', type=positive_int, default=None,
+                                 help="Stream the rolls this many rows at a time instead of holding the whole table "
+                                      "in memory.  The rightmost column becomes a running grand total.")
+
+        self.parser.add_argument('--summary', action='store_true',
+                                 help="Print counts of each face and total, the mean, variance and quantiles of the "
+                                      "totals instead of the rolls.  No rows are kept in memory.")
+
+        self.parser.add_argument('--converge', type=float, default=None, metavar='PRECISION',
+                                 help="Roll in batches only until the --statistic of the totals is known to within "
+                                      "PRECISION, the half-width of its confidence interval, and print it with the "
+                                      "rolls and seconds it took.  --rolls and the grand-total options are ignored.")
+        self.parser.add_argument('--statistic', choices=('mean', 'quantile', 'tail'), default='mean',
+                                 help="What --converge estimates: the mean of the totals, their --quantile, or the "
+                                      "probability that a total is at least --at-least.  Defaults to mean.")
+        self.parser.add_argument('--quantile', type=float, default=0.5,
+                                 help="The quantile --statistic quantile estimates, between 0 and 1.  Defaults to 0.5.")
+        self.parser.add_argument('--at-least', type=float, default=None,
+                                 help="The smallest total --statistic tail counts.")
+        self.parser.add_argument('--confidence', type=float, default=0.95,
+                                 help="The confidence of the interval --converge narrows.  Defaults to 0.95.")
+        self.parser.add_argument('--relative', action='store_true',
+                                 help="Take the --converge precision as a fraction of the estimate.")
+        self.parser.add_argument('--max-rolls', type=int, default=100_000_000,
+                                 help="The most rolls --converge makes before giving up.  Defaults to 100,000,000.")
+
+        self.parser.add_argument('--workers', type=int, default=None,
+                                 help="The number of processes to share the rolling.  The same seed gives the same "
+                                      "rolls for any number of workers.")
+
+        self.parser.add_argument('--seed', type=int, default=None,
+                                 help="Seed the rolls so that a run can be repeated exactly.")
+
+        self.parser.add_argument('--profile', nargs='?', const='', default=None, metavar='PSTATS_PATH',
+                                 help="Print the time, samples and bytes of each stage of the core API to stderr on "
+                                      "exit.  Given a path, also dump a cProfile of the whole run there.  Setting "
+                                      "HDR_PROFILE=1, or HDR_PROFILE to a path, does the same.")
+
+        self.parser.add_argument('--batch', default=None, metavar='JOB_FILE',
+                                 help="Run every job in a JSON lines or TOML file, or '-' for JSON lines on stdin, in "
+                                      "this one process.  Each job takes the long options above as keys, e.g. "
+                                      "{\"dice\": 3, \"rolls\": 1000, \"to_csv\": \"3d6.csv\"}, plus 'name' and "
+                                      "'output', a path for what the job would print.  The other options on the "
+                                      "command line, except the output paths, are the defaults of every job.")
+        self.parser.add_argument('--jobs', type=int, default=1,
+                                 help="The number of batch jobs run at once, in threads.  Defaults to 1.")
+
         self.parser.add_argument('--to-csv', default=None,
                                  help="The output path for a CSV file of the results.-")
+        self.parser.add_argument('--grand-total-footer', action='store_true',
+                                 help="Write the grand total once in a footer of the CSV file instead of in a column. "
+                                      "A '.gz' or '.zst' CSV path is compressed.")
         self.parser.add_argument('--to-xlsx', default=None,
                                  help="The output path for an Excel file of the results.")
+        self.parser.add_argument('--xlsx-summary', action='store_true',
+                                 help="Write the grand total once, on a Summary sheet with the moments, quantiles "
+                                      "and histograms of the totals and faces, instead of in a column of the XLSX.")
+        self.parser.add_argument('--xlsx-sheets-per-workbook', type=int, default=None,
+                                 help="Start a new workbook, named with '_2', '_3' and so on, after this many sheets. "
+                                      "A sheet holds at most 1,048,575 rows, after which the rows go on a new sheet.")
+        self.parser.add_argument('--to-npy', default=None,
+                                 help="The output path for a compact 2-d .npy array of the dice and row totals.")
+        self.parser.add_argument('--to-mapped', default=None,
+                                 help="The output path for a memory-mapped rolls file, with a header recording the "
+                                      "dice, the seed and the grand total, which can be re-opened without loading it.")
+        self.parser.add_argument('--to-arrow', default=None,
+                                 help="The output path for an Arrow IPC file of the results.  Needs pyarrow.")
+        self.parser.add_argument('--to-parquet', default=None,
+                                 help="The output path for a Parquet file of the results.  Needs pyarrow.")
 
-    def parse(self):
-        kwargs = self.parser.parse_args()
+    def parse(self, args: list[str] = None):
+        kwargs = self.parser.parse_args(args)
+        self.validate(kwargs)
+        return kwargs
 
+    @staticmethod
+    def validate(kwargs) -> type[None]:
         if kwargs.add is not None and kwargs.mult is not None:
             raise SyntaxError("--add and --mult cannot both be used.")
         if kwargs.add_total is not None and kwargs.mult_total is not None:
             raise SyntaxError("--add-total and --mult-total cannot both be used.")
         if kwargs.add_grand_total is not None and kwargs.mult_grand_total is not None:
             raise SyntaxError("--add-grand-total and --mult-grand-total cannot both be used.")
+        if kwargs.converge is not None and kwargs.statistic == 'tail' and kwargs.at_least is None:
+            raise SyntaxError("--statistic tail needs --at-least.")
 
+    def job_arguments(self, job: dict, defaults=None):
+        """
+        Turns one batch job into the arguments of a single run.
+        :param job: a dict from long option names, with '-' or '_', to values.
+        :param defaults: the parsed command line, whose values other than the output paths the job overrides.  None
+            uses the parser's defaults.
+        :return: an argparse.Namespace like parse returns.
+        """
+        kwargs = argparse.Namespace(**vars(defaults if defaults is not None else self.parser.parse_args([])))
+        actions = {action.dest: action for action in self.parser._actions}
+        for name in vars(kwargs):
+            if name.startswith('to_'):
+                setattr(kwargs, name, None)  # one file per job, never shared between jobs
+        for key, value in job.items():
+            name = key.replace('-', '_')
+            if name in ('batch', 'jobs', 'profile', 'help') or name not in actions:
+                raise SyntaxError(f"Unknown batch job option '{key}'.")
+            if value is not None:
+                value = actions[name].type(value) if actions[name].type else value
+            setattr(kwargs, name, value)
+        kwargs.batch = None
+        self.validate(kwargs)
         return kwargs
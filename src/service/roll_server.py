@@ -0,0 +1,437 @@
+# roll_server.py
+"""
+A local asyncio roll service speaking line-delimited JSON over TCP.
+
+    python -m src.service.roll_server --port 8765
+
+Each request is one JSON object on one line, and each response is one line with the same 'id':
+
+    {"id": 1, "sides": 6, "base": 1, "dice": 3, "rolls": 2}
+    {"id": 1, "rolls": [[4, 1, 6], [2, 2, 5]], "totals": [11, 9], "grand_total": 20}
+
+    {"id": 2, "expr": "4d6kh3", "dice": 6, "seed": 42}      dice notation, and a seed for a repeatable table
+    {"id": 3, "op": "distribution", "sides": 6, "dice": 3}  the exact distribution of integer dice, cached
+    {"id": 4, "op": "metrics"}                              latency, throughput, batching and cache counters
+
+Unseeded requests for the same dice which arrive within 'batch_window' seconds of each other, or by default in the
+same turn of the event loop, are rolled as one vectorized table and split between them.  Responses on one
+connection may come back out of order.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from functools import lru_cache, partial
+import numpy as np
+
+from src.api import core
+from src.api import distribution
+from src.api import notation
+from src.api import profiling
+
+# The most rows one request may ask for.
+MAX_ROLLS = 1_000_000
+
+# The most dice one request may roll, over all its rows, and the most totals an exact distribution may have.
+MAX_DICE = 10_000_000
+MAX_SUPPORT = 1_000_000
+
+# Requests rolling at least this many dice, or answered with at least this many numbers, are rolled and encoded in a
+# thread, so that one large request does not hold up every other client's.
+OFFLOAD_SIZE = 100_000
+
+# The rows encoded at a time.  Encoding holds the GIL, so a large response is encoded in slices to let the event loop
+# run between them.
+ENCODE_ROWS = 8192
+
+# The longest request line, in bytes.  A longer one is answered with an error and its connection closed.
+MAX_LINE_BYTES = 1 << 20
+
+# How many recent request latencies the metrics keep for their percentiles.
+LATENCY_WINDOW = 10_000
+
+
+@lru_cache(maxsize=1024)
+def dice_for(spec: tuple) -> core.Dice:
+    """
+    Builds, once, the Dice a spec describes.  Dice.dice_throws does not change the Dice, so one object serves every
+    request for the spec.
+    :param spec: a tuple from spec_key.
+    :return: A core.Dice.
+    """
+    if spec[0] == 'expr':
+        _, expression, number_of_dice = spec
+        return core.Dice(notation.ExpressionDie(expression), number_of_dice=number_of_dice)
+    _, sides, base, number_of_dice = spec
+    return core.Dice(core.IntegerDie(sides=sides, base=base), number_of_dice=number_of_dice)
+
+
+def _integer(request: dict, name: str, default: int, minimum: int = None) -> int:
+    value = request.get(name, default)
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ValueError(f"'{name}' must be an integer.")
+    if minimum is not None and value < minimum:
+        raise ValueError(f"'{name}' must be at least {minimum}.")
+    return value
+
+
+def spec_key(request: dict) -> tuple:
+    """
+    The canonical, hashable description of the dice a request rolls.
+    :param request: a decoded request.
+    :return: ('expr', expression, dice) or ('integer', sides, base, dice).
+    """
+    number_of_dice = _integer(request, 'dice', 1, minimum=1)
+    if 'expr' in request:
+        if not isinstance(request['expr'], str):
+            raise ValueError("'expr' must be a string.")
+        return 'expr', notation.compile_expression(request['expr']).expression(), number_of_dice
+    return 'integer', _integer(request, 'sides', 6, minimum=1), _integer(request, 'base', 1), number_of_dice
+
+
+def _roll_response(throws, totals) -> dict:
+    """
+    :return: The response to a roll request, from its rows, which stay numpy arrays until _encode writes them.
+    """
+    grand_total = totals.sum().item()
+    if not np.isfinite(grand_total):
+        raise ValueError("The totals are not finite numbers, e.g. from a division by 0.")
+    return {'rolls': throws, 'totals': totals, 'grand_total': grand_total}
+
+
+def _rolled(spec: tuple, number_of_rolls: int, seed: int = None) -> dict:
+    """
+    Rolls one request's rows on their own, in whichever thread calls it; Dice.dice_throws does not change the Dice.
+    :return: The response to the roll request.
+    """
+    with np.errstate(all='ignore'):  # a division by 0 is reported as an error response instead
+        throws, totals = dice_for(spec).dice_throws(number_of_rolls, seed=seed)
+    return _roll_response(throws, totals)
+
+
+def _distribution_response(sides: int, base: int, number_of_dice: int) -> dict:
+    exact = distribution.default_cache.get(sides, base, number_of_dice)
+    return {'totals': exact.support(), 'probabilities': exact.pmf(), 'mean': exact.mean(), 'variance': exact.variance()}
+
+
+def _size(response: dict) -> int:
+    """
+    :return: How many numbers the arrays of a response hold, which is what encoding it costs.
+    """
+    return sum(value.size for value in response.values() if isinstance(value, np.ndarray))
+
+
+def _encode(response: dict) -> str:
+    """
+    Encodes a response as json.dumps would, with its numpy arrays as lists, 'ENCODE_ROWS' rows at a time.
+    :return: One line of JSON.
+    """
+    fields = []
+    for key, value in response.items():
+        if isinstance(value, np.ndarray):
+            pieces = (json.dumps(value[start:start + ENCODE_ROWS].tolist())[1:-1]
+                      for start in range(0, len(value), ENCODE_ROWS))
+            encoded = f"[{', '.join(pieces)}]"
+        else:
+            encoded = json.dumps(value)
+        fields.append(f"{json.dumps(key)}: {encoded}")
+    return f"{{{', '.join(fields)}}}"
+
+
+class RollMetrics:
+    """
+    RollMetrics counts requests, errors, batches and rows, and keeps a window of recent latencies.
+    """
+    def __init__(self):
+        self._started = time.perf_counter()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.rows = 0
+
+    def request(self, seconds: float, error: bool = False) -> type[None]:
+        self.requests += 1
+        self.errors += error
+        self._latencies.append(seconds)
+
+    def batch(self, requests: int, rows: int) -> type[None]:
+        self.batches += 1
+        self.batched_requests += requests
+        self.rows += rows
+
+    def snapshot(self, in_flight: int = 0) -> dict:
+        """
+        :return: A JSON-ready dict of the counters, request throughput and latency percentiles in milliseconds, and
+            the core API's stage timings if profiling is enabled.
+        """
+        uptime = time.perf_counter() - self._started
+        latencies = np.asarray(self._latencies) * 1000
+        cache = dice_for.cache_info()
+        snapshot = {'uptime_s': uptime,
+                    'requests': self.requests,
+                    'errors': self.errors,
+                    'rejected': self.rejected,
+                    'in_flight': in_flight,
+                    'requests_per_s': self.requests / uptime if uptime else 0.0,
+                    'rows': self.rows,
+                    'batches': self.batches,
+                    'mean_batch_size': self.batched_requests / self.batches if self.batches else 0.0,
+                    'latency_p50_ms': float(np.percentile(latencies, 50)) if latencies.size else None,
+                    'latency_p99_ms': float(np.percentile(latencies, 99)) if latencies.size else None,
+                    'spec_cache_hits': cache.hits,
+                    'spec_cache_misses': cache.misses}
+        if profiling.is_enabled():
+            snapshot['stages'] = profiling.stages()
+        return snapshot
+
+
+class _Batch:
+    """
+    The unseeded requests for one spec waiting to be rolled together.
+    """
+    def __init__(self):
+        self.requests = []  # (number_of_rolls, future)
+        self.rows = 0
+
+
+class RollServer:
+    """
+    RollServer serves rolls over line-delimited JSON.  Small concurrent requests for the same dice are coalesced
+    into one vectorized draw.  At most 'max_in_flight' requests are handled at once; beyond that the server stops
+    reading from its connections, so clients are slowed by TCP flow control rather than queued without limit.
+    """
+    def __init__(self,
+                 host: str = '127.0.0.1',
+                 port: int = 0,
+                 batch_window: float = 0.0,
+                 max_batch_rows: int = 65_536,
+                 max_in_flight: int = 1024,
+                 max_rolls: int = MAX_ROLLS,
+                 max_dice: int = MAX_DICE,
+                 max_support: int = MAX_SUPPORT,
+                 offload_size: int = OFFLOAD_SIZE,
+                 max_line_bytes: int = MAX_LINE_BYTES):
+        """
+        :param host: The interface to listen on.  The default only accepts local connections.
+        :param port: The port to listen on.  0 picks a free port, which start() returns.
+        :param batch_window: How long, in seconds, the first request for a spec waits for others to join its batch.
+            0 batches the requests read in the same turn of the event loop without delaying any of them.
+        :param max_batch_rows: A batch is rolled at once when it reaches this many rows.
+        :param max_in_flight: The most requests handled at once, across all connections.
+        :param max_rolls: The most rows one request may ask for.
+        :param max_dice: The most dice one request may roll, rows times dice times the dice in an expression.
+        :param max_support: The most totals an exact distribution may have.
+        :param offload_size: The fewest dice rolled, or numbers answered, which are handled in a thread rather than
+            on the event loop.
+        :param max_line_bytes: The longest request line.
+        """
+        self._host = host
+        self._port = port
+        self._batch_window = batch_window
+        self._max_batch_rows = max_batch_rows
+        self._max_rolls = max_rolls
+        self._max_dice = max_dice
+        self._max_support = max_support
+        self._offload_size = offload_size
+        self._max_line_bytes = max_line_bytes
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._in_flight = 0
+        self._batches: dict[tuple, _Batch] = {}
+        self._server = None
+        self.metrics = RollMetrics()
+
+    async def start(self) -> tuple[str, int]:
+        """
+        Starts listening.
+        :return: The host and port listened on.
+        """
+        self._server = await asyncio.start_server(self._connection, self._host, self._port,
+                                                  limit=self._max_line_bytes)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self) -> type[None]:
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()
+
+    async def close(self) -> type[None]:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def handle(self, request: dict) -> dict:
+        """
+        Answers one decoded request.
+        :param request: a dict as described in this module's documentation.
+        :return: the response as a dict, whose lists of numbers may be numpy arrays.
+        """
+        started = time.perf_counter()
+        response = {'id': request.get('id')} if isinstance(request, dict) else {'id': None}
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object.")
+            if request.get('op', 'roll') == 'metrics':
+                response.update(self.metrics.snapshot(self.in_flight()))
+                return response
+            if request.get('op', 'roll') == 'distribution':
+                response.update(await self._distribution(spec_key(request)))
+            elif request.get('op', 'roll') != 'roll':
+                raise ValueError(f"Unknown op '{request['op']}'.")
+            else:
+                response.update(await self._roll(request))
+        except Exception as error:  # noqa: every request gets an answer, e.g. a RecursionError from a deep 'expr'
+            response['error'] = str(error) or type(error).__name__
+        self.metrics.request(time.perf_counter() - started, error='error' in response)
+        return response
+
+    async def _roll(self, request: dict) -> dict:
+        spec = spec_key(request)
+        number_of_rolls = _integer(request, 'rolls', 1, minimum=1)
+        if number_of_rolls > self._max_rolls:
+            raise ValueError(f"'rolls' must be at most {self._max_rolls}.")
+        dice_per_row = spec[-1] * (notation.compile_expression(spec[1]).number_of_dice() if spec[0] == 'expr' else 1)
+        if number_of_rolls * dice_per_row > self._max_dice:
+            raise ValueError(f"A request may roll at most {self._max_dice} dice in all.")
+        seed = request.get('seed')
+        if seed is not None:
+            seed = _integer(request, 'seed', None, minimum=0)
+        large = number_of_rolls * dice_per_row >= self._offload_size
+        if seed is not None or large:
+            # a seeded or large request is rolled on its own, and a large one in a thread
+            roll = partial(_rolled, spec, number_of_rolls, seed)
+            response = await asyncio.to_thread(roll) if large else roll()
+            self.metrics.batch(1, number_of_rolls)
+            return response
+        throws, totals = await self._batched_throws(spec, number_of_rolls)
+        return _roll_response(throws, totals)
+
+    async def _distribution(self, spec: tuple) -> dict:
+        """
+        The exact distribution of integer dice, from the shared distribution cache.
+        """
+        if spec[0] != 'integer':
+            raise ValueError("Exact distributions are only available for integer dice.")
+        _, sides, base, number_of_dice = spec
+        support = number_of_dice * (sides - 1) + 1
+        if support > self._max_support:
+            raise ValueError(f"An exact distribution may have at most {self._max_support} totals.")
+        answer = partial(_distribution_response, sides, base, number_of_dice)
+        return await asyncio.to_thread(answer) if support >= self._offload_size else answer()
+
+    async def _batched_throws(self, spec: tuple, number_of_rolls: int):
+        """
+        Joins the batch waiting for 'spec', or starts one, and waits for its share of the rows.
+        :return: A tuple of a 2-d numpy array of die rolls and a numpy array of each throw's total.
+        """
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(spec)
+        if batch is None:
+            batch = self._batches[spec] = _Batch()
+            loop.call_later(self._batch_window, self._flush, spec, batch)
+        future = loop.create_future()
+        batch.requests.append((number_of_rolls, future))
+        batch.rows += number_of_rolls
+        if batch.rows >= self._max_batch_rows:
+            self._flush(spec, batch)
+        return await future
+
+    def _flush(self, spec: tuple, batch: _Batch) -> type[None]:
+        """
+        Rolls a whole batch in one draw and hands each request its rows.
+        """
+        if self._batches.get(spec) is not batch:
+            return  # it filled up and was rolled before its window closed
+        del self._batches[spec]
+        try:
+            with np.errstate(all='ignore'):
+                throws, totals = dice_for(spec).dice_throws(batch.rows)
+        except Exception as error:  # noqa: any failure belongs to every request in the batch
+            for _, future in batch.requests:
+                future.set_exception(error)
+            return
+        self.metrics.batch(len(batch.requests), batch.rows)
+        start = 0
+        for number_of_rolls, future in batch.requests:
+            future.set_result((throws[start:start + number_of_rolls], totals[start:start + number_of_rolls]))
+            start += number_of_rolls
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> type[None]:
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # the line is longer than max_line_bytes, and the rest of the stream is unframed
+                    self.metrics.rejected += 1
+                    if tasks:
+                        await asyncio.gather(*tasks)
+                    error = {'id': None, 'error': f"A request line may be at most {self._max_line_bytes} bytes."}
+                    writer.write(json.dumps(error).encode() + b'\n')
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                await self._slots.acquire()  # no more reading from this connection until a request slot is free
+                self._in_flight += 1
+                task = asyncio.create_task(self._respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, line: bytes, writer: asyncio.StreamWriter) -> type[None]:
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                self.metrics.rejected += 1
+                response = {'id': None, 'error': "A request must be one line of JSON."}
+            else:
+                response = await self.handle(request)
+            if _size(response) >= self._offload_size:
+                encoded = await asyncio.to_thread(_encode, response)
+            else:
+                encoded = _encode(response)
+            writer.write(encoded.encode() + b'\n')
+            await writer.drain()
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+
+def main(argv: list[str] = None) -> type[None]:
+    parser = argparse.ArgumentParser(description="Serve Hackable Dice Roller rolls as line-delimited JSON.")
+    parser.add_argument('--host', default='127.0.0.1', help="The interface to listen on.  Defaults to localhost.")
+    parser.add_argument('--port', type=int, default=8765, help="The port to listen on.  Defaults to 8765.")
+    parser.add_argument('--batch-window', type=float, default=0.0,
+                        help="Seconds to wait for concurrent requests for the same dice to batch together.  "
+                             "0, the default, batches requests read together without waiting.")
+    parser.add_argument('--max-in-flight', type=int, default=1024,
+                        help="The most requests handled at once before the server stops reading.")
+    args = parser.parse_args(argv)
+
+    async def serve():
+        server = RollServer(args.host, args.port, batch_window=args.batch_window, max_in_flight=args.max_in_flight)
+        host, port = await server.start()
+        print(f"Serving rolls on {host}:{port}", flush=True)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import unittest
+from unittest import mock
+import numpy as np
+from src.api import core as hdr
+from src.api import convergence
+from src.api import parallel
+
+
+class TestConvergence(unittest.TestCase):
+
+    def setUp(self):
+        self.dice = hdr.Dice(hdr.IntegerDie(), number_of_dice=3)
+
+    def test_mean(self):
+        """
+        The mean of 3d6 stops once its interval is narrow enough, covers the exact 10.5, and a seed repeats it.
+        :return: None.
+        """
+        estimate = self.dice.estimate('mean', precision=0.02, seed=5)
+        self.assertTrue(estimate.converged)
+        self.assertLessEqual(estimate.half_width(), 0.02)
+        self.assertLessEqual(estimate.low, 10.5)
+        self.assertGreaterEqual(estimate.high, 10.5)
+        self.assertGreater(estimate.samples, convergence.DEFAULT_BATCH_SIZE)
+        self.assertLess(estimate.samples, 1_000_000)
+        self.assertGreater(estimate.seconds, 0)
+        repeated = self.dice.estimate('mean', precision=0.02, seed=5)
+        self.assertEqual(estimate._replace(seconds=0), repeated._replace(seconds=0))
+
+    def test_quantile_and_tail(self):
+        """
+        The 90th percentile and P(total >= 15) of 3d6 land near their exact values, 14 and 20/216.
+        :return: None.
+        """
+        quantile = convergence.estimate(self.dice, 'quantile', q=0.9, precision=0.5, seed=1)
+        self.assertEqual(14, quantile.value)
+
+        tail = convergence.estimate(self.dice, 'tail', at_least=15, precision=0.002, seed=1)
+        self.assertTrue(tail.converged)
+        self.assertLessEqual(tail.low, 20 / 216)
+        self.assertGreaterEqual(tail.high, 20 / 216)
+
+        relative = convergence.estimate(self.dice, 'tail', at_least=15, precision=0.02, relative=True, seed=1)
+        self.assertLessEqual(relative.half_width(), 0.02 * relative.value)
+
+    def test_max_samples(self):
+        """
+        An unreachable precision stops unconverged at max_samples, and bad options are refused.
+        :return: None.
+        """
+        estimate = convergence.estimate(self.dice, precision=1e-6, batch_size=1000, max_samples=5000)
+        self.assertFalse(estimate.converged)
+        self.assertEqual(5000, estimate.samples)
+        self.assertRaises(ValueError, convergence.estimate, self.dice, 'median')
+        self.assertRaises(ValueError, convergence.estimate, self.dice, 'tail')
+        self.assertRaises(ValueError, convergence.estimate, self.dice, 'quantile', q=1.5)
+
+    def test_workers_without_a_seed(self):
+        """
+        Workers without a seed draw fresh entropy, as Rolls does, rather than silently rolling in one process.
+        :return: None.
+        """
+        with mock.patch.object(parallel, 'roll_rows', wraps=parallel.roll_rows) as roll_rows:
+            estimate = convergence.estimate(self.dice, precision=0.05, batch_size=1000, workers=2)
+        self.assertTrue(estimate.converged)
+        self.assertTrue(roll_rows.called)
+        self.assertTrue(all(call.args[-1] == 2 for call in roll_rows.call_args_list))
+        self.assertRaises(ValueError, convergence.estimate, self.dice, workers=2, rng=np.random.default_rng(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
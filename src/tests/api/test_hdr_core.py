@@ -1,5 +1,8 @@
+import io
 import unittest
 from src.api import core as hdr
+from src.api import parallel
+import numpy as np
 from numpy.random import binomial
 
 
@@ -23,6 +26,40 @@ class TestBinomialDie(unittest.TestCase):
         for _ in range(50):
             assert self.binomial_die.die_roll() in {0, 10, 20}
 
+    def test_binomial_is_drawn_in_blocks(self):
+        """
+        numpy.random.binomial has a 'size' keyword, so Rolls asks it for the whole table in one call.
+        :return: None.
+        """
+        calls = []
+
+        def counting_binomial(n, p, size=None):
+            calls.append(size)
+            return binomial(n, p, size=size)
+
+        binomial_die = hdr.Die(counting_binomial, "binomial * 10", hdr.multiply_currying(10), 2, 0.5)
+        dice = hdr.Dice(binomial_die, number_of_dice=3)
+        calls.clear()  # Die and Dice draw one sample and one throw when they are created
+        rolls = hdr.Rolls(dice, number_of_rolls=40)
+        self.assertEqual([(40, 3)], calls)
+        assert all(die_value in {0, 10, 20} for row in rolls.rolls() for die_value in row)
+
+    def test_sized_can_be_switched_off(self):
+        """
+        sized=False forces one call per sample even when the callable has a 'size' keyword.
+        :return: None.
+        """
+        calls = []
+
+        def counting_binomial(n, p, size=None):
+            calls.append(size)
+            return binomial(n, p, size=size)
+
+        binomial_die = hdr.Die(counting_binomial, "binomial", None, 2, 0.5, sized=False)
+        calls.clear()
+        hdr.Dice(binomial_die, number_of_dice=4)
+        self.assertEqual([None] * 4, calls)
+
 
 class TestIntegerDie(unittest.TestCase):
     """
@@ -119,6 +156,61 @@ class TestIntegerDie(unittest.TestCase):
         self.assertRaises(ValueError, hdr.IntegerDie, base=1, sides=0)
 
 
+class TestWeightedDie(unittest.TestCase):
+
+    def test_alias_table_matches_weights(self):
+        """
+        A loaded d6 rolls its 6 half the time, and every face in proportion to its weight.
+        :return: None.
+        """
+        loaded = hdr.WeightedDie([1, 2, 3, 4, 5, 6], [1, 1, 1, 1, 1, 5], rng=np.random.default_rng(13))
+        self.assertEqual('w6', loaded.die_name())
+        rolls = loaded.die_rolls(200_000)
+        frequencies = np.bincount(rolls, minlength=7)[1:] / rolls.size
+        np.testing.assert_allclose([0.1] * 5 + [0.5], frequencies, atol=0.005)
+        self.assertIn(loaded.die_roll(), range(1, 7))
+
+    def test_zero_weight_never_rolls(self):
+        """
+        A face with no weight is never rolled.
+        :return: None.
+        """
+        die = hdr.WeightedDie([10, 20, 30], [0, 1, 3])
+        self.assertNotIn(10, die.die_rolls(10_000))
+
+    def test_bad_weights(self):
+        """
+        Weights must match the faces, must not be negative and must not all be 0.
+        :return: None.
+        """
+        self.assertRaises(ValueError, hdr.WeightedDie, [1, 2], [1])
+        self.assertRaises(ValueError, hdr.WeightedDie, [1, 2], [1, -1])
+        self.assertRaises(ValueError, hdr.WeightedDie, [1, 2], [0, 0])
+        self.assertRaises(ValueError, hdr.WeightedDie, [], [])
+
+    def test_table_die(self):
+        """
+        Repeated entries of a table are folded into weights.
+        :return: None.
+        """
+        table = hdr.TableDie([1, 1, 2, 4], die_name='loot')
+        self.assertEqual('loot', table.die_name())
+        self.assertEqual([1, 2, 4], table.faces().tolist())
+        self.assertEqual([0.5, 0.25, 0.25], table.probabilities().tolist())
+
+    def test_seeded_rolls(self):
+        """
+        A weighted die rolls from a seed like an IntegerDie, the same for any number of workers, and its columns
+        are compact.
+        :return: None.
+        """
+        dice = hdr.Dice(hdr.WeightedDie([-2, 0, 5], [1, 2, 1]), number_of_dice=2)
+        rolls = hdr.Rolls(dice, number_of_rolls=1000, seed=21)
+        self.assertEqual(rolls.rolls(), hdr.Rolls(dice, number_of_rolls=1000, seed=21, workers=2).rolls())
+        self.assertEqual(rolls.rolls()[500:510], rolls.regenerate_rows(500, 510)[0].tolist())
+        self.assertEqual((np.dtype(np.int8), np.dtype(np.int8)), rolls.column_dtypes())
+
+
 class TestDice(unittest.TestCase):
 
     def test_1d_binomial(self):
@@ -178,6 +270,452 @@ class TestRolls(unittest.TestCase):
         two_d6 = hdr.Dice(die, number_of_dice=2)  # 2d6
         self.assertRaises(ValueError, hdr.Rolls, dice=two_d6, number_of_rolls=0)
 
+    def test_vectorized_totals_agree_with_rows(self):
+        """
+        The vectorized engine's row totals and grand total must agree with the rows it returns.
+        :return: None.
+        """
+        die = hdr.IntegerDie(sides=6)
+        three_d6 = hdr.Dice(die, number_of_dice=3)
+        rolls = hdr.Rolls(dice=three_d6, number_of_rolls=500)
+        rows = rolls.rolls()
+        self.assertEqual(500, len(rows))
+        self.assertEqual([sum(row) for row in rows], rolls.list_of_totals())
+        self.assertEqual(sum(rolls.list_of_totals()), rolls.total())
+        assert all(1 <= die_value <= 6 for row in rows for die_value in row)
+
+    def test_vectorized_transforms(self):
+        """
+        Die, dice and grand total transforms are applied to whole arrays with the same results as before.
+        :return: None.
+        """
+        die = hdr.IntegerDie(transform_fn=hdr.add_currying(9), sides=1)  # always 10
+        two_d1 = hdr.Dice(die, transform_fn=hdr.multiply_currying(2), number_of_dice=2)  # always 40
+        rolls = hdr.Rolls(dice=two_d1, transform_fn=hdr.add_currying(1), number_of_rolls=3)
+        self.assertEqual([[10, 10]] * 3, rolls.rolls())
+        self.assertEqual([40] * 3, rolls.list_of_totals())
+        self.assertEqual(121, rolls.total())
+        self.assertEqual([[10, 10, 40, 121]] * 3, rolls.rolls_with_totals())
+        self.assertEqual((3, 4), rolls.rolls_to_numpy(with_totals=True).shape)
+
+    def test_non_broadcasting_transform(self):
+        """
+        A transform which cannot be applied to a whole array is applied element by element.
+        :return: None.
+        """
+        die = hdr.IntegerDie(transform_fn=lambda y: y if y > 3 else 0, sides=6)
+        rolls = hdr.Rolls(dice=hdr.Dice(die, number_of_dice=2), number_of_rolls=50)
+        assert all(die_value in {0, 4, 5, 6} for row in rolls.rolls() for die_value in row)
+
+
+class TestStreamingRolls(unittest.TestCase):
+
+    def test_stream_does_not_materialize(self):
+        """
+        A streaming Rolls draws nothing until its chunks are consumed.
+        :return: None.
+        """
+        rolls = hdr.Rolls(hdr.Dice(hdr.IntegerDie(), number_of_dice=2), number_of_rolls=10, stream=True)
+        self.assertTrue(rolls.is_streaming())
+        self.assertEqual([], rolls.rolls())
+
+    def test_chunks_and_running_total(self):
+        """
+        Chunks cover every row once, and the running total ends at the grand total.
+        :return: None.
+        """
+        die = hdr.IntegerDie(sides=1)  # always 1
+        rolls = hdr.Rolls(hdr.Dice(die, number_of_dice=3), hdr.add_currying(1), number_of_rolls=10, stream=True)
+        chunks = list(rolls.roll_chunks(chunk_size=4))
+        self.assertEqual([0, 4, 8], [chunk.start for chunk in chunks])
+        self.assertEqual([(4, 3), (4, 3), (2, 3)], [chunk.rolls.shape for chunk in chunks])
+        self.assertEqual([12, 24, 30], [chunk.running_total for chunk in chunks])
+        self.assertEqual(31, rolls.total())
+
+    def test_streamed_csv(self):
+        """
+        A streamed CSV has one header and a running grand total column.
+        :return: None.
+        """
+        die = hdr.IntegerDie(sides=1)
+        rolls = hdr.Rolls(hdr.Dice(die, number_of_dice=2), number_of_rolls=3, stream=True)
+        buf = io.StringIO()
+        rolls.rolls_to_csv(buf)
+        self.assertEqual(",d1_0,d1_1,2_*_d1_roll_total,running_grand_total\n"
+                         "0,1,1,2,2\n"
+                         "1,1,1,2,4\n"
+                         "2,1,1,2,6\n", buf.getvalue())
+
+    def test_bad_chunk_size(self):
+        """
+        Chunks must have at least one row.
+        :return: None.
+        """
+        rolls = hdr.Rolls(hdr.Dice(hdr.IntegerDie()), number_of_rolls=3, stream=True)
+        self.assertRaises(ValueError, list, rolls.roll_chunks(chunk_size=0))
+
+
+class TestSeededRolls(unittest.TestCase):
+
+    def test_seed_is_reproducible(self):
+        """
+        The same seed gives the same table.
+        :return: None.
+        """
+        dice = hdr.Dice(hdr.IntegerDie(sides=20), number_of_dice=3)
+        first = hdr.Rolls(dice, number_of_rolls=100, seed=1234)
+        second = hdr.Rolls(dice, number_of_rolls=100, seed=1234)
+        self.assertEqual(first.rolls(), second.rolls())
+        self.assertEqual(first.total(), second.total())
+
+    def test_workers_do_not_change_the_table(self):
+        """
+        A seeded table spanning several blocks is identical whether one process or two draw it, and when streamed.
+        :return: None.
+        """
+        dice = hdr.Dice(hdr.IntegerDie(transform_fn=hdr.add_currying(1)), number_of_dice=2)
+        number_of_rolls = 2 * parallel.BLOCK_SIZE + 10
+        serial = hdr.Rolls(dice, number_of_rolls=number_of_rolls, seed=99)
+        pooled = hdr.Rolls(dice, number_of_rolls=number_of_rolls, seed=99, workers=2)
+        self.assertTrue(np.array_equal(serial.rolls_to_numpy(with_totals=True),
+                                       pooled.rolls_to_numpy(with_totals=True)))
+        streamed = hdr.Rolls(dice, number_of_rolls=number_of_rolls, seed=99, stream=True)
+        chunks = np.concatenate([chunk.rolls for chunk in streamed.roll_chunks(chunk_size=50_000)])
+        self.assertTrue(np.array_equal(serial.rolls_to_numpy(), chunks))
+        self.assertEqual(serial.total(), streamed.total())
+
+    def test_streaming_uses_the_workers(self):
+        """
+        Streamed chunks of a table with workers are drawn a block per worker at a time, in the pool, and are still
+        the serial table's rows.
+        :return: None.
+        """
+        from unittest import mock
+        submitted = []
+        executor = parallel._executor
+
+        class CountingPool:
+            def __init__(self, pool):
+                self._pool = pool
+
+            def submit(self, *args):
+                submitted.append((int(args[3]), int(args[4])))  # (_roll_rows, sampler, seed, start, stop, dice)
+                return self._pool.submit(*args)
+
+        dice = hdr.Dice(hdr.IntegerDie(), number_of_dice=2)
+        number_of_rolls = 2 * parallel.BLOCK_SIZE + 10
+        streamed = hdr.Rolls(dice, number_of_rolls=number_of_rolls, seed=5, workers=2, stream=True)
+        with mock.patch.object(parallel, '_executor', lambda workers: CountingPool(executor(workers))):
+            chunks = list(streamed.roll_chunks(chunk_size=50_000))
+        self.assertEqual([(0, parallel.BLOCK_SIZE), (parallel.BLOCK_SIZE, 2 * parallel.BLOCK_SIZE)], submitted)
+        self.assertEqual([0, 50_000, 100_000, 131_072], [chunk.start for chunk in chunks])
+        serial = hdr.Rolls(dice, number_of_rolls=number_of_rolls, seed=5)
+        self.assertTrue(np.array_equal(serial.rolls_to_numpy(), np.concatenate([chunk.rolls for chunk in chunks])))
+        self.assertEqual(serial.total(), streamed.total())
+
+    def test_workers_record_a_seed(self):
+        """
+        Workers without a seed draw fresh entropy which repeats the run.
+        :return: None.
+        """
+        dice = hdr.Dice(hdr.IntegerDie(), number_of_dice=2)
+        rolls = hdr.Rolls(dice, number_of_rolls=20, workers=2)
+        self.assertIsNotNone(rolls.seed())
+        self.assertEqual(rolls.rolls(), hdr.Rolls(dice, number_of_rolls=20, seed=rolls.seed()).rolls())
+
+    def test_regenerate_rows(self):
+        """
+        Any slice of a seeded run can be drawn again on its own.
+        :return: None.
+        """
+        dice = hdr.Dice(hdr.IntegerDie(sides=100), number_of_dice=2)
+        number_of_rolls = parallel.BLOCK_SIZE + 100
+        rolls = hdr.Rolls(dice, number_of_rolls=number_of_rolls, seed=7)
+        table = rolls.rolls_to_numpy()
+        for start, stop in [(0, 5), (parallel.BLOCK_SIZE - 3, parallel.BLOCK_SIZE + 3), (number_of_rolls - 1,
+                                                                                         number_of_rolls)]:
+            regenerated, totals = rolls.regenerate_rows(start, stop)
+            self.assertTrue(np.array_equal(table[start:stop], regenerated))
+            self.assertEqual(rolls.list_of_totals()[start:stop], totals.tolist())
+        self.assertRaises(ValueError, rolls.regenerate_rows, 0, number_of_rolls + 1)
+        self.assertRaises(ValueError, hdr.Rolls(dice, number_of_rolls=3).regenerate_rows, 0, 1)
+
+    def test_injected_generator(self):
+        """
+        Dice draw from an injected numpy Generator, and named Generator methods can be seeded too.
+        :return: None.
+        """
+        first = hdr.Dice(hdr.IntegerDie(rng=np.random.default_rng(5)), number_of_dice=10)
+        second = hdr.Dice(hdr.IntegerDie(rng=np.random.default_rng(5)), number_of_dice=10)
+        self.assertEqual(first.throws(), second.throws())
+        overridden = hdr.Dice(hdr.IntegerDie(), number_of_dice=10, rng=np.random.default_rng(6))
+        self.assertEqual(np.random.default_rng(6).integers(1, 7, size=10).tolist(), overridden.throws())
+
+        binomial_die = hdr.Die("binomial", "binomial", None, 2, 0.5)
+        dice = hdr.Dice(binomial_die, number_of_dice=3)
+        seeded = hdr.Rolls(dice, number_of_rolls=50, seed=3)
+        self.assertEqual(seeded.rolls(), hdr.Rolls(dice, number_of_rolls=50, seed=3).rolls())
+        assert all(die_value in {0, 1, 2} for row in seeded.rolls() for die_value in row)
+
+    def test_seed_and_rng_are_exclusive(self):
+        """
+        A Rolls is either seeded or drawn from a generator, and workers, which always draw from a seed, cannot be
+        given a generator to ignore.
+        :return: None.
+        """
+        dice = hdr.Dice(hdr.IntegerDie())
+        self.assertRaises(ValueError, hdr.Rolls, dice, seed=1, rng=np.random.default_rng(1))
+        self.assertRaises(ValueError, hdr.Rolls, dice, workers=4, rng=np.random.default_rng(1))
+
+    def test_arbitrary_callable_cannot_be_seeded(self):
+        """
+        A Die over an arbitrary callable has no sampler for a given generator.
+        :return: None.
+        """
+        dice = hdr.Dice(hdr.Die(binomial, "binomial", None, 2, 0.5))
+        self.assertRaises(ValueError, hdr.Rolls, dice, number_of_rolls=5, seed=1)
+
+
+class TestReadOnlyViews(unittest.TestCase):
+
+    def test_no_instance_dict(self):
+        """
+        Die, IntegerDie, Dice and Rolls are slotted, so they carry no per-instance __dict__.
+        :return: None.
+        """
+        die = hdr.IntegerDie()
+        dice = hdr.Dice(die, number_of_dice=2)
+        rolls = hdr.Rolls(dice, number_of_rolls=3)
+        for obj in [hdr.Die(binomial, "", None, 10, 0.5), die, dice, rolls]:
+            self.assertFalse(hasattr(obj, '__dict__'))
+            self.assertRaises(AttributeError, setattr, obj, 'extra', 1)
+
+    def test_views_equal_copies(self):
+        """
+        The views hold the same values as the copying accessors, share memory with the results, and are read-only.
+        :return: None.
+        """
+        dice = hdr.Dice(hdr.IntegerDie(), number_of_dice=4)
+        self.assertEqual(dice.throws(), dice.throws_view().tolist())
+        rolls = hdr.Rolls(dice, number_of_rolls=50)
+        self.assertEqual(rolls.rolls(), rolls.rolls_view().tolist())
+        self.assertEqual(rolls.list_of_totals(), rolls.totals_view().tolist())
+        self.assertTrue(np.shares_memory(rolls.rolls_view(), rolls.rolls_view()))
+        with self.assertRaises(ValueError):
+            rolls.rolls_view()[0, 0] = 99
+        with self.assertRaises(ValueError):
+            dice.throws_view()[0] = 99
+
+    def test_view_outlives_next_throw(self):
+        """
+        A view keeps the results it was taken from after the dice are thrown again.
+        :return: None.
+        """
+        rolls = hdr.Rolls(hdr.Dice(hdr.IntegerDie(sides=1000), number_of_dice=3), number_of_rolls=20)
+        view = rolls.rolls_view()
+        before = view.tolist()
+        rolls.roll_n_times()
+        self.assertEqual(before, view.tolist())
+
+
+class TestTableConversion(unittest.TestCase):
+
+    def test_pandas_matches_row_lists(self):
+        """
+        The column-built DataFrame equals one built from a list per row, dtypes included.
+        :return: None.
+        """
+        import pandas as pd
+        dice = hdr.Dice(hdr.IntegerDie(transform_fn=hdr.multiply_currying(0.5)), number_of_dice=2)
+        for rolls in [hdr.Rolls(hdr.Dice(hdr.IntegerDie(), number_of_dice=3), number_of_rolls=40),
+                      hdr.Rolls(dice, transform_fn=hdr.add_currying(1), number_of_rolls=40)]:
+            for with_totals in (False, True):
+                rows = rolls.rolls_with_totals() if with_totals else rolls.rolls()
+                expected = pd.DataFrame(data=rows, columns=rolls.headers(with_totals))
+                pd.testing.assert_frame_equal(expected, rolls.rolls_to_pandas(with_totals))
+        dice = hdr.Dice(hdr.IntegerDie(), number_of_dice=3)
+        expected = pd.DataFrame([dice.rolls_with_total()], columns=dice.headers(True), dtype=float)
+        pd.testing.assert_frame_equal(expected, dice.dice_to_pandas(with_total=True))
+
+    def test_pandas_dtypes(self):
+        """
+        'compact' shrinks the columns, 'category' lists every face, and the grand total is one broadcast value.
+        :return: None.
+        """
+        rolls = hdr.Rolls(hdr.Dice(hdr.IntegerDie(sides=20), number_of_dice=2), number_of_rolls=5)
+        compact = rolls.rolls_to_pandas(with_totals=True, dtype='compact')
+        self.assertEqual([np.int8, np.int8, np.int8], compact.dtypes.tolist()[:3])
+        self.assertEqual([rolls.total()] * 5, compact['grand_total'].tolist())
+        category = rolls.rolls_to_pandas(dtype='category')
+        self.assertEqual(list(range(1, 21)), category['d20_0'].cat.categories.tolist())
+        self.assertEqual(rolls.rolls(), category.astype(int).values.tolist())
+        self.assertEqual(np.float32, rolls.rolls_to_pandas(with_totals=True, dtype=np.float32).dtypes.iloc[-2])
+
+    def test_numpy_without_copying(self):
+        """
+        rolls_to_numpy and dice_to_numpy share memory with the table unless a copy is asked for.
+        :return: None.
+        """
+        dice = hdr.Dice(hdr.IntegerDie(), number_of_dice=3)
+        rolls = hdr.Rolls(dice, number_of_rolls=10)
+        table = rolls.rolls_to_numpy()
+        self.assertTrue(np.shares_memory(table, rolls.rolls_view()))
+        self.assertFalse(table.flags.writeable)
+        self.assertTrue(rolls.rolls_to_numpy(copy=True).flags.writeable)
+        self.assertFalse(np.shares_memory(rolls.rolls_to_numpy(copy=True), table))
+        self.assertTrue(np.shares_memory(dice.dice_to_numpy(), dice.throws_view()))
+
+        with_totals = rolls.rolls_to_numpy(with_totals=True)
+        self.assertEqual(rolls.list_of_totals(), with_totals[:, -2].tolist())
+        self.assertEqual([rolls.total()] * 10, with_totals[:, -1].tolist())
+
+
+class TestReroll(unittest.TestCase):
+
+    def test_dice_reroll(self):
+        """
+        Rerolling the 1s changes only those dice, and the total follows, transform included.
+        :return: None.
+        """
+        dice = hdr.Dice(hdr.IntegerDie(sides=4), transform_fn=hdr.add_currying(10), number_of_dice=8)
+        before = dice.throws()
+        event = dice.reroll_where(lambda d: d == 1)
+        ones = [i for i, roll in enumerate(before) if roll == 1]
+        self.assertEqual(ones, event.indices.tolist())
+        self.assertEqual([1] * len(ones), event.old.tolist())
+        after = dice.throws()
+        self.assertEqual([roll for i, roll in enumerate(before) if i not in ones],
+                         [roll for i, roll in enumerate(after) if i not in ones])
+        self.assertEqual(sum(after) + 10, dice.total())
+        self.assertEqual(dice.total(), event.total)
+        self.assertRaises(IndexError, dice.reroll, [8])
+
+    def test_rolls_reroll(self):
+        """
+        Rerolling cells, rows and a predicate keeps the row totals and the grand total equal to a full recount.
+        :return: None.
+        """
+        dice = hdr.Dice(hdr.IntegerDie(), transform_fn=hdr.multiply_currying(2), number_of_dice=3)
+        rolls = hdr.Rolls(dice, transform_fn=hdr.add_currying(-1), number_of_rolls=1000)
+        rolls.reroll([0, 0, 5], [1, 1, 2])
+        rolls.reroll_rows([3, 999])
+        event = rolls.reroll_where(lambda d: d == 6)
+        self.assertEqual([3], rolls.reroll_log()[1].changed_rows[:1].tolist())
+        self.assertEqual(3, len(rolls.reroll_log()))
+        table = rolls.rolls_to_numpy()
+        self.assertEqual((table.sum(axis=1) * 2).tolist(), rolls.list_of_totals())
+        self.assertEqual(sum(rolls.list_of_totals()) - 1, rolls.total())
+        self.assertEqual(rolls.total(), event.grand_total)
+        self.assertRaises(ValueError, rolls.reroll, [1000], [0])
+
+        rolls.roll_n_times()
+        self.assertEqual([], rolls.reroll_log())
+
+    def test_apply_reroll(self):
+        """
+        A copy brought up to date from the reroll events holds the same table.
+        :return: None.
+        """
+        rolls = hdr.Rolls(hdr.Dice(hdr.IntegerDie(), number_of_dice=4), number_of_rolls=100, seed=3)
+        copy = hdr.Rolls(hdr.Dice(hdr.IntegerDie(), number_of_dice=4), number_of_rolls=100, seed=3)
+        for event in [rolls.reroll_where(lambda d: d < 3), rolls.reroll_rows([7])]:
+            copy.apply_reroll(event)
+        self.assertEqual(rolls.rolls(), copy.rolls())
+        self.assertEqual(rolls.list_of_totals(), copy.list_of_totals())
+        self.assertEqual(rolls.total(), copy.total())
+
+    def test_streaming_cannot_reroll(self):
+        """
+        A streaming Rolls holds no table to reroll.
+        :return: None.
+        """
+        rolls = hdr.Rolls(hdr.Dice(hdr.IntegerDie()), number_of_rolls=10, stream=True)
+        self.assertRaises(ValueError, rolls.reroll_rows, [0])
+
+
+
+class TestConcurrentRolls(unittest.TestCase):
+
+    def test_thread_streams(self):
+        """
+        Each thread keeps one generator of its own, and no two threads share one.
+        :return: None.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        import threading
+        barrier = threading.Barrier(4)
+
+        def streams():
+            barrier.wait()  # all four threads are alive at once, so none is reused
+            return parallel.thread_rng(), parallel.thread_rng()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            pairs = list(executor.map(lambda _: streams(), range(4)))
+        self.assertTrue(all(first is second for first, second in pairs))
+        self.assertEqual(4, len({id(first) for first, _ in pairs}))
+        self.assertEqual(4, len({first.bit_generator.seed_seq.spawn_key for first, _ in pairs}))
+
+    def test_one_pool_per_worker_count(self):
+        """
+        Threads asking for the process pool of the same worker count at once all get the same pool.
+        :return: None.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        import threading
+        barrier = threading.Barrier(8)
+
+        def pool(_):
+            barrier.wait()
+            return parallel._executor(7)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            pools = list(executor.map(pool, range(8)))
+        self.assertEqual(1, len({id(pool) for pool in pools}))
+        parallel._executors.pop(7).shutdown()
+
+    def test_stateless_results(self):
+        """
+        throw, roll and sample leave the objects as they were and return results which cannot be changed.
+        :return: None.
+        """
+        dice = hdr.Dice(hdr.IntegerDie(), transform_fn=hdr.add_currying(1), number_of_dice=3)
+        before = dice.rolls_with_total()
+        result = dice.throw()
+        self.assertEqual(before, dice.rolls_with_total())
+        self.assertEqual(result.throws.sum() + 1, result.total)
+        self.assertRaises(ValueError, result.throws.__setitem__, 0, 7)
+
+        rolls = hdr.Rolls(dice, transform_fn=hdr.multiply_currying(2), number_of_rolls=100, seed=9)
+        table = rolls.roll()
+        self.assertTrue(np.array_equal(rolls.rolls_view(), table.rolls))
+        self.assertEqual(rolls.list_of_totals(), table.totals.tolist())
+        self.assertEqual(rolls.total(), table.grand_total)
+        self.assertFalse(table.totals.flags.writeable)
+
+        die = hdr.IntegerDie()
+        value = die.die_value()
+        die.sample()
+        self.assertEqual(value, die.die_value())
+
+    def test_shared_across_threads(self):
+        """
+        One Dice and one Rolls thrown by many threads at once give whole, consistent results to each.
+        :return: None.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        dice = hdr.Dice(hdr.IntegerDie(sides=20), transform_fn=hdr.add_currying(5), number_of_dice=4)
+        rolls = hdr.Rolls(dice, number_of_rolls=1000, stream=True)
+
+        def work(_):
+            throws = [dice.throw() for _ in range(200)]
+            tables = [rolls.roll() for _ in range(5)]
+            return (all(throw.throws.sum() + 5 == throw.total for throw in throws) and
+                    all(table.totals.sum() == table.grand_total for table in tables) and
+                    all(np.array_equal(table.rolls.sum(axis=1) + 5, table.totals) for table in tables))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            self.assertTrue(all(executor.map(work, range(16))))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,173 @@
+import tempfile
+import unittest
+import numpy as np
+from itertools import product
+from src.api import core as hdr
+from src.api import distribution as hdr_dist
+
+
+class TestDiceDistribution(unittest.TestCase):
+
+    def test_2d6(self):
+        """
+        The classic triangle: 2..12 with 7 the most likely total.
+        :return: None.
+        """
+        two_d6 = hdr_dist.DiceDistribution(sides=6, number_of_dice=2)
+        self.assertEqual(list(range(2, 13)), two_d6.support().tolist())
+        self.assertAlmostEqual(6 / 36, two_d6.probability(7))
+        self.assertAlmostEqual(7, two_d6.mean())
+        self.assertAlmostEqual(35 / 6, two_d6.variance())
+        self.assertAlmostEqual(1.0, two_d6.cdf()[-1])
+        self.assertEqual(7, two_d6.quantile(0.5))
+
+    def test_matches_enumeration(self):
+        """
+        Compare 3d4 with base 0 against brute-force enumeration.
+        :return: None.
+        """
+        three_d4 = hdr_dist.DiceDistribution(sides=4, base=0, number_of_dice=3)
+        counts = {}
+        for faces in product(range(4), repeat=3):
+            counts[sum(faces)] = counts.get(sum(faces), 0) + 1
+        for total, count in counts.items():
+            self.assertAlmostEqual(count / 64, three_d4.probability(total))
+
+    def test_fft_path_agrees_with_closed_form(self):
+        """
+        200d20 is large enough to use the FFT; its moments must agree with the closed form.
+        :return: None.
+        """
+        big = hdr_dist.DiceDistribution(sides=20, number_of_dice=200)
+        values, pmf = big.support(), big.pmf()
+        self.assertAlmostEqual(1.0, pmf.sum())
+        self.assertAlmostEqual(big.mean(), (values * pmf).sum(), places=6)
+        self.assertAlmostEqual(big.variance(), ((values - big.mean()) ** 2 * pmf).sum(), places=4)
+
+    def test_transforms(self):
+        """
+        Die and total transforms move and scale the support.
+        :return: None.
+        """
+        die = hdr.IntegerDie(transform_fn=hdr.multiply_currying(10), sides=2)
+        dice = hdr.Dice(die, transform_fn=hdr.add_currying(-1), number_of_dice=2)
+        exact = hdr_dist.DiceDistribution.from_dice(dice)
+        self.assertEqual([19, 29, 39], exact.support().tolist())
+        self.assertAlmostEqual(0.5, exact.probability(29))
+        self.assertAlmostEqual(29, exact.mean())
+
+    def test_negative_multiplier(self):
+        """
+        A negative multiplier reverses the support, which is still reported in ascending order.
+        :return: None.
+        """
+        exact = hdr_dist.DiceDistribution(sides=3, die_transform=hdr.multiply_currying(-1))
+        self.assertEqual([-3, -2, -1], exact.support().tolist())
+        self.assertAlmostEqual(2 / 3, exact.cumulative(-2))
+
+    def test_probability_of_one_total_on_a_wide_support(self):
+        """
+        The probability of a total of 200d1000 is that total's alone, not summed with its neighbours.
+        :return: None.
+        """
+        exact = hdr_dist.DiceDistribution(sides=1000, number_of_dice=200)
+        index = 150_000 - 200
+        self.assertEqual(exact.pmf()[index], exact.probability(150_000))
+        self.assertEqual(0.0, exact.probability(150_000.5))
+        self.assertEqual(0.0, exact.probability(10))
+        tenths = hdr_dist.DiceDistribution(sides=6, number_of_dice=3, dice_transform=hdr.multiply_currying(-0.1))
+        self.assertAlmostEqual(27 / 216, tenths.probability(-1.0))
+
+    def test_opaque_transform(self):
+        """
+        Arbitrary lambdas cannot be analysed exactly.
+        :return: None.
+        """
+        self.assertRaises(ValueError, hdr_dist.DiceDistribution, die_transform=lambda y: y ** 2)
+
+
+class TestDistributionCache(unittest.TestCase):
+
+    def test_memory_tier(self):
+        """
+        A repeated spec is a hit and returns the same object; the least recently used spec is dropped first.
+        :return: None.
+        """
+        cache = hdr_dist.DistributionCache(maxsize=2)
+        three_d6 = cache.get(sides=6, number_of_dice=3)
+        self.assertIs(three_d6, cache.get(sides=6, number_of_dice=3))
+        self.assertIs(three_d6, cache.from_dice(hdr.Dice(hdr.IntegerDie(), number_of_dice=3)))
+        cache.get(sides=20, number_of_dice=2)
+        cache.get(sides=6, number_of_dice=3)
+        four_d6 = cache.get(sides=6, number_of_dice=4)  # drops 2d20
+        self.assertEqual(hdr_dist.CacheInfo(hits=3, disk_hits=0, misses=3, size=2, maxsize=2,
+                                            nbytes=three_d6.nbytes() + four_d6.nbytes(),
+                                            maxbytes=hdr_dist.DEFAULT_MAX_BYTES), cache.cache_info())
+
+    def test_memory_bound(self):
+        """
+        The distributions held never take more than maxbytes, and one too large on its own is returned but not held.
+        :return: None.
+        """
+        wide = hdr_dist.DiceDistribution(sides=1000, number_of_dice=100)  # 99,901 totals
+        cache = hdr_dist.DistributionCache(maxbytes=2 * wide.nbytes())
+        for number_of_dice in (100, 101, 102):
+            cache.get(sides=1000, number_of_dice=number_of_dice)
+            self.assertLessEqual(cache.cache_info().nbytes, 2 * wide.nbytes())
+        self.assertEqual(1, cache.cache_info().size)  # each is larger than the last, so only one fits
+        cache.get(sides=6, number_of_dice=3)
+        self.assertEqual(2, cache.cache_info().size)
+
+        small = hdr_dist.DistributionCache(maxbytes=wide.nbytes() - 1)
+        self.assertEqual(wide.pmf().tolist(), small.get(sides=1000, number_of_dice=100).pmf().tolist())
+        self.assertEqual((0, 0), (small.cache_info().size, small.cache_info().nbytes))
+        self.assertRaises(ValueError, hdr_dist.DistributionCache, maxbytes=0)
+
+    def test_transforms_are_keys(self):
+        """
+        Transforms are keyed by their coefficients, so separately made but equal transforms share an entry.
+        :return: None.
+        """
+        cache = hdr_dist.DistributionCache()
+        plus_two = cache.get(sides=6, number_of_dice=2, dice_transform=hdr.add_currying(2))
+        self.assertIs(plus_two, cache.get(sides=6, number_of_dice=2, dice_transform=hdr.add_currying(2)))
+        self.assertIsNot(plus_two, cache.get(sides=6, number_of_dice=2))
+        self.assertEqual(hdr_dist.spec_key(6, 1, 2, None, hdr.add_currying(2)), plus_two.spec())
+
+    def test_disk_tier(self):
+        """
+        Another cache on the same directory reads the probabilities back, for any base or transform of the dice,
+        and they equal a fresh computation.
+        :return: None.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            hdr_dist.DistributionCache(directory=directory).get(sides=20, number_of_dice=50)
+            cache = hdr_dist.DistributionCache(directory=directory)
+            shifted = cache.get(sides=20, base=0, number_of_dice=50, die_transform=hdr.multiply_currying(-2))
+            self.assertEqual(1, cache.cache_info().disk_hits)
+            self.assertEqual(0, cache.cache_info().misses)
+            fresh = hdr_dist.DiceDistribution(sides=20, base=0, number_of_dice=50,
+                                              die_transform=hdr.multiply_currying(-2))
+            np.testing.assert_array_equal(fresh.support(), shifted.support())
+            np.testing.assert_allclose(fresh.pmf(), shifted.pmf())
+
+    def test_disk_tier_keeps_whole_offsets(self):
+        """
+        A constant total, from a multiplier of 0, still stores every face offset, and a file of the wrong length is
+        a miss rather than a wrong answer.
+        :return: None.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            constant = hdr_dist.DistributionCache(directory=directory).get(6, 1, 3, hdr.multiply_currying(0))
+            self.assertEqual([0.0], constant.support().tolist())
+            three_d6 = hdr_dist.DistributionCache(directory=directory).get(6, 1, 3)
+            self.assertEqual(list(range(3, 19)), three_d6.support().tolist())
+
+            np.save(f"{directory}/6_sides_2_dice.npy", np.ones(1))
+            cache = hdr_dist.DistributionCache(directory=directory)
+            self.assertEqual(list(range(2, 13)), cache.get(6, 1, 2).support().tolist())
+            self.assertEqual(1, cache.cache_info().misses)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from src.api import core as hdr
+from src.api import mapped
+from src.api import writers
+
+
+class TestMappedRolls(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.dice = hdr.Dice(hdr.IntegerDie(sides=20), number_of_dice=3)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def test_streamed_into_file(self):
+        """
+        A streamed seeded run written into a mapped file holds the same table as the run held in memory.
+        :return: None.
+        """
+        held = hdr.Rolls(self.dice, number_of_rolls=150_000, seed=5)
+        streamed = hdr.Rolls(self.dice, number_of_rolls=150_000, seed=5, stream=True)
+        store = streamed.rolls_to_mapped(self._path('rolls.hdr'))
+
+        self.assertEqual(150_000, len(store))
+        self.assertEqual((np.int8, np.int8), store.column_dtypes())
+        self.assertTrue(np.array_equal(held.rolls_view(), store.rolls_view()))
+        self.assertTrue(np.array_equal(held.totals_view(), store.totals_view()))
+        self.assertEqual(held.total(), store.total())
+        self.assertEqual(held.headers(with_totals=True), store.headers(with_totals=True))
+        self.assertEqual(held.headers(), store.headers())
+
+    def test_reopen_and_random_access(self):
+        """
+        A re-opened file gives rows, slices and the header back, and rolls_to_numpy is a map of the file.
+        :return: None.
+        """
+        rolls = hdr.Rolls(self.dice, transform_fn=hdr.add_currying(1), number_of_rolls=1000, seed=9)
+        mapped.MappedRolls.create(self._path('rolls.hdr'), rolls).close()
+
+        with mapped.MappedRolls(self._path('rolls.hdr')) as store:
+            self.assertEqual(9, store.seed())
+            self.assertEqual(rolls.total(), store.total())
+            self.assertEqual({'die': 'IntegerDie', 'die_name': rolls.dice().die().die_name(), 'number_of_dice': 3,
+                              'sides': 20, 'base': 1, 'die_transform': None, 'total_transform': None,
+                              'grand_total_transform': 'Affine(multiplier=1, addend=1)'}, store.spec())
+
+            dice, totals = store[500:510]
+            self.assertEqual(rolls.rolls()[500:510], dice.tolist())
+            self.assertEqual(rolls.list_of_totals()[500:510], totals.tolist())
+            self.assertIsInstance(dice, np.memmap)
+            self.assertEqual(rolls.rolls()[999], store[999][0].tolist())
+
+            table = store.rolls_to_numpy()
+            self.assertIsInstance(table, np.memmap)
+            self.assertFalse(table.flags.writeable)
+            self.assertEqual(rolls.rolls_to_numpy(with_totals=True).tolist(),
+                             store.rolls_to_numpy(with_totals=True).tolist())
+
+    def test_chunks_feed_writers(self):
+        """
+        The chunks of a mapped file drive the same writers and summaries as the Rolls it was written from.
+        :return: None.
+        """
+        rolls = hdr.Rolls(self.dice, number_of_rolls=2000, seed=3)
+        store = rolls.rolls_to_mapped(self._path('rolls.hdr'))
+        rolls_summary = store.summarize()
+        self.assertEqual(rolls.summarize().total_counts()[1].tolist(), rolls_summary.total_counts()[1].tolist())
+        self.assertEqual(rolls.total(), rolls_summary.grand_total())
+
+        chunks = list(store.roll_chunks(chunk_size=700))
+        self.assertEqual([0, 700, 1400], [chunk.start for chunk in chunks])
+        self.assertEqual(rolls.total(), chunks[-1].running_total)
+
+        store.write_chunks(writers.NpyChunkWriter(self._path('rolls.npy'), store.headers(with_totals=True),
+                                                  len(store), np.int16))
+        self.assertEqual(rolls.list_of_totals(), np.load(self._path('rolls.npy'))[:, -1].tolist())
+
+    def test_not_a_mapped_file(self):
+        """
+        Opening another kind of file raises.
+        :return: None.
+        """
+        with open(self._path('other.bin'), 'wb') as file:
+            file.write(b'not rolls at all')
+        self.assertRaises(ValueError, mapped.MappedRolls, self._path('other.bin'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import numpy as np
+from src.api import core as hdr
+from src.api import distribution as hdr_dist
+from src.api import notation
+
+
+class TestDiceNotation(unittest.TestCase):
+
+    def test_plain_dice_match_exact_distribution(self):
+        """
+        '3d6' rolled a million times matches the exact distribution of 3d6.
+        :return: None.
+        """
+        totals = notation.compile_expression('3d6').roll(1_000_000, np.random.default_rng(1))
+        exact = hdr_dist.DiceDistribution(sides=6, number_of_dice=3)
+        frequencies = np.bincount(totals, minlength=19)[3:] / totals.size
+        np.testing.assert_allclose(exact.pmf(), frequencies, atol=0.002)
+
+    def test_keep_and_drop(self):
+        """
+        Keeping the highest 3 of 4d6 is dropping the lowest 1, and keeping the lowest 1 of 2d20 is disadvantage.
+        :return: None.
+        """
+        rng = np.random.default_rng(2)
+        keep_highest = notation.compile_expression('4d6kh3').roll(200_000, rng)
+        self.assertEqual((3, 18), (keep_highest.min(), keep_highest.max()))
+        self.assertAlmostEqual(12.24, keep_highest.mean(), delta=0.03)
+        self.assertAlmostEqual(12.24, notation.compile_expression('4d6dl1').roll(200_000, rng).mean(), delta=0.03)
+        self.assertAlmostEqual(7.175, notation.compile_expression('2d20kl1').roll(200_000, rng).mean(), delta=0.05)
+
+    def test_explode_and_reroll(self):
+        """
+        An exploding d8 averages 4.5 * 8 / 7; rerolling 1s on a d6 averages 4; rerolling them once averages 3.5 + 5/12.
+        :return: None.
+        """
+        rng = np.random.default_rng(3)
+        self.assertAlmostEqual(36 / 7, notation.compile_expression('d8!').roll(400_000, rng).mean(), delta=0.03)
+        rerolled = notation.compile_expression('d6r1').roll(400_000, rng)
+        self.assertNotIn(1, rerolled)
+        self.assertAlmostEqual(4, rerolled.mean(), delta=0.02)
+        self.assertAlmostEqual(3.5 + 5 / 12, notation.compile_expression('d6ro1').roll(400_000, rng).mean(),
+                               delta=0.02)
+
+    def test_arithmetic(self):
+        """
+        Precedence, parentheses and unary minus work on whole arrays of totals.
+        :return: None.
+        """
+        self.assertEqual(7, notation.compile_expression('1 + 2 * 3').roll())
+        self.assertEqual(-9, notation.compile_expression('-(1 + 2) * 3').roll())
+        self.assertEqual([6.0] * 5, notation.compile_expression('2 * (1d1 + 2)').roll(5).tolist())
+        self.assertEqual((2, 3), notation.compile_expression('d6 - 1').roll((2, 3)).shape)
+
+    def test_cache(self):
+        """
+        The same expression in another case, or with other runs of spaces, compiles to the same plan.
+        :return: None.
+        """
+        self.assertIs(notation.compile_expression('4d6kh3 + 1'), notation.compile_expression(' 4D6KH3  +  1 '))
+
+    def test_errors(self):
+        """
+        Malformed and impossible expressions are rejected when compiled.
+        :return: None.
+        """
+        for expression in ['', '3d', '4d6kh5', 'd1!', 'd6r<6', '(1 + 2', '2 x 3', '1.5d6', '4d6+']:
+            self.assertRaises(ValueError, notation.compile_expression, expression)
+
+    def test_expression_die(self):
+        """
+        An ExpressionDie rolls through Dice and Rolls, including seeded, parallel and regenerated rows.
+        :return: None.
+        """
+        dice = hdr.Dice(notation.ExpressionDie('4d6kh3'), number_of_dice=6)
+        self.assertEqual('4d6kh3_0', dice.headers()[0])
+        rolls = hdr.Rolls(dice, number_of_rolls=500, seed=9)
+        self.assertEqual(rolls.rolls(), hdr.Rolls(dice, number_of_rolls=500, seed=9, workers=2).rolls())
+        self.assertEqual(rolls.rolls()[200:205], rolls.regenerate_rows(200, 205)[0].tolist())
+        self.assertTrue(all(3 <= roll <= 18 for row in rolls.rolls() for roll in row))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import io
+import unittest
+from src.api import core as hdr
+from src.api import profiling
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        profiling.reset()
+
+    def tearDown(self):
+        profiling.disable()
+        profiling.reset()
+
+    def test_disabled_leaves_functions_in_place(self):
+        """
+        While profiling is disabled the instrumented methods are the plain functions and nothing is recorded.
+        :return: None.
+        """
+        original = hdr.Die.__dict__['die_roll']
+        profiling.enable()
+        self.assertIsNot(original, hdr.Die.__dict__['die_roll'])
+        profiling.disable()
+        self.assertIs(original, hdr.Die.__dict__['die_roll'])
+
+        hdr.Rolls(hdr.Dice(hdr.IntegerDie(), number_of_dice=3), number_of_rolls=10)
+        self.assertEqual({}, profiling.stages())
+
+    def test_stages_are_recorded(self):
+        """
+        Enabled, each stage counts its calls, time, and the samples and bytes of the arrays it returns.
+        :return: None.
+        """
+        profiling.enable()
+        rolls = hdr.Rolls(hdr.Dice(hdr.IntegerDie(), number_of_dice=3), number_of_rolls=1000)
+        rolls.rolls()
+        rolls.rolls_to_csv(io.StringIO())
+        stages = profiling.stages()
+
+        self.assertEqual(1, stages['Rolls.roll_n_times']['calls'])
+        self.assertEqual(4000, stages['Rolls.roll_n_times']['samples'])  # 3000 dice and 1000 totals
+        self.assertEqual(rolls.rolls_view().nbytes + rolls.totals_view().nbytes, stages['Dice.dice_throws']['bytes'])
+        self.assertEqual(1000, stages['Rolls.rolls']['samples'])
+        self.assertEqual(1, stages['Rolls.write_chunks']['calls'])
+        self.assertGreater(stages['Rolls.rolls_to_csv']['seconds'], 0)
+
+        report = profiling.format_report()
+        self.assertIn('Rolls.rolls_to_csv', report)
+        self.assertTrue(report.startswith('stage'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import pickle
+import unittest
+import numpy as np
+from src.api import core as hdr
+
+
+class TestRollsSummary(unittest.TestCase):
+
+    def test_matches_held_table(self):
+        """
+        The summary of a streamed run agrees exactly with the same seeded run held in memory.
+        :return: None.
+        """
+        dice = hdr.Dice(hdr.IntegerDie(sides=8), number_of_dice=3)
+        held = hdr.Rolls(dice, number_of_rolls=10_000, seed=11)
+        streamed = hdr.Rolls(dice, number_of_rolls=10_000, seed=11, stream=True)
+        rolls_summary = streamed.summarize()
+
+        totals, counts = rolls_summary.total_counts()
+        expected_totals, expected_counts = np.unique(held.list_of_totals(), return_counts=True)
+        self.assertEqual(expected_totals.tolist(), totals.tolist())
+        self.assertEqual(expected_counts.tolist(), counts.tolist())
+        faces, counts = rolls_summary.face_counts(column=1)
+        self.assertEqual(np.unique(held.rolls_to_numpy()[:, 1], return_counts=True)[1].tolist(), counts.tolist())
+
+        self.assertTrue(rolls_summary.is_exact())
+        self.assertEqual(10_000, rolls_summary.rows_written())
+        self.assertEqual(held.total(), rolls_summary.grand_total())
+        self.assertAlmostEqual(np.mean(held.list_of_totals()), rolls_summary.mean())
+        self.assertAlmostEqual(np.var(held.list_of_totals()), rolls_summary.variance())
+        self.assertEqual(np.quantile(held.list_of_totals(), 0.9, method='inverted_cdf'), rolls_summary.quantile(0.9))
+        self.assertEqual(streamed.total(), held.total())
+
+    def test_merge(self):
+        """
+        Summaries of separate runs, even after pickling to another process, merge into the summary of both.
+        :return: None.
+        """
+        dice = hdr.Dice(hdr.IntegerDie(), number_of_dice=2)
+        first = hdr.Rolls(dice, number_of_rolls=3000, seed=1, stream=True).summarize()
+        second = pickle.loads(pickle.dumps(hdr.Rolls(dice, number_of_rolls=5000, seed=2, stream=True).summarize()))
+        both = np.concatenate([hdr.Rolls(dice, number_of_rolls=3000, seed=1).list_of_totals(),
+                               hdr.Rolls(dice, number_of_rolls=5000, seed=2).list_of_totals()])
+
+        merged = first.merge(second)
+        self.assertEqual(8000, merged.rows_written())
+        self.assertEqual(np.unique(both, return_counts=True)[1].tolist(), merged.total_counts()[1].tolist())
+        self.assertAlmostEqual(both.mean(), merged.mean())
+        self.assertAlmostEqual(both.var(), merged.variance())
+        self.assertEqual(both.min(), merged.min())
+
+        other_dice = hdr.Rolls(hdr.Dice(hdr.IntegerDie(), number_of_dice=3), stream=True).summarize()
+        self.assertRaises(ValueError, merged.merge, other_dice)
+
+    def test_merge_transformed_grand_total(self):
+        """
+        The merged grand total transforms the sum of both runs' totals once, rather than adding two transformed
+        grand totals.
+        :return: None.
+        """
+        dice = hdr.Dice(hdr.IntegerDie(), number_of_dice=2)
+        first = hdr.Rolls(dice, transform_fn=hdr.add_currying(10), number_of_rolls=300, seed=1, stream=True)
+        second = hdr.Rolls(dice, transform_fn=hdr.add_currying(10), number_of_rolls=500, seed=2, stream=True)
+        first_summary, second_summary = first.summarize(), second.summarize()
+        self.assertEqual(first.total(), first_summary.grand_total())
+        merged = first_summary.merge(pickle.loads(pickle.dumps(second_summary)))
+        self.assertEqual(first.total() + second.total() - 10, merged.grand_total())
+        self.assertIn(f"grand_total: {merged.grand_total()}", merged.to_string())
+
+        untransformed = hdr.Rolls(dice, number_of_rolls=300, seed=1, stream=True).summarize()
+        self.assertRaises(ValueError, merged.merge, untransformed)
+
+    def test_continuous_sketch(self):
+        """
+        A continuous die overflows the exact counts; memory stays bounded and the quantiles stay close.
+        :return: None.
+        """
+        rolls = hdr.Rolls(hdr.Dice(hdr.Die('normal'), number_of_dice=1), number_of_rolls=200_000, seed=5,
+                          stream=True)
+        rolls_summary = rolls.summarize(max_bins=256)
+        self.assertFalse(rolls_summary.is_exact())
+        self.assertLessEqual(len(rolls_summary.total_counts()[0]), 256)
+        self.assertEqual(200_000, rolls_summary.total_counts()[1].sum())
+        self.assertAlmostEqual(0, rolls_summary.quantile(0.5), delta=0.02)
+        self.assertAlmostEqual(1.2816, rolls_summary.quantile(0.9), delta=0.02)
+        self.assertAlmostEqual(1, rolls_summary.variance(), delta=0.02)
+
+
+if __name__ == '__main__':
+    unittest.main()
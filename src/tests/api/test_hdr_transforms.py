@@ -0,0 +1,93 @@
+import pickle
+import unittest
+import numpy as np
+from src.api import core as hdr
+from src.api import distribution as hdr_dist
+from src.api import transforms
+
+
+class TestTransforms(unittest.TestCase):
+
+    def test_scalar_and_array_paths_agree(self):
+        """
+        Each transform gives the same values for one number as for a whole array.
+        :return: None.
+        """
+        values = np.array([-3, 0, 2, 7])
+        for transform in [transforms.Affine(2, 1), transforms.Clamp(0, 5), transforms.Floor(),
+                          transforms.compose(transforms.Affine(0.5), transforms.Floor(), transforms.Clamp(high=2))]:
+            self.assertEqual([transform(value) for value in values.tolist()], transform(values).tolist())
+
+    def test_affine_fusion(self):
+        """
+        Neighbouring affine maps fuse into one, and identities vanish.
+        :return: None.
+        """
+        fused = transforms.compose(hdr.add_currying(3), hdr.multiply_currying(2), transforms.Affine(1, -1))
+        self.assertEqual(transforms.Affine(2, 5), fused)
+        self.assertEqual(transforms.Affine(1, 0), transforms.compose(hdr.add_currying(2), hdr.add_currying(-2)))
+        mixed = hdr.add_currying(1).then(transforms.Floor()).then(transforms.Floor())
+        self.assertEqual(transforms.Compose(transforms.Affine(1, 1), transforms.Floor()), mixed)
+        self.assertRaises(TypeError, transforms.compose, lambda y: y)
+
+    def test_floor_and_clamp_collapse(self):
+        """
+        Redundant Floors and neighbouring Clamps collapse, and every collapse maps values as the stages in turn do.
+        :return: None.
+        """
+        floor, clamp = transforms.Floor(), transforms.Clamp
+        cases = [((floor, transforms.Affine(1, 0), floor), floor),
+                 ((floor, hdr.add_currying(1), hdr.add_currying(-1), floor), floor),
+                 ((floor, clamp(0, 5), floor), transforms.Compose(floor, clamp(0, 5))),
+                 ((floor, clamp(0, 5.5), floor), transforms.Compose(floor, clamp(0, 5.5), floor)),
+                 ((clamp(0, 10), clamp(5, 20)), clamp(5, 10)),
+                 ((clamp(0, 2), clamp(5, 20)), clamp(5, 5)),
+                 ((clamp(low=3), clamp(high=1)), clamp(1, 1)),
+                 ((clamp(high=8), clamp(low=2)), clamp(2, 8))]
+        values = np.linspace(-10, 30, 161)
+        for stages, expected in cases:
+            composed = transforms.compose(*stages)
+            self.assertEqual(expected, composed)
+            staged = values
+            for stage in stages:
+                staged = stage(staged)
+            self.assertEqual(staged.tolist(), composed(values).tolist())
+
+    def test_hashable_and_picklable(self):
+        """
+        Equal transforms are equal and hash alike, and survive pickling, as do the dice which use them.
+        :return: None.
+        """
+        self.assertEqual(hash(hdr.add_currying(2)), hash(transforms.Affine(1.0, 2.0)))
+        self.assertEqual(1, len({hdr.multiply_currying(3), transforms.Affine(3, 0)}))
+        clamp = transforms.compose(hdr.multiply_currying(2), transforms.Clamp(0, 30))
+        self.assertEqual(clamp, pickle.loads(pickle.dumps(clamp)))
+        rolls = hdr.Rolls(hdr.Dice(hdr.IntegerDie(transform_fn=hdr.add_currying(2)), transform_fn=clamp,
+                                   number_of_dice=3), number_of_rolls=5)
+        copy = pickle.loads(pickle.dumps(rolls))
+        self.assertEqual(rolls.rolls(), copy.rolls())
+        self.assertEqual(rolls.total(), copy.total())
+        self.assertRaises(AttributeError, setattr, clamp, 'transforms', ())
+
+    def test_lambdas_still_work(self):
+        """
+        A hand-written lambda is still accepted as a transform.
+        :return: None.
+        """
+        rolls = hdr.Rolls(hdr.Dice(hdr.IntegerDie(sides=1), transform_fn=lambda y: y * 10, number_of_dice=2),
+                          number_of_rolls=3)
+        self.assertEqual([20, 20, 20], rolls.list_of_totals())
+
+    def test_exact_distribution(self):
+        """
+        Any composition of affine maps has an exact distribution; a clamp does not.
+        :return: None.
+        """
+        composed = transforms.compose(hdr.add_currying(1), hdr.multiply_currying(2))
+        exact = hdr_dist.DiceDistribution(sides=6, number_of_dice=1, die_transform=composed)
+        self.assertEqual([4, 6, 8, 10, 12, 14], exact.support().tolist())
+        self.assertRaises(ValueError, hdr_dist.DiceDistribution, die_transform=transforms.Clamp(2, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
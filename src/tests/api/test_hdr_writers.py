@@ -0,0 +1,337 @@
+import gzip
+import importlib.util
+import io
+import os
+import tempfile
+import unittest
+import numpy as np
+from src.api import core as hdr
+from src.api import writers
+
+HAVE_PYARROW = importlib.util.find_spec('pyarrow') is not None
+HAVE_ZSTANDARD = importlib.util.find_spec('zstandard') is not None
+
+
+class TestCompactDtypes(unittest.TestCase):
+
+    def test_compact_dtype(self):
+        """
+        The smallest signed integer dtype covers the range; anything else is float64.
+        :return: None.
+        """
+        self.assertEqual(np.int8, writers.compact_dtype(np.array([1, 6])))
+        self.assertEqual(np.int16, writers.compact_dtype(np.array([1, 200])))
+        self.assertEqual(np.int16, writers.compact_dtype(np.array([-200, 1])))
+        self.assertEqual(np.int32, writers.compact_dtype(np.array([0, 100_000])))
+        self.assertEqual(np.float64, writers.compact_dtype(np.array([1.5, 6.0])))
+
+    def test_column_dtypes_follow_the_die(self):
+        """
+        Column dtypes come from the die's range as altered by its transforms.
+        :return: None.
+        """
+        d6 = hdr.Dice(hdr.IntegerDie(), number_of_dice=3)
+        self.assertEqual((np.int8, np.int8), hdr.Rolls(d6).column_dtypes())
+        d100 = hdr.Dice(hdr.IntegerDie(sides=100), number_of_dice=3)
+        self.assertEqual((np.int8, np.int16), hdr.Rolls(d100).column_dtypes())
+        scaled = hdr.Dice(hdr.IntegerDie(transform_fn=hdr.multiply_currying(0.5)), number_of_dice=3)
+        self.assertEqual((np.float64, np.float64), hdr.Rolls(scaled).column_dtypes())
+
+    def test_column_dtypes_of_non_monotone_transforms(self):
+        """
+        A transform whose extremes are not at the ends of the faces or totals is checked at every face and total,
+        and where there are too many the columns fall back to 64 bits.
+        :return: None.
+        """
+        hump = hdr.Dice(hdr.IntegerDie(transform_fn=lambda y: y * (7 - y) * 20), number_of_dice=2)  # 120 to 240
+        self.assertEqual((np.int16, np.int16), hdr.Rolls(hump).column_dtypes())
+        total_hump = hdr.Dice(hdr.IntegerDie(), transform_fn=lambda t: t * (14 - t) * 4, number_of_dice=2)
+        self.assertEqual((np.int8, np.int16), hdr.Rolls(total_hump).column_dtypes())
+        wide = hdr.Dice(hdr.IntegerDie(sides=1_000_000, transform_fn=lambda y: y % 7), number_of_dice=2)
+        self.assertEqual((np.int64, np.int64), hdr.Rolls(wide).column_dtypes())
+        halved = hdr.Dice(hdr.IntegerDie(sides=1_000_000, transform_fn=lambda y: y % 7 / 2), number_of_dice=2)
+        self.assertEqual((np.float64, np.float64), hdr.Rolls(halved).column_dtypes())
+
+        with tempfile.TemporaryDirectory() as directory:
+            rolls = hdr.Rolls(hump, number_of_rolls=200, seed=3)
+            rolls.rolls_to_npy(os.path.join(directory, 'hump.npy'))
+            table = np.load(os.path.join(directory, 'hump.npy'))
+        self.assertEqual(rolls.rolls(), table[:, :2].tolist())
+        self.assertEqual(rolls.list_of_totals(), table[:, 2].tolist())
+
+    def test_cast_refuses_to_wrap(self):
+        """
+        Values outside a compact dtype raise rather than wrap around.
+        :return: None.
+        """
+        self.assertRaises(ValueError, writers.cast_column, np.array([1, 300]), np.dtype(np.int8))
+
+
+class TestBinaryExports(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.dice = hdr.Dice(hdr.IntegerDie(sides=20), number_of_dice=3)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def test_npy(self):
+        """
+        The .npy holds the dice and the row total, the same whether the table is held or streamed.
+        :return: None.
+        """
+        held = hdr.Rolls(self.dice, number_of_rolls=1000, seed=11)
+        held.rolls_to_npy(self._path('held.npy'))
+        table = np.load(self._path('held.npy'))
+        self.assertEqual(np.int8, table.dtype)
+        self.assertEqual(held.rolls(), table[:, :-1].tolist())
+        self.assertEqual(held.list_of_totals(), table[:, -1].tolist())
+
+        streamed = hdr.Rolls(self.dice, number_of_rolls=1000, seed=11, stream=True)
+        streamed.rolls_to_npy(self._path('streamed.npy'))
+        self.assertTrue(np.array_equal(table, np.load(self._path('streamed.npy'))))
+
+    def test_npz(self):
+        """
+        The .npz holds the rolls, totals and grand total.
+        :return: None.
+        """
+        rolls = hdr.Rolls(self.dice, number_of_rolls=50)
+        rolls.rolls_to_npz(self._path('rolls.npz'))
+        with np.load(self._path('rolls.npz')) as archive:
+            self.assertEqual(rolls.rolls(), archive['rolls'].tolist())
+            self.assertEqual(rolls.total(), archive['grand_total'].item())
+        streamed = hdr.Rolls(self.dice, number_of_rolls=50, stream=True)
+        self.assertRaises(ValueError, streamed.rolls_to_npz, self._path('streamed.npz'))
+
+    @unittest.skipUnless(HAVE_PYARROW, "pyarrow is not installed")
+    def test_parquet_and_arrow(self):
+        """
+        Parquet and Arrow files have one compact column per die and a row total column.
+        :return: None.
+        """
+        import pyarrow
+        import pyarrow.parquet
+        rolls = hdr.Rolls(self.dice, number_of_rolls=200, stream=True, seed=2)
+        rolls.rolls_to_parquet(self._path('rolls.parquet'))
+        table = pyarrow.parquet.read_table(self._path('rolls.parquet'))
+        self.assertEqual(200, table.num_rows)
+        self.assertEqual(['d20_0', 'd20_1', 'd20_2', '3_*_d20_roll_total'], table.column_names)
+        self.assertEqual(pyarrow.int8(), table.schema.field('d20_0').type)
+
+        rolls.rolls_to_arrow(self._path('rolls.arrow'))
+        arrow_table = pyarrow.ipc.open_file(self._path('rolls.arrow')).read_all()
+        self.assertTrue(table.equals(arrow_table))
+
+
+class TestCsvWriter(unittest.TestCase):
+
+    def test_format_csv_rows(self):
+        """
+        Integers, negative numbers, whole floats and fractions are formatted as pandas formats them.
+        :return: None.
+        """
+        columns = [np.array([0, 1, 2]), np.array([-5, 0, 123]), np.array([1.0, -2.0, 30.0]), np.array([0.5, 1.0, 0.1])]
+        self.assertEqual(b"0,-5,1.0,0.5\n1,0,-2.0,1.0\n2,123,30.0,0.1\n", writers.format_csv_rows(columns))
+
+    def test_compact_columns_near_their_limits(self):
+        """
+        int8, int16 and uint8 columns with values at the ends of their range, as compact exports hold, are written
+        as pandas writes them rather than wrapping around.
+        :return: None.
+        """
+        import pandas as pd
+        for dtype in (np.int8, np.int16, np.uint8):
+            info = np.iinfo(dtype)
+            many = np.resize(np.array([info.min, info.min + 1, -1 if info.min else 1, 0, info.max - 1, info.max],
+                                      dtype=dtype), 40)  # few distinct values, formatted through a table
+            spread = np.linspace(info.min, info.max, 40).astype(dtype)  # many distinct values, formatted directly
+            for column in (many, spread):
+                chunk = hdr.RollsChunk(0, column.reshape(-1, 1), column, int(column.astype(np.int64).sum()))
+                buf = io.StringIO()
+                with writers.CsvChunkWriter(buf, ['d_0', 'total', 'running']) as writer:
+                    writer.write(chunk)
+                frame = pd.DataFrame({'d_0': column, 'total': column,
+                                      'running': np.cumsum(column.astype(np.int64))})
+                self.assertEqual(frame.to_csv(), buf.getvalue())
+
+    def test_matches_pandas(self):
+        """
+        The CSV is byte for byte what the pandas path wrote, with integer and float transforms.
+        :return: None.
+        """
+        for transform in [None, hdr.add_currying(-10), hdr.multiply_currying(0.1)]:
+            dice = hdr.Dice(hdr.IntegerDie(transform_fn=transform, sides=20), number_of_dice=3)
+            rolls = hdr.Rolls(dice, transform_fn=hdr.add_currying(0.5), number_of_rolls=300)
+            self.assertEqual(rolls.rolls_to_pandas(with_totals=True).to_csv(), rolls.rolls_to_csv())
+            buf = io.StringIO()
+            dice.dice_to_csv(buf)
+            self.assertEqual(dice.dice_to_pandas(with_total=True).to_csv(), buf.getvalue())
+
+    def test_grand_total_footer(self):
+        """
+        The footer holds the transformed grand total once, for held and streamed tables.
+        :return: None.
+        """
+        dice = hdr.Dice(hdr.IntegerDie(sides=1), number_of_dice=2)
+        for stream in [False, True]:
+            rolls = hdr.Rolls(dice, transform_fn=hdr.add_currying(100), number_of_rolls=3, stream=stream)
+            self.assertEqual(",d1_0,d1_1,2_*_d1_roll_total\n"
+                             "0,1,1,2\n"
+                             "1,1,1,2\n"
+                             "2,1,1,2\n"
+                             "# grand_total,106\n", rolls.rolls_to_csv(grand_total_footer=True))
+
+    def test_gzip(self):
+        """
+        A '.gz' path is compressed with gzip.
+        :return: None.
+        """
+        rolls = hdr.Rolls(hdr.Dice(hdr.IntegerDie(), number_of_dice=2), number_of_rolls=100)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'rolls.csv.gz')
+            rolls.rolls_to_csv(path)
+            with gzip.open(path, 'rt', newline='') as file:
+                self.assertEqual(rolls.rolls_to_csv(), file.read())
+
+    def test_path_like_and_none(self):
+        """
+        A pathlib.Path is written to as a path, with its compression suffix, and dice_to_csv without a path returns
+        the CSV, as rolls_to_csv does.
+        :return: None.
+        """
+        from pathlib import Path
+        dice = hdr.Dice(hdr.IntegerDie(), number_of_dice=2)
+        rolls = hdr.Rolls(dice, number_of_rolls=10)
+        with tempfile.TemporaryDirectory() as directory:
+            rolls.rolls_to_csv(Path(directory) / 'rolls.csv.gz')
+            with gzip.open(Path(directory) / 'rolls.csv.gz', 'rt', newline='') as file:
+                self.assertEqual(rolls.rolls_to_csv(), file.read())
+            dice.dice_to_csv(Path(directory) / 'dice.csv')
+            self.assertEqual(dice.dice_to_csv(), (Path(directory) / 'dice.csv').read_text())
+        self.assertEqual(dice.dice_to_pandas(with_total=True).to_csv(), dice.dice_to_csv())
+
+    @unittest.skipUnless(HAVE_ZSTANDARD, "zstandard is not installed")
+    def test_zstd(self):
+        """
+        A '.zst' path is compressed with zstd.
+        :return: None.
+        """
+        import zstandard
+        rolls = hdr.Rolls(hdr.Dice(hdr.IntegerDie(), number_of_dice=2), number_of_rolls=100)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'rolls.csv.zst')
+            rolls.rolls_to_csv(path)
+            with zstandard.open(path, 'rt', newline='') as file:
+                self.assertEqual(rolls.rolls_to_csv(), file.read())
+
+
+class TestXlsxWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def test_same_table_as_pandas(self):
+        """
+        The streamed workbook reads back as the DataFrame pandas would have written, held or streamed.
+        :return: None.
+        """
+        import pandas as pd
+        dice = hdr.Dice(hdr.IntegerDie(transform_fn=hdr.multiply_currying(0.5)), number_of_dice=3)
+        held = hdr.Rolls(dice, number_of_rolls=500, seed=4)
+        self.assertEqual([self._path('held.xlsx')], held.rolls_to_excel(self._path('held.xlsx')))
+        pd.testing.assert_frame_equal(held.rolls_to_pandas(with_totals=True),
+                                      pd.read_excel(self._path('held.xlsx'), index_col=0), check_names=False)
+
+        streamed = hdr.Rolls(dice, number_of_rolls=500, seed=4, stream=True)
+        streamed.rolls_to_excel(self._path('streamed.xlsx'), sheet_name='rolls & <totals>', float_format='%.1f')
+        table = pd.read_excel(self._path('streamed.xlsx'), sheet_name='rolls & <totals>', index_col=0)
+        self.assertEqual(streamed.stream_headers(), table.columns.tolist())
+        self.assertEqual(held.list_of_totals(), table.iloc[:, -2].tolist())
+        self.assertEqual(held.total(), table.iloc[-1, -1])
+
+    def test_split_sheets_and_workbooks(self):
+        """
+        Rows past the sheet limit continue on numbered sheets, and then in numbered workbooks.
+        :return: None.
+        """
+        import pandas as pd
+        rolls = hdr.Rolls(hdr.Dice(hdr.IntegerDie(), number_of_dice=2), number_of_rolls=25)
+        writer = writers.XlsxChunkWriter(self._path('rolls.xlsx'), rolls.headers(with_totals=True),
+                                         grand_total=rolls.total(), max_rows=11, sheets_per_workbook=2)
+        rolls.write_chunks(writer)
+        self.assertEqual([self._path('rolls.xlsx'), self._path('rolls_2.xlsx')], writer.paths())
+
+        sheets = {}
+        for path in writer.paths():
+            sheets.update(pd.read_excel(path, sheet_name=None, index_col=0))
+        self.assertEqual(['Sheet1', 'Sheet1 (2)', 'Sheet1 (3)'], list(sheets))
+        self.assertEqual([10, 10, 5], [len(sheet) for sheet in sheets.values()])
+        table = pd.concat(sheets.values())
+        self.assertEqual(list(range(25)), table.index.tolist())
+        self.assertEqual(rolls.rolls_with_totals(), table.values.tolist())
+
+    def test_summary_sheet(self):
+        """
+        With a summary the grand total column is dropped and a Summary sheet holds the statistics and histograms.
+        :return: None.
+        """
+        import pandas as pd
+        rolls = hdr.Rolls(hdr.Dice(hdr.IntegerDie(), number_of_dice=2), number_of_rolls=1000)
+        rolls.rolls_to_excel(self._path('rolls.xlsx'), summary=True)
+        sheets = pd.read_excel(self._path('rolls.xlsx'), sheet_name=None, index_col=None)
+        self.assertEqual(['Sheet1', 'Summary'], list(sheets))
+        self.assertEqual(rolls.headers(with_totals=True)[:-1], sheets['Sheet1'].columns[1:].tolist())
+
+        rolls_summary = rolls.summarize()
+        statistics = dict(zip(sheets['Summary']['statistic'], sheets['Summary']['value']))
+        self.assertEqual(1000, statistics['rolls'])
+        self.assertEqual(rolls.total(), statistics['grand_total'])
+        self.assertAlmostEqual(rolls_summary.mean(), statistics['mean'])
+        histogram = sheets['Summary'].iloc[:, 3:5].dropna()
+        self.assertEqual(rolls_summary.total_counts()[1].tolist(), histogram['count'].astype(int).tolist())
+
+
+class TestTextTable(unittest.TestCase):
+
+    def test_matches_pandas(self):
+        """
+        The printed tables are what pandas.DataFrame.to_string printed, with integer and float transforms.
+        :return: None.
+        """
+        import pandas as pd
+        for transform in [None, hdr.add_currying(-10), hdr.multiply_currying(0.1), hdr.multiply_currying(1e-7)]:
+            dice = hdr.Dice(hdr.IntegerDie(transform_fn=transform, sides=20), number_of_dice=3)
+            rolls = hdr.Rolls(dice, number_of_rolls=50)
+            rolls.roll_n_times()
+            self.assertEqual(rolls.rolls_to_pandas(with_totals=True).to_string(), str(rolls))
+            dice.dice_throw()
+            self.assertEqual(dice.dice_to_pandas(with_total=True).to_string(), str(dice))
+
+    def test_pandas_not_imported(self):
+        """
+        Rolling and printing a table does not import pandas.
+        :return: None.
+        """
+        import subprocess
+        import sys
+        code = ("import sys\nfrom src.api import core\n"
+                "rolls = core.Rolls(core.Dice(core.IntegerDie(), number_of_dice=3), number_of_rolls=10)\n"
+                "rolls.roll_n_times()\nstr(rolls)\nprint('pandas' in sys.modules)")
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+        result = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True)
+        self.assertEqual('False', result.stdout.strip())
+
+
+if __name__ == '__main__':
+    unittest.main()
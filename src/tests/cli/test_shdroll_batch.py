@@ -0,0 +1,96 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from src.cli import shdroll_batch
+from src.cli.shdroll_cli_parser import SimpleHDRollCliParser
+
+
+class TestShdrollBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def test_parse_jobs(self):
+        """
+        JSON lines and TOML describe the same jobs, and comments and blank lines are skipped.
+        :return: None.
+        """
+        jsonl = '# jobs\n{"name": "3d6", "dice": 3, "rolls": 10}\n\n{"expr": "4d6kh3", "summary": true}\n'
+        toml = '# jobs\n[[job]]\nname = "3d6"\ndice = 3\nrolls = 10\n\n[[job]]\nexpr = "4d6kh3"\nsummary = true\n'
+        expected = [{'name': '3d6', 'dice': 3, 'rolls': 10}, {'expr': '4d6kh3', 'summary': True}]
+        self.assertEqual(expected, shdroll_batch.parse_jobs(jsonl))
+        self.assertEqual(expected, shdroll_batch.parse_jobs(toml))
+        self.assertRaises(SyntaxError, shdroll_batch.parse_jobs, '{"dice": 3}\n{"dice": \n')
+
+    def test_chunk_size_must_be_positive(self):
+        """
+        A --chunk-size below 1 is an argument error, on the command line and in a job, rather than the default.
+        :return: None.
+        """
+        parser = SimpleHDRollCliParser()
+        self.assertEqual(64, parser.parse(['--chunk-size', '64']).chunk_size)
+        for chunk_size in ('0', '-5'):
+            with contextlib.redirect_stderr(io.StringIO()) as errors, self.assertRaises(SystemExit):
+                parser.parse(['--chunk-size', chunk_size])
+            self.assertIn(f"argument --chunk-size: must be at least 1, not {chunk_size}", errors.getvalue())
+        with contextlib.redirect_stderr(io.StringIO()) as errors:
+            failures = shdroll_batch.run_jobs([{'name': 'empty', 'chunk_size': 0}], out=io.StringIO())
+        self.assertEqual(1, failures)
+        self.assertIn("empty: must be at least 1, not 0", errors.getvalue())
+
+    def test_run_jobs(self):
+        """
+        Each job prints under its name or to its output file and streams its exports.  A seeded batch gives the
+        same results whether its jobs run one at a time or at once, and a failed job does not stop the others.
+        :return: None.
+        """
+        def jobs(suffix):
+            return [{'name': 'held', 'dice': 3, 'rolls': 5},
+                    {'name': 'streamed', 'sides': 20, 'rolls': 1000, 'chunk_size': 64,
+                     'to_csv': self._path(f'd20{suffix}.csv'), 'output': self._path(f'd20{suffix}.txt')},
+                    {'name': 'broken', 'dice': 2, 'colour': 'red'},
+                    {'name': 'summary', 'expr': '2d8!', 'rolls': 500, 'summary': True}]
+
+        results = []
+        for suffix, concurrency in (('a', 1), ('b', 3)):
+            out = io.StringIO()
+            with contextlib.redirect_stderr(io.StringIO()) as errors:
+                failures = shdroll_batch.run_jobs(jobs(suffix), concurrency=concurrency, seed=7, out=out)
+            self.assertEqual(1, failures)
+            self.assertIn("broken: Unknown batch job option 'colour'.", errors.getvalue())
+            results.append(out.getvalue())
+            with open(self._path(f'd20{suffix}.txt')) as file:
+                results.append(file.read())
+            with open(self._path(f'd20{suffix}.csv')) as file:
+                results.append(file.read())
+
+        self.assertEqual(results[:3], results[3:])
+        self.assertIn('== held ==', results[0])
+        self.assertIn('== summary ==', results[0])
+        self.assertNotIn('d20_0', results[0])
+        self.assertTrue(results[1].rstrip().splitlines()[-1].startswith('grand_total: '))
+        self.assertEqual(1001, len(results[2].splitlines()))
+
+    def test_seeded_batch_with_workers(self):
+        """
+        A job with workers but no seed of its own is repeatable from the batch's seed too.
+        :return: None.
+        """
+        outputs = []
+        for _ in range(2):
+            out = io.StringIO()
+            self.assertEqual(0, shdroll_batch.run_jobs([{'dice': 2, 'rolls': 3, 'workers': 2}], seed=7, out=out))
+            outputs.append(out.getvalue())
+        self.assertEqual(outputs[0], outputs[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -127,6 +127,50 @@ class TestShdroll(unittest.TestCase):
                        '--dice', '2', '--roll', '2',
                        '--to-xlsx', 'test.xlsx'], stdout=sbp.PIPE, stderr=sbp.STDOUT)
 
+    def test_exact(self):
+        """
+        The exact distribution of 3d6, 3..18, with mean 10.5.
+        :return: None.  Prints text.
+        """
+        out = sbp.run(['python', shdr_path, '--dice', '3', '--exact'], stdout=sbp.PIPE, stderr=sbp.STDOUT)
+        print(out.stdout.decode())
+
+    def test_chunk_size(self):
+        """
+        2d6 rolled 5x, streamed 2 rows at a time with a running grand total.
+        :return: None.  Prints text.
+        """
+        out = sbp.run(['python', shdr_path, '--dice', '2', '--rolls', '5', '--chunk-size', '2'],
+                      stdout=sbp.PIPE, stderr=sbp.STDOUT)
+        print(out.stdout.decode())
+
+    def test_summary(self):
+        """
+        3d6 rolled 100000x, printed as counts, moments and quantiles rather than rows.
+        :return: None.  Prints text.
+        """
+        out = sbp.run(['python', shdr_path, '--dice', '3', '--rolls', '100000', '--summary'],
+                      stdout=sbp.PIPE, stderr=sbp.STDOUT)
+        print(out.stdout.decode())
+
+    def test_converge(self):
+        """
+        The mean of 3d6 estimated to within 0.01, with the rolls and seconds it took.
+        :return: None.  Prints text.
+        """
+        out = sbp.run(['python', shdr_path, '--dice', '3', '--converge', '0.01'],
+                      stdout=sbp.PIPE, stderr=sbp.STDOUT)
+        print(out.stdout.decode())
+
+    def test_expr(self):
+        """
+        Six ability scores, each the highest 3 of 4d6, rolled 3x.
+        :return: None.  Prints text.
+        """
+        out = sbp.run(['python', shdr_path, '--expr', '4d6kh3', '--dice', '6', '--rolls', '3'],
+                      stdout=sbp.PIPE, stderr=sbp.STDOUT)
+        print(out.stdout.decode())
+
     def test_all(self):
         out = sbp.run(['python', shdr_path, '--sides', '6', '--dice', '2', '--rolls', '2'],
                       stdout=sbp.PIPE, stderr=sbp.STDOUT)
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+import numpy as np
+from src.api import core as hdr
+from src.service import roll_server
+
+
+class TestRollServer(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = roll_server.RollServer(batch_window=0.01, max_in_flight=8)
+        self.host, self.port = await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def _exchange(self, requests: list) -> dict:
+        """
+        Sends every request on one connection before reading any response.
+        :return: id -> response.
+        """
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        writer.write(b''.join(json.dumps(request).encode() + b'\n' for request in requests))
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in requests]
+        writer.close()
+        await writer.wait_closed()
+        return {response['id']: response for response in responses}
+
+    async def test_roll(self):
+        """
+        A request for 2 rows of 3d6 gets its rolls, their totals and the grand total.
+        :return: None.
+        """
+        response = (await self._exchange([{'id': 'a', 'sides': 6, 'dice': 3, 'rolls': 2}]))['a']
+        self.assertEqual(2, len(response['rolls']))
+        self.assertEqual([sum(row) for row in response['rolls']], response['totals'])
+        self.assertEqual(sum(response['totals']), response['grand_total'])
+        self.assertTrue(all(1 <= roll <= 6 for row in response['rolls'] for roll in row))
+
+    async def test_concurrent_requests_are_batched(self):
+        """
+        Concurrent requests for the same dice are rolled in one batch, and each gets its own rows.
+        :return: None.
+        """
+        responses = await self._exchange([{'id': i, 'sides': 20, 'dice': 2, 'rolls': 3} for i in range(20)])
+        self.assertEqual(20, len(responses))
+        self.assertTrue(all(len(response['rolls']) == 3 for response in responses.values()))
+        self.assertLess(self.server.metrics.batches, 20)
+        self.assertEqual(60, self.server.metrics.rows)
+
+    async def test_seeded_and_expression(self):
+        """
+        A seeded request is repeatable and matches Rolls with the same seed; dice notation is accepted.
+        :return: None.
+        """
+        request = {'expr': '4d6kh3', 'dice': 6, 'rolls': 4, 'seed': 42}
+        responses = await self._exchange([dict(request, id=1), dict(request, id=2)])
+        self.assertEqual(responses[1]['rolls'], responses[2]['rolls'])
+        dice = roll_server.dice_for(roll_server.spec_key(request))
+        self.assertEqual(hdr.Rolls(dice, number_of_rolls=4, seed=42).rolls(), responses[1]['rolls'])
+
+    async def test_distribution(self):
+        """
+        The exact distribution of 2d6 comes from the shared distribution cache.
+        :return: None.
+        """
+        response = (await self._exchange([{'id': 1, 'op': 'distribution', 'sides': 6, 'dice': 2}]))[1]
+        self.assertEqual(list(range(2, 13)), response['totals'])
+        self.assertAlmostEqual(6 / 36, response['probabilities'][5])
+        self.assertAlmostEqual(7, response['mean'])
+
+    async def test_errors(self):
+        """
+        Bad requests get an error response and do not close the connection.
+        :return: None.
+        """
+        responses = await self._exchange([{'id': 1, 'sides': 0}, {'id': 2, 'rolls': 10 ** 9},
+                                          {'id': 3, 'expr': '4d6kh5'}, {'id': 4, 'op': 'nope'},
+                                          {'id': 5, 'rolls': 1}])
+        for i in range(1, 5):
+            self.assertIn('error', responses[i])
+        self.assertNotIn('error', responses[5])
+
+    async def test_limits(self):
+        """
+        Requests for too many dice in all, too large an exact distribution, or totals which are not finite get an
+        error response rather than a huge allocation or invalid JSON.
+        :return: None.
+        """
+        responses = await self._exchange([{'id': 1, 'dice': 10 ** 9},
+                                          {'id': 2, 'dice': 100, 'rolls': 10 ** 6},
+                                          {'id': 3, 'expr': '1000000d6', 'rolls': 100},
+                                          {'id': 4, 'op': 'distribution', 'sides': 10 ** 7, 'dice': 1000},
+                                          {'id': 5, 'expr': '1d6/0'},
+                                          {'id': 6, 'expr': '1000d6', 'rolls': 100}])
+        for i in range(1, 6):
+            self.assertIn('error', responses[i])
+        self.assertNotIn('error', responses[6])
+
+    async def test_long_line(self):
+        """
+        A request line longer than the limit gets an error response after the replies already in flight, and its
+        connection is closed.
+        :return: None.
+        """
+        server = roll_server.RollServer(max_line_bytes=1024)
+        host, port = await server.start()
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(b'{"id": 1, "rolls": 2}\n' + b'{"id": 2, "expr": "' + b' ' * 4096 + b'1d6"}\n')
+            await writer.drain()
+            first = json.loads(await reader.readline())
+            second = json.loads(await reader.readline())
+            self.assertEqual(1, first['id'])
+            self.assertNotIn('error', first)
+            self.assertIn('at most 1024 bytes', second['error'])
+            self.assertEqual(b'', await reader.readline())
+            self.assertEqual(1, server.metrics.rejected)
+            writer.close()
+        finally:
+            await server.close()
+
+    async def test_large_requests_do_not_block_others(self):
+        """
+        A large roll is rolled and encoded in a thread, so a small request sent after it is answered first.
+        :return: None.
+        """
+        server = roll_server.RollServer(offload_size=1000)
+        host, port = await server.start()
+        try:
+            large = await asyncio.open_connection(host, port, limit=1 << 27)  # its response is tens of MB
+            small = await asyncio.open_connection(host, port)
+            large[1].write(json.dumps({'id': 'large', 'dice': 10, 'rolls': 500_000, 'seed': 1}).encode() + b'\n')
+            await large[1].drain()
+            await asyncio.sleep(0.01)
+            small[1].write(json.dumps({'id': 'small', 'rolls': 1}).encode() + b'\n')
+            await small[1].drain()
+            finished = []
+
+            async def answer(name, reader):
+                response = json.loads(await reader.readline())
+                finished.append(name)
+                return response
+
+            response, _ = await asyncio.gather(answer('large', large[0]), answer('small', small[0]))
+            self.assertEqual(['small', 'large'], finished)
+            self.assertEqual(500_000, len(response['totals']))
+            self.assertEqual(sum(response['totals']), response['grand_total'])
+            for _, writer in (large, small):
+                writer.close()
+        finally:
+            await server.close()
+
+    def test_encode(self):
+        """
+        A response encoded in slices is exactly what json.dumps writes for it.
+        :return: None.
+        """
+        response = {'id': 'a', 'rolls': np.arange(40).reshape(20, 2), 'totals': np.arange(20) / 4,
+                    'empty': np.arange(0), 'grand_total': 47.5}
+        expected = json.dumps({key: value.tolist() if isinstance(value, np.ndarray) else value
+                               for key, value in response.items()})
+        with mock.patch.object(roll_server, 'ENCODE_ROWS', 3):
+            self.assertEqual(expected, roll_server._encode(response))
+
+    async def test_unexpected_errors(self):
+        """
+        A request which fails other than by a ValueError, such as an expression nested too deeply to parse, still
+        gets an error response and is counted.
+        :return: None.
+        """
+        expression = '(' * 3000 + '1' + ')' * 3000
+        responses = await self._exchange([{'id': 1, 'expr': expression}, {'id': 2, 'rolls': 1}])
+        self.assertIn('error', responses[1])
+        self.assertNotIn('error', responses[2])
+        self.assertEqual(1, self.server.metrics.errors)
+
+    async def test_metrics(self):
+        """
+        The metrics report the requests answered and their latency.
+        :return: None.
+        """
+        await self._exchange([{'id': i, 'rolls': 1} for i in range(5)])
+        metrics = (await self._exchange([{'id': 'm', 'op': 'metrics'}]))['m']
+        self.assertEqual(5, metrics['requests'])
+        self.assertIsNotNone(metrics['latency_p99_ms'])
+        self.assertGreater(metrics['requests_per_s'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()